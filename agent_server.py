@@ -0,0 +1,272 @@
+import argparse
+import asyncio
+import time
+import uuid
+from aiohttp import web, WSMsgType
+from async_agent import AsyncEventAgent, AsyncOllamaClient
+from llm_scheduler import LLMScheduler
+from ollama_pool import AsyncOllamaPool
+from session_store import SessionStore
+
+
+class SessionAgent(AsyncEventAgent):
+    """One user's conversation inside the server.
+
+    Only the conversation and the preferences are its own. The knowledge graph, the
+    event store, the scorer, the router, the caches and the LLM clients belong to the
+    shared agent, so a new session costs a few small objects instead of loading anything.
+
+    Every other attribute is read from and written to the shared agent, so what it or
+    any session changes later (like the catalog_sync made on the first sync) is seen
+    by all sessions.
+    """
+
+    # Attributes kept on the session itself, the rest belong to shared_agent
+    OWN_STATE = AsyncEventAgent.SESSION_STATE + ("shared_agent", "session_id", "loop", "lock", "last_active", "turns")
+
+    def __init__(self, shared_agent, session_id):
+        self.shared_agent = shared_agent
+        self.session_id = session_id
+        self.loop = None
+        self.lock = asyncio.Lock() # One turn at a time, so the history stays in order
+        self.last_active = time.monotonic()
+        self.turns = 0
+        self.reset_session()
+
+    def __getattr__(self, name):
+        # Only called for attributes the session doesn't have itself
+        if name in self.OWN_STATE:
+            raise AttributeError(name)
+        return getattr(self.shared_agent, name)
+
+    def __setattr__(self, name, value):
+        if name in self.OWN_STATE:
+            super().__setattr__(name, value)
+        else:
+            setattr(self.shared_agent, name, value)
+
+
+class AgentServer:
+    """Serves many conversations from one process over HTTP and WebSocket.
+
+    POST /sessions                   start a session, returns {"session_id": ...}
+    POST /sessions/{id}/messages     {"message": ...} -> {"action", "response", "preferences"}
+    GET  /sessions/{id}/ws           WebSocket, send messages as text, get {"type": "token"} while
+                                     the answer streams and {"type": "done", ...} at the end
+    DELETE /sessions/{id}            end a session
+    GET  /stats                      sessions, LLM, router and cache counters
+
+    All sessions share one agent (catalog, knowledge graph, caches) and one pool of Ollama
+    hosts (ollama_urls, the agent's Ollama by default). Each host has an LLMScheduler that
+    runs at most llm_concurrency requests at once and keeps up to llm_queue waiting,
+    classification calls first. Sessions idle for longer than idle_timeout seconds are dropped.
+
+    With a session_store, every turn is saved behind the request, and a session that isn't
+    in memory (evicted, or started before a restart or in another process) is loaded the
+    next time it's used.
+    """
+
+    def __init__(self, agent=None, ollama_urls=None, llm_concurrency=8, llm_queue=256, idle_timeout=30 * 60,
+                 max_sessions=1000, sweep_interval=60, session_store=None):
+        self.agent = agent or AsyncEventAgent()
+        self.session_store = session_store # SessionStore to keep conversations across restarts, None to keep them in memory only
+        clients = [
+            AsyncOllamaClient(url, pool_size=llm_concurrency, scheduler=LLMScheduler(max_in_flight=llm_concurrency, max_queue=llm_queue))
+            for url in ollama_urls or [self.agent.llm.base_url]
+        ]
+        self.agent.async_llm = AsyncOllamaPool(clients)
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self.sweep_interval = sweep_interval
+        self.sessions = {}
+        self.sweeper = None
+        self.stats = {"sessions_started": 0, "sessions_resumed": 0, "sessions_ended": 0, "sessions_evicted": 0,
+                      "sessions_rejected": 0, "turns": 0}
+
+    def has_room(self):
+        if len(self.sessions) >= self.max_sessions:
+            self.evict_idle()
+            if len(self.sessions) >= self.max_sessions:
+                self.stats["sessions_rejected"] += 1
+                return False
+        return True
+
+    def create_session(self):
+        """Start a session, None if the server already has max_sessions"""
+        if not self.has_room():
+            return None
+        session = SessionAgent(self.agent, uuid.uuid4().hex)
+        self.sessions[session.session_id] = session
+        self.stats["sessions_started"] += 1
+        return session
+
+    async def find_session(self, session_id):
+        """The session in memory, or loaded from the session store. None if there's no such session."""
+        session = self.sessions.get(session_id)
+        if session is not None or self.session_store is None:
+            return session
+        state = await asyncio.to_thread(self.session_store.load, session_id)
+        if state is None:
+            return None
+        if session_id in self.sessions:
+            return self.sessions[session_id] # Another request loaded it meanwhile
+        if not self.has_room():
+            raise web.HTTPServiceUnavailable(text="Too many sessions")
+        session = SessionAgent(self.agent, session_id)
+        session.restore_session(state)
+        self.sessions[session_id] = session
+        self.stats["sessions_resumed"] += 1
+        return session
+
+    def end_session(self, session_id):
+        ended = self.sessions.pop(session_id, None) is not None
+        if self.session_store is not None:
+            self.session_store.delete(session_id)
+        if ended:
+            self.stats["sessions_ended"] += 1
+        return ended
+
+    def evict_idle(self, now=None):
+        """Drop the sessions nobody talked to for idle_timeout seconds, return how many"""
+        now = time.monotonic() if now is None else now
+        idle = [session_id for session_id, session in self.sessions.items()
+                if now - session.last_active > self.idle_timeout and not session.lock.locked()]
+        for session_id in idle:
+            del self.sessions[session_id]
+            if self.session_store is not None:
+                self.session_store.release(session_id) # Saved already, it's loaded again when it's used
+        self.stats["sessions_evicted"] += len(idle)
+        return len(idle)
+
+    async def sweep_idle(self):
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            evicted = self.evict_idle()
+            if evicted:
+                print(f"Evicted {evicted} idle sessions, {len(self.sessions)} left")
+
+    async def run_turn(self, session, user_input, on_token=None):
+        async with session.lock:
+            session.last_active = time.monotonic()
+            try:
+                action, response = await session.handle_turn(user_input, on_token)
+            finally:
+                session.last_active = time.monotonic()
+        session.turns += 1
+        self.stats["turns"] += 1
+        if action == "quit":
+            self.end_session(session.session_id)
+        elif self.session_store is not None:
+            self.session_store.save(session.session_id, session.user_preferences, session.conversation)
+        return action, response
+
+    async def get_session(self, request):
+        session = await self.find_session(request.match_info["session_id"])
+        if session is None:
+            raise web.HTTPNotFound(text="Unknown or expired session")
+        return session
+
+    async def handle_create(self, request):
+        session = self.create_session()
+        if session is None:
+            raise web.HTTPServiceUnavailable(text="Too many sessions")
+        return web.json_response({"session_id": session.session_id}, status=201)
+
+    async def handle_message(self, request):
+        session = await self.get_session(request)
+        try:
+            user_input = str((await request.json())["message"]).strip()
+        except (ValueError, KeyError, TypeError):
+            raise web.HTTPBadRequest(text='Expected JSON {"message": "..."}')
+        if not user_input:
+            raise web.HTTPBadRequest(text="Empty message")
+        action, response = await self.run_turn(session, user_input)
+        return web.json_response({"action": action, "response": response, "preferences": session.user_preferences})
+
+    async def handle_websocket(self, request):
+        session = await self.get_session(request)
+        ws = web.WebSocketResponse(heartbeat=30)
+        await ws.prepare(request)
+
+        async def send_token(token):
+            await ws.send_json({"type": "token", "token": token})
+
+        async for message in ws:
+            if message.type != WSMsgType.TEXT:
+                continue
+            user_input = message.data.strip()
+            if not user_input:
+                continue
+            action, response = await self.run_turn(session, user_input, on_token=send_token)
+            await ws.send_json({"type": "done", "action": action, "response": response,
+                                "preferences": session.user_preferences})
+            if action == "quit":
+                break
+        await ws.close()
+        return ws
+
+    async def handle_delete(self, request):
+        session = await self.get_session(request)
+        self.end_session(session.session_id)
+        return web.Response(status=204)
+
+    async def handle_stats(self, request):
+        return web.json_response(self.get_stats())
+
+    def get_stats(self):
+        stats = {**self.stats, "sessions": len(self.sessions), "llm": self.agent.async_llm.get_stats(),
+                 "model_tiers": self.agent.tier_stats.get_stats()}
+        if self.agent.intent_router is not None:
+            stats["intent_router"] = self.agent.intent_router.get_stats()
+        if self.agent.response_cache is not None:
+            stats["response_cache"] = self.agent.response_cache.get_stats()
+        if self.session_store is not None:
+            stats["session_store"] = self.session_store.get_stats()
+        return stats
+
+    async def on_startup(self, app):
+        # Load the events before the first user waits for them
+        await asyncio.to_thread(self.agent.event_store.as_dicts)
+        # Asked through the sessions' Ollama hosts, before the first turn
+        await self.agent.has_small_model_async()
+        self.sweeper = asyncio.create_task(self.sweep_idle())
+
+    async def on_cleanup(self, app):
+        if self.sweeper is not None:
+            self.sweeper.cancel()
+        await self.agent.async_llm.close()
+        if self.session_store is not None:
+            await asyncio.to_thread(self.session_store.close) # Writes what's left
+
+    def create_app(self):
+        app = web.Application()
+        app.add_routes([
+            web.post("/sessions", self.handle_create),
+            web.post("/sessions/{session_id}/messages", self.handle_message),
+            web.get("/sessions/{session_id}/ws", self.handle_websocket),
+            web.delete("/sessions/{session_id}", self.handle_delete),
+            web.get("/stats", self.handle_stats)
+        ])
+        app.on_startup.append(self.on_startup)
+        app.on_cleanup.append(self.on_cleanup)
+        return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the Event Agent to many users over HTTP and WebSocket")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--ollama", action="append", help="Ollama URL, repeat for several hosts (default http://localhost:11434)")
+    parser.add_argument("--llm-concurrency", type=int, default=8, help="Ollama requests running at once, per host")
+    parser.add_argument("--llm-queue", type=int, default=256, help="Ollama requests waiting at most, per host")
+    parser.add_argument("--idle-timeout", type=float, default=30 * 60, help="Seconds before an idle session is dropped")
+    parser.add_argument("--max-sessions", type=int, default=1000)
+    parser.add_argument("--sessions-db", help="SQLite file (like sessions.sqlite) to keep conversations in, across restarts and processes")
+    parser.add_argument("--flush-interval", type=float, default=1.0,
+                        help="Seconds between writes of the sessions, at most this much is lost in a crash")
+    args = parser.parse_args()
+
+    session_store = SessionStore(args.sessions_db, flush_interval=args.flush_interval) if args.sessions_db else None
+    server = AgentServer(ollama_urls=args.ollama, llm_concurrency=args.llm_concurrency, llm_queue=args.llm_queue,
+                         idle_timeout=args.idle_timeout, max_sessions=args.max_sessions, session_store=session_store)
+    web.run_app(server.create_app(), host=args.host, port=args.port)
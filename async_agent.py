@@ -0,0 +1,370 @@
+import asyncio
+import contextlib
+import json
+import time
+import aiohttp
+from final_version import EventAgent
+from llm_client import BaseOllamaClient, model_names
+from llm_scheduler import CHAT, CLASSIFY, LLMOverloaded
+
+
+class AsyncOllamaClient(BaseOllamaClient):
+    """Async counterpart of OllamaClient, built on one shared aiohttp session"""
+
+    def __init__(self, base_url="http://localhost:11434", connect_timeout=3.05, read_timeout=120, pool_size=10,
+                 keep_alive="30m", scheduler=None):
+        super().__init__(base_url, keep_alive)
+        self.timeout = aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout)
+        self.pool_size = pool_size
+        self.session = None # Created lazily, it has to live inside the running event loop
+        self.scheduler = scheduler # LLMScheduler deciding when each request may start, None to send them right away
+        self.pending = {} # Identical requests running now -> future of their response, see post
+        self.stats["coalesced"] = 0
+
+    def get_session(self):
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=60)
+            self.session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        return self.session
+
+    @contextlib.asynccontextmanager
+    async def slot(self, priority, session):
+        """Wait until the scheduler lets the request start, and free its slot when it's done"""
+        if self.scheduler is None:
+            yield
+            return
+        await self.scheduler.acquire(priority, session)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.scheduler.release(time.perf_counter() - started)
+
+    def get_stats(self):
+        stats = super().get_stats()
+        if self.scheduler is not None:
+            stats["scheduler"] = self.scheduler.get_stats()
+        return stats
+
+    async def post(self, path, payload, priority=CHAT, session=None):
+        """POST a JSON payload to an Ollama endpoint and return the parsed JSON response.
+        A request identical to one that's still running shares its response instead of queueing again."""
+        key = (path, json.dumps(payload, sort_keys=True))
+        pending = self.pending.get(key)
+        if pending is not None:
+            self.stats["coalesced"] += 1
+            return await asyncio.shield(pending)
+
+        pending = self.pending[key] = asyncio.get_running_loop().create_future()
+        try:
+            async with self.slot(priority, session):
+                data = await self.post_now(path, payload)
+            pending.set_result(data)
+            return data
+        except asyncio.CancelledError:
+            pending.cancel()
+            raise
+        except Exception as e:
+            pending.set_exception(e)
+            pending.exception() # Mark it retrieved, so asyncio doesn't warn when nobody shared the request
+            raise
+        finally:
+            del self.pending[key]
+
+    async def post_now(self, path, payload):
+        body = json.dumps(payload).encode("utf-8")
+        started = time.perf_counter()
+        self.count_request(body)
+        try:
+            async with self.get_session().post(
+                self.base_url + path,
+                data=body,
+                headers={"Content-Type": "application/json"}
+            ) as response:
+                response.raise_for_status()
+                content = await response.read()
+                self.stats["bytes_received"] += len(content)
+                data = json.loads(content)
+                self.count_tokens(payload, data)
+                return data
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            self.stats["errors"] += 1
+            raise
+        finally:
+            self.count_latency(started)
+
+    async def post_stream(self, path, payload, priority=CHAT, session=None):
+        """POST a JSON payload and yield each line of Ollama's NDJSON stream as a dict"""
+        async with self.slot(priority, session):
+            async for chunk in self.post_stream_now(path, payload):
+                yield chunk
+
+    async def post_stream_now(self, path, payload):
+        body = json.dumps(payload).encode("utf-8")
+        started = time.perf_counter()
+        self.count_request(body)
+        try:
+            async with self.get_session().post(
+                self.base_url + path,
+                data=body,
+                headers={"Content-Type": "application/json"}
+            ) as response:
+                response.raise_for_status()
+                first_token = True
+                async for line in response.content:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    self.stats["bytes_received"] += len(line)
+                    if first_token:
+                        self.stats["last_time_to_first_token"] = time.perf_counter() - started
+                        first_token = False
+                    chunk = json.loads(line)
+                    if chunk.get("error"):
+                        raise aiohttp.ClientError(chunk["error"])
+                    if chunk.get("done"):
+                        self.count_tokens(payload, chunk)
+                    yield chunk
+                    if chunk.get("done"):
+                        break
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            self.stats["errors"] += 1
+            raise
+        finally:
+            self.count_latency(started)
+
+    async def generate(self, model, prompt, priority=CHAT, session=None, **options):
+        """Send a prompt to /api/generate and return the generated text"""
+        payload = self.generate_payload(model, prompt, False, options)
+        return (await self.post("/api/generate", payload, priority, session))["response"]
+
+    async def chat(self, model, messages, priority=CHAT, session=None, **options):
+        """Send messages to /api/chat and return the assistant's reply"""
+        payload = self.chat_payload(model, messages, False, options)
+        return (await self.post("/api/chat", payload, priority, session))["message"]["content"]
+
+    async def chat_stream(self, model, messages, priority=CHAT, session=None, **options):
+        """Send messages to /api/chat and yield the reply's tokens as they arrive"""
+        payload = self.chat_payload(model, messages, True, options)
+        async for chunk in self.post_stream("/api/chat", payload, priority, session):
+            content = chunk.get("message", {}).get("content")
+            if content:
+                yield content
+
+    async def has_model(self, model):
+        """True if Ollama has the model downloaded, or if it can't be asked"""
+        try:
+            async with self.get_session().get(self.base_url + "/api/tags") as response:
+                response.raise_for_status()
+                return model in model_names(await response.json(content_type=None))
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+            return True
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+
+
+class AsyncEventAgent(EventAgent):
+    """EventAgent that runs the independent parts of a turn concurrently on one event loop.
+
+    While the model decides what to do, the preference update (on the two-call path)
+    and loading the events run at the same time, instead of one after another.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.async_llm = AsyncOllamaClient(self.llm.base_url)
+        self.loop = None # The event loop running handle_turn, summaries are sent through it
+        self.session_id = None # The scheduler takes turns between sessions, see agent_server.py
+
+    def summarize_history(self, summary, evicted_turns):
+        # add_to_history runs in a worker thread (see handle_turn), so the summary can go through
+        # the async client and wait its turn like every other request
+        try:
+            asyncio.get_running_loop()
+            on_loop = True
+        except RuntimeError:
+            on_loop = False
+        if self.loop is None or on_loop:
+            return super().summarize_history(summary, evicted_turns)
+        prompt = self.summary_prompt(summary, evicted_turns)
+        try:
+            summarizing = self.async_llm.generate(self.model_name, prompt, session=self.session_id)
+            return asyncio.run_coroutine_threadsafe(summarizing, self.loop).result().strip()
+        except (aiohttp.ClientError, asyncio.TimeoutError, LLMOverloaded) as e:
+            print(f"❌ Error summarizing conversation: {e}. Keeping the previous summary.")
+            return summary
+
+    async def has_small_model_async(self):
+        """has_small_model, asking the Ollama the turns go to. Only the first turn waits for it."""
+        if self.small_model_available is None:
+            self.set_small_model_available(await self.async_llm.has_model(self.small_model_name))
+        return self.small_model_available
+
+    # Send chat messages to the Ollama LLM and get a response, without blocking the event loop
+    async def ask_ollama_chat_async(self, messages, priority=CHAT, model=None, **options):
+        try:
+            return await self.async_llm.chat(model or self.model_name, messages, priority, self.session_id, **options)
+        except (aiohttp.ClientError, asyncio.TimeoutError, LLMOverloaded) as e:
+            return f"Error communicating with Ollama: {e}"
+
+    async def ask_ollama_chat_stream_async(self, messages):
+        try:
+            async for token in self.async_llm.chat_stream(self.model_name, messages, CHAT, self.session_id):
+                yield token
+        except LLMOverloaded:
+            yield "Sorry, I'm talking to a lot of people right now. Please try again in a moment."
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            yield f"Error communicating with Ollama: {e}"
+
+    async def ask_ollama_chat_tiered_async(self, messages, is_valid, **options):
+        """Async ask_ollama_chat_tiered. These are short classification calls, so they go before chat answers."""
+        models = self.classification_models()
+        for tier, model in models:
+            started = time.perf_counter()
+            response = await self.ask_ollama_chat_async(messages, CLASSIFY, model, **options)
+            self.tier_stats.record(tier, started)
+            if is_valid(response) or tier == models[-1][0]:
+                return response
+            self.tier_stats.escalated()
+
+    async def ask_ollama_chat_cached_async(self, template, messages, user_input, is_valid, context="", **options):
+        """Async ask_ollama_chat_cached"""
+        if self.response_cache is None:
+            return await self.ask_ollama_chat_tiered_async(messages, is_valid, **options)
+        key = self.cache_key(template, messages, user_input, context, options)
+        response = self.response_cache.get(key)
+        if response is None:
+            response = await self.ask_ollama_chat_tiered_async(messages, is_valid, **options)
+            if is_valid(response):
+                self.response_cache.put(key, response)
+        return response
+
+    async def decide_action_async(self, user_input):
+        action = self.route_intent(user_input)
+        if action:
+            return action
+        messages, schema = self.decide_action_messages(user_input)
+        response = await self.ask_ollama_chat_cached_async("decide_action", messages, user_input, self.is_action, format=schema)
+        return self.action_from_response(response)
+
+    async def preferences_response_async(self, user_input):
+        # Only fetch the response here, it's applied once we know the user isn't quitting.
+        # Returns a preference delta if it was found without the LLM.
+        delta = self.local_preference_delta(user_input)
+        if delta is not None:
+            return delta
+        return await self.ask_ollama_chat_cached_async("user_preferences", self.user_preferences_messages(user_input), user_input,
+                                                       self.is_preferences_response, context=self.preferences_context())
+
+    async def analyze_turn_async(self, user_input):
+        analysis = self.local_turn_analysis(user_input)
+        if analysis:
+            return analysis
+        messages, schema = self.analyze_turn_messages(user_input)
+        # The prompt has the current preferences, so the answer is only valid for the same ones
+        response = await self.ask_ollama_chat_cached_async("turn_analysis", messages, user_input, self.is_turn_analysis,
+                                                           context=self.preferences_context(), format=schema)
+        return self.parse_turn_analysis(response)
+
+    async def handle_turn(self, user_input, on_token=None):
+        """Run one conversation turn and return (action, response).
+        Tokens of a general_chat answer are passed to on_token as they arrive, it can be a coroutine function."""
+        self.loop = asyncio.get_running_loop()
+        await self.has_small_model_async()
+        # Loading events doesn't need the model, so it runs in a thread alongside the LLM calls
+        events_task = asyncio.create_task(asyncio.to_thread(self.event_store.as_dicts))
+
+        analysis = await self.analyze_turn_async(user_input) if self.use_turn_analysis else None
+        if analysis:
+            action, preference_delta = analysis
+        else:
+            # decide_action and the preference update only depend on the user input
+            action, preferences_response = await asyncio.gather(
+                self.decide_action_async(user_input),
+                self.preferences_response_async(user_input)
+            )
+        print(f"Decided action: {action}")
+
+        if action == "quit":
+            events_task.cancel()
+            return action, "Goodbye!"
+
+        if analysis:
+            self.apply_preference_delta(preference_delta)
+        else:
+            try:
+                if isinstance(preferences_response, dict):
+                    self.apply_preference_delta(preferences_response)
+                else:
+                    self.set_user_preferences(preferences_response)
+            except Exception as e:
+                print(f"Error updating preferences: {e}")
+
+        if action == "suggest_events":
+            await events_task
+            # Scoring runs in a thread too, so other sessions' turns go on meanwhile
+            suggested_events = await asyncio.to_thread(self.suggest_events)
+            response = self.events_response(suggested_events)
+        else:
+            events_task.cancel()
+            messages = self.general_chat_messages(user_input, self.get_history_context())
+            tokens = []
+            async for token in self.ask_ollama_chat_stream_async(messages):
+                if on_token:
+                    sent = on_token(token)
+                    if asyncio.iscoroutine(sent):
+                        await sent
+                tokens.append(token)
+            response = "".join(tokens)
+
+        # Summarizing old turns calls the model, so it mustn't block the event loop
+        await asyncio.to_thread(self.add_to_history, user_input, response)
+        return action, response
+
+    async def run_async(self):
+        print(f"🤖 Hi! I'm your Event Agent.")
+
+        try:
+            while True: # Loop until the user wants to quit
+                # Read input in a thread, so the event loop keeps running
+                user_input = (await asyncio.to_thread(input, "👩 You: ")).strip()
+
+                # If the user input is empty, do nothing
+                if not user_input:
+                    continue
+
+                streamed = []
+                def print_token(token):
+                    if not streamed:
+                        print("🤖 ", end="", flush=True)
+                    streamed.append(token)
+                    print(token, end="", flush=True)
+
+                action, response = await self.handle_turn(user_input, on_token=print_token)
+
+                if streamed:
+                    print("\n")
+                else:
+                    print(f"🤖 {response}\n")
+
+                if action == "quit":
+                    break
+        except (KeyboardInterrupt, EOFError):
+            print("\n🤖 Goodbye!")
+        finally:
+            await self.async_llm.close()
+
+    # Run the agent in interactive mode
+    def run(self):
+        asyncio.run(self.run_async())
+
+
+# Demo usage
+if __name__ == "__main__":
+    # Create agent
+    agent = AsyncEventAgent()
+
+    # Run the agent in interactive mode
+    agent.run()
@@ -0,0 +1,171 @@
+"""
+Compare wall-clock time per turn: the sequential EventAgent loop vs. AsyncEventAgent.
+
+Starts a local stub Ollama server that waits LLM_DELAY seconds per call, so the
+numbers don't depend on your hardware. The event store reloads its catalog before
+every turn, and each reload is slowed down by EVENTS_DELAY to stand in for a real catalog.
+
+The intent router, the preference extractor and the response cache are turned off,
+otherwise most of these turns never reach the model and there's nothing to overlap.
+
+Run from the repository root:
+    python benchmarks/benchmark_async_turn.py
+"""
+
+import asyncio
+import json
+import os
+import re
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from final_version import EventAgent
+from async_agent import AsyncEventAgent
+
+LLM_DELAY = 0.2
+EVENTS_DELAY = 0.05
+TURNS = ["Hi!", "I like music", "Show me some events", "What about theater?", "Any events in Maribor?"]
+
+
+class StubOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if "messages" in request:
+            prompt = "\n".join(message["content"] for message in request["messages"])
+        else:
+            prompt = request["prompt"]
+        user_input = re.search(r'User said: "(.*?)"', prompt)
+        wants_events = user_input is not None and "event" in user_input.group(1).lower()
+        action = "suggest_events" if wants_events else "general_chat"
+
+        # decide_action and the turn analysis send a JSON schema, the turn analysis one has more fields
+        schema = request.get("format") or {}
+        if "add_interests" in schema.get("properties", {}):
+            text = json.dumps({"action": action, "add_interests": ["music"], "remove_interests": [],
+                               "location": "", "preferred_price": "", "date": ""})
+        elif "action" in schema.get("properties", {}):
+            text = json.dumps({"action": action})
+        elif "JSON" in prompt:
+            text = json.dumps({"interests": ["music"], "location": "", "preferred_price": "", "date": ""})
+        else:
+            text = "Sure, I can help you find something fun to do."
+
+        time.sleep(LLM_DELAY)
+        lines = [
+            {"response": text, "message": {"role": "assistant", "content": text}, "done": not request.get("stream")},
+            {"response": "", "message": {"role": "assistant", "content": ""}, "done": True}
+        ]
+        if request.get("stream"):
+            body = "".join(json.dumps(line) + "\n" for line in lines).encode("utf-8")
+        else:
+            body = json.dumps(lines[0]).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        # Health probes of the Ollama pool ask for the models
+        body = json.dumps({"models": [{"name": "llama3.1:latest"}, {"name": "llama3.2:latest"}]}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def llm_only(agent):
+    # Every turn asks the model, like before the router, the extractor and the cache
+    agent.intent_router = None
+    agent.preference_extractor = None
+    agent.response_cache = None
+
+
+def slow_events(agent):
+    agent.current_date = "2025-11-01" # Pinned, so date preferences give the same events on every run
+    reload = agent.event_store.reload
+    def slow_reload():
+        time.sleep(EVENTS_DELAY)
+        reload()
+    agent.event_store.reload = slow_reload
+
+
+def catalog_changed(agent):
+    # Makes the store reload on the next get_events, as if the catalog was updated
+    agent.event_store.loaded = False
+
+
+def run_sequential(agent, user_input):
+    # Same steps as EventAgent.run(), without the input() loop
+    analysis = agent.analyze_turn(user_input) if agent.use_turn_analysis else None
+    if analysis:
+        action, preference_delta = analysis
+        agent.apply_preference_delta(preference_delta)
+    else:
+        action = agent.decide_action(user_input)
+        agent.update_user_preferences(user_input)
+
+    if action == "suggest_events":
+        response = "\n\n".join(agent.format_events(agent.suggest_events()))
+    else:
+        messages = agent.general_chat_messages(user_input, agent.get_history_context())
+        response = "".join(agent.ask_ollama_chat_stream(messages))
+    agent.add_to_history(user_input, response)
+
+
+def benchmark(use_turn_analysis, base_url):
+    sequential = EventAgent()
+    sequential.llm.base_url = base_url
+    sequential.use_turn_analysis = use_turn_analysis
+    llm_only(sequential)
+    slow_events(sequential)
+
+    started = time.perf_counter()
+    for user_input in TURNS:
+        catalog_changed(sequential)
+        run_sequential(sequential, user_input)
+    sequential_time = (time.perf_counter() - started) / len(TURNS)
+
+    concurrent = AsyncEventAgent()
+    concurrent.async_llm.base_url = base_url
+    concurrent.use_turn_analysis = use_turn_analysis
+    llm_only(concurrent)
+    slow_events(concurrent)
+
+    async def run_turns():
+        started = time.perf_counter()
+        for user_input in TURNS:
+            catalog_changed(concurrent)
+            await concurrent.handle_turn(user_input)
+        await concurrent.async_llm.close()
+        return (time.perf_counter() - started) / len(TURNS)
+
+    concurrent_time = asyncio.run(run_turns())
+    return sequential_time, concurrent_time
+
+
+if __name__ == "__main__":
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubOllamaHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    results = []
+    for use_turn_analysis in [False, True]:
+        results.append((use_turn_analysis, *benchmark(use_turn_analysis, base_url)))
+    server.shutdown()
+
+    print(f"\nStub LLM delay: {LLM_DELAY * 1000:.0f} ms per call, event loading: {EVENTS_DELAY * 1000:.0f} ms, {len(TURNS)} turns")
+    print(f"{'mode':<22}{'sequential':>14}{'asyncio':>14}{'speedup':>10}")
+    for use_turn_analysis, sequential_time, concurrent_time in results:
+        mode = "turn analysis" if use_turn_analysis else "two-call"
+        print(f"{mode:<22}{sequential_time * 1000:>11.0f} ms{concurrent_time * 1000:>11.0f} ms{sequential_time / concurrent_time:>9.2f}x")
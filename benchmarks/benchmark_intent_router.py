@@ -0,0 +1,74 @@
+"""
+Measure the intent router on the labelled messages in resources/intent_examples.json.
+
+Prints how many messages the router answers without the LLM, how many of those
+it gets right, the time per message, and the messages it gets wrong. Also counts
+the turns that need no LLM call at all, because the preference extractor handles
+their preferences too.
+With --llm, the messages the router passes on are also sent to the model
+(Ollama has to be running), to get the accuracy of the whole routing.
+
+Run from the repository root:
+    python benchmarks/benchmark_intent_router.py [--llm]
+"""
+
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from intent_router import IntentRouter
+from preference_extractor import PreferenceExtractor
+
+RESOURCES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "resources")
+EXAMPLES_PATH = os.path.join(RESOURCES, "intent_examples.json")
+ACTIONS = ["general_chat", "suggest_events", "quit"]
+
+
+if __name__ == "__main__":
+    with open(EXAMPLES_PATH, 'r', encoding='utf-8') as file:
+        examples = json.load(file)
+
+    router = IntentRouter(ACTIONS)
+    started = time.perf_counter()
+    routes = [router.route(example["text"]) for example in examples]
+    elapsed = time.perf_counter() - started
+
+    routed = [(example, action) for example, action in zip(examples, routes) if action]
+    correct = sum(1 for example, action in routed if action == example["action"])
+    stats = router.get_stats()
+
+    print(f"Messages: {len(examples)}")
+    print(f"Answered without the LLM: {len(routed)} ({stats['llm_calls_saved']:.0%}), "
+          f"rules {stats['rules']}, word overlap {stats['overlap']}")
+    print(f"Accuracy of those: {correct}/{len(routed)} ({correct / max(len(routed), 1):.0%})")
+    print(f"Time per message: {elapsed / len(examples) * 1e6:.1f} µs")
+
+    for example, action in routed:
+        if action != example["action"]:
+            print(f"  wrong: {example['text']!r} -> {action}, expected {example['action']}")
+
+    # Same decision as EventAgent.local_turn_analysis
+    with open(os.path.join(RESOURCES, "knowledge_graph.json"), 'r', encoding='utf-8') as file:
+        extractor = PreferenceExtractor(json.load(file))
+    local_turns = 0
+    for example, action in zip(examples, routes):
+        delta, matched = extractor.extract(example["text"], "2025-11-01")
+        if action == "quit" or (action and (matched or not extractor.looks_like_preference(example["text"]))):
+            local_turns += 1
+    print(f"Turns without any LLM call (router and preference extractor): {local_turns}/{len(examples)} "
+          f"({local_turns / len(examples):.0%})")
+
+    if "--llm" in sys.argv:
+        from final_version import EventAgent
+        agent = EventAgent()
+        agent.intent_router = None # Send everything that wasn't routed to the model
+        agent.response_cache = None
+        llm_correct = 0
+        for example, action in zip(examples, routes):
+            if action is None:
+                llm_correct += agent.decide_action(example["text"]) == example["action"]
+        total_correct = correct + llm_correct
+        print(f"Accuracy with the LLM for the rest: {total_correct}/{len(examples)} ({total_correct / len(examples):.0%})")
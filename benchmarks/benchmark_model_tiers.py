@@ -0,0 +1,113 @@
+"""
+Compare the classification calls on one model with the small/large model tiering.
+
+Sends the labelled messages in resources/intent_examples.json through the turn analysis
+with the intent router, the preference extractor and the response cache switched off, so
+every message reaches the model. A local stub Ollama answers with the labelled action;
+"llama3.2" takes SMALL_DELAY and returns broken JSON for SMALL_INVALID of the messages,
+"llama3.1" takes LARGE_DELAY and is always valid. Prints the classification time per
+turn, the escalation rate and the accuracy against the labels for both setups.
+
+Run from the repository root:
+    python benchmarks/benchmark_model_tiers.py
+"""
+
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from final_version import EventAgent
+from llm_client import TierStats
+
+RESOURCES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "resources")
+SMALL_DELAY = 0.03
+LARGE_DELAY = 0.12
+SMALL_INVALID = 0.1
+
+with open(os.path.join(RESOURCES, "intent_examples.json"), 'r', encoding='utf-8') as file:
+    EXAMPLES = json.load(file)
+LABELS = {example["text"]: example["action"] for example in EXAMPLES}
+
+
+def small_model_fails(user_input):
+    digest = hashlib.sha256(user_input.encode("utf-8")).digest()
+    return digest[0] < 256 * SMALL_INVALID
+
+
+class StubOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        prompt = "\n".join(message["content"] for message in request["messages"])
+        user_input = re.search(r'User said: "(.*?)"', prompt, re.DOTALL).group(1)
+        analysis = json.dumps({"action": LABELS.get(user_input, "general_chat"), "add_interests": [], "remove_interests": [],
+                               "location": "", "preferred_price": "", "date": ""})
+        if request["model"] == "llama3.2":
+            time.sleep(SMALL_DELAY)
+            if small_model_fails(user_input):
+                analysis = analysis[:len(analysis) // 2] # Cut off, like a small model losing track of the schema
+        else:
+            time.sleep(LARGE_DELAY)
+
+        body = json.dumps({"message": {"role": "assistant", "content": analysis}, "done": True}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        # The agent checks /api/tags once for the small model
+        body = json.dumps({"models": [{"name": "llama3.1:latest"}, {"name": "llama3.2:latest"}]}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def run(agent, small_model_name):
+    agent.small_model_name = small_model_name
+    agent.tier_stats = TierStats()
+    correct = 0
+    started = time.perf_counter()
+    for example in EXAMPLES:
+        analysis = agent.analyze_turn(example["text"])
+        correct += analysis is not None and analysis[0] == example["action"]
+    return (time.perf_counter() - started) / len(EXAMPLES), correct, agent.tier_stats.get_stats()
+
+
+if __name__ == "__main__":
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubOllamaHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    agent = EventAgent()
+    agent.llm.base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    agent.intent_router = None
+    agent.preference_extractor = None
+    agent.response_cache = None
+
+    results = [("llama3.1 only", *run(agent, None)), ("tiered", *run(agent, "llama3.2"))]
+    server.shutdown()
+
+    print(f"{len(EXAMPLES)} messages, stub llama3.2 {SMALL_DELAY * 1000:.0f} ms ({SMALL_INVALID:.0%} invalid), "
+          f"llama3.1 {LARGE_DELAY * 1000:.0f} ms")
+    print(f"{'setup':<15}{'per turn':>10}{'small calls':>13}{'large calls':>13}{'escalated':>11}{'accuracy':>10}")
+    for name, per_turn, correct, tiers in results:
+        print(f"{name:<15}{per_turn * 1000:>7.0f} ms{tiers['small']['calls']:>13}{tiers['large']['calls']:>13}"
+              f"{tiers['escalation_rate']:>11.0%}{correct / len(EXAMPLES):>10.0%}")
+    large_time = results[1][3]["large"]["total_latency"]
+    total_time = large_time + results[1][3]["small"]["total_latency"]
+    print(f"Tiered: {1 - large_time / total_time:.0%} of the classification time on the small model, "
+          f"{results[0][1] / results[1][1]:.2f}x faster per turn")
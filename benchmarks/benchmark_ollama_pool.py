@@ -0,0 +1,155 @@
+"""
+Spread requests over several stub Ollama hosts with AsyncOllamaPool.
+
+Each stub host answers one request at a time and takes DELAY seconds per answer, like
+an Ollama that runs one generation at a time. Prints:
+  - throughput with 1, 2 and 4 hosts,
+  - what happens when one of 3 hosts goes down in the middle of a run,
+  - which host answered which model when two models are used (model affinity).
+
+Run from the repository root:
+    python benchmarks/benchmark_ollama_pool.py
+"""
+
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from async_agent import AsyncOllamaClient
+from llm_scheduler import LLMScheduler
+from ollama_pool import AsyncOllamaPool
+
+DELAY = 0.02
+REQUESTS = 400
+
+
+class StubHost:
+    """A stub Ollama host that can be taken down"""
+
+    def __init__(self):
+        self.lock = threading.Lock() # One generation at a time
+        self.down = False
+        self.models = Counter()
+        host = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def reply(self, status, data):
+                body = json.dumps(data).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if host.down:
+                    self.reply(503, {"error": "down"})
+                else:
+                    self.reply(200, {"models": [{"name": "llama3.1:latest"}, {"name": "llama3.2:latest"}]})
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                if host.down:
+                    self.reply(503, {"error": "down"})
+                    return
+                with host.lock:
+                    time.sleep(DELAY)
+                host.models[request["model"]] += 1
+                self.reply(200, {"message": {"role": "assistant", "content": "ok"}, "done": True})
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+
+def make_pool(hosts):
+    clients = [AsyncOllamaClient(host.url, scheduler=LLMScheduler(max_in_flight=2)) for host in hosts]
+    return AsyncOllamaPool(clients, probe_interval=0.5, cooldown=1.0)
+
+
+async def send(pool, count, models=("llama3.1",), concurrency=32, on_progress=None):
+    errors = 0
+    done = 0
+    queue = list(range(count))
+
+    async def worker():
+        nonlocal errors, done
+        while queue:
+            i = queue.pop()
+            try:
+                await pool.chat(models[i % len(models)], [{"role": "user", "content": f"request {i}"}])
+            except Exception:
+                errors += 1
+            done += 1
+            if on_progress:
+                on_progress(done)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - started, errors
+
+
+async def scaling(hosts):
+    print("Throughput:")
+    base = None
+    for count in [1, 2, 4]:
+        pool = make_pool(hosts[:count])
+        await pool.probe_all()
+        elapsed, errors = await send(pool, REQUESTS)
+        await pool.close()
+        rate = REQUESTS / elapsed
+        base = base or rate
+        print(f"  {count} host(s): {rate:6.0f} requests/s ({rate / base:.2f}x), errors: {errors}")
+
+
+async def failover(hosts):
+    pool = make_pool(hosts[:3])
+    await pool.probe_all()
+
+    def take_down(done):
+        if done == REQUESTS // 3:
+            hosts[0].down = True
+
+    elapsed, errors = await send(pool, REQUESTS, on_progress=take_down)
+    stats = pool.get_stats()
+    await pool.close()
+    hosts[0].down = False
+    print(f"One of 3 hosts down after {REQUESTS // 3} of {REQUESTS} requests: errors {errors}, "
+          f"retried on another host {stats['retries']}, {REQUESTS / elapsed:.0f} requests/s")
+    for backend in stats["backends"]:
+        print(f"  {backend['url']}: circuit {backend['circuit']}, failures {backend['failures']}, "
+              f"opened {backend['circuit_opened']}x")
+
+
+async def affinity(hosts):
+    for host in hosts:
+        host.models.clear()
+    pool = make_pool(hosts[:2])
+    await pool.probe_all()
+    await send(pool, 100, models=("llama3.1", "llama3.2"), concurrency=2)
+    await pool.close()
+    print("Two models, two hosts, low load:")
+    for i, host in enumerate(hosts[:2]):
+        print(f"  host {i + 1}: {dict(host.models)}")
+
+
+if __name__ == "__main__":
+    hosts = [StubHost() for _ in range(4)]
+    print(f"Stub hosts answer one request at a time, {DELAY * 1000:.0f} ms each")
+    asyncio.run(scaling(hosts))
+    asyncio.run(failover(hosts))
+    asyncio.run(affinity(hosts))
+    for host in hosts:
+        host.server.shutdown()
@@ -0,0 +1,84 @@
+"""
+Compare turn latencies with and without the LLMScheduler as the load rises.
+
+Ollama is simulated in-process: it generates PARALLEL answers at once and queues the
+rest in arrival order. Each turn makes one short classification call and then one long
+chat call. Turns arrive at random (Poisson) at a share of the simulated capacity.
+Without the scheduler everything goes straight into Ollama's queue; with it, the
+classification calls go first and requests that can't start in time are dropped.
+
+Run from the repository root:
+    python benchmarks/benchmark_scheduler.py
+"""
+
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm_scheduler import LLMScheduler, LLMOverloaded, CLASSIFY, CHAT
+
+PARALLEL = 4
+CLASSIFY_TIME = 0.02
+CHAT_TIME = 0.2
+DURATION = 5.0
+LOADS = [0.5, 0.9, 1.2, 2.0] # Share of the capacity
+CAPACITY = PARALLEL / (CLASSIFY_TIME + CHAT_TIME) # Turns per second
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(int(len(values) * share), len(values) - 1)] if values else 0.0
+
+
+async def run_load(load, use_scheduler):
+    ollama = asyncio.Semaphore(PARALLEL)
+    scheduler = LLMScheduler(max_in_flight=PARALLEL, deadlines={CLASSIFY: 1.0, CHAT: 2.0}) if use_scheduler else None
+    decisions, turns, dropped = [], [], [0]
+
+    async def call(priority, session, seconds):
+        if scheduler:
+            await scheduler.acquire(priority, session)
+        started = time.perf_counter()
+        try:
+            async with ollama:
+                await asyncio.sleep(seconds)
+        finally:
+            if scheduler:
+                scheduler.release(time.perf_counter() - started)
+
+    async def turn(session):
+        started = time.perf_counter()
+        try:
+            await call(CLASSIFY, session, CLASSIFY_TIME)
+            decisions.append(time.perf_counter() - started)
+            await call(CHAT, session, CHAT_TIME)
+            turns.append(time.perf_counter() - started)
+        except LLMOverloaded:
+            dropped[0] += 1
+
+    rng = random.Random(1)
+    tasks = []
+    started = time.perf_counter()
+    session = 0
+    while time.perf_counter() - started < DURATION:
+        tasks.append(asyncio.create_task(turn(session % 50)))
+        session += 1
+        await asyncio.sleep(rng.expovariate(load * CAPACITY))
+    await asyncio.gather(*tasks)
+    return len(tasks), decisions, turns, dropped[0]
+
+
+if __name__ == "__main__":
+    print(f"Simulated Ollama: {PARALLEL} parallel, classification {CLASSIFY_TIME * 1000:.0f} ms, "
+          f"chat {CHAT_TIME * 1000:.0f} ms, capacity {CAPACITY:.1f} turns/s")
+    print(f"{'load':>5} {'mode':<11}{'turns':>7}{'dropped':>9}{'decision p95':>14}{'turn p50':>10}{'turn p95':>10}")
+    for load in LOADS:
+        for use_scheduler in [False, True]:
+            total, decisions, turns, dropped = asyncio.run(run_load(load, use_scheduler))
+            mode = "scheduler" if use_scheduler else "direct"
+            print(f"{load:>4.0%} {mode:<11}{total:>7}{dropped:>9}{percentile(decisions, 0.95) * 1000:>11.0f} ms"
+                  f"{percentile(turns, 0.5) * 1000:>7.0f} ms{percentile(turns, 0.95) * 1000:>7.0f} ms")
@@ -0,0 +1,80 @@
+"""
+Compare scoring the catalog event by event (score_event + heap) with the NumPy BatchScorer.
+
+Generates synthetic events over the venues and organizers from the knowledge graph,
+checks that both give the same top events, and prints the time per suggest call.
+
+Run from the repository root:
+    python benchmarks/benchmark_scoring.py
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from final_version import EventAgent
+from event_scorer import BatchScorer
+
+SIZES = [10_000, 100_000, 1_000_000]
+PREFERENCES = [
+    {"interests": ["music"], "location": "Ljubljana", "preferred_price": "affordable", "date": ""},
+    {"interests": ["technology", "history"], "location": "", "preferred_price": "moderate", "date": ""},
+    {"interests": [], "location": "Maribor", "preferred_price": "", "date": ""}
+]
+
+
+def synthetic_events(count, knowledge_graph):
+    rng = random.Random(42)
+    categories = knowledge_graph["interests"]
+    venues = list(knowledge_graph["venues"])
+    organizers = list(knowledge_graph["organizers"])
+    return [
+        {
+            "id": str(i + 1),
+            "name": f"Event {i + 1}",
+            "category": rng.choice(categories),
+            "date": f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "organizer": rng.choice(organizers),
+            "venue": rng.choice(venues),
+            "price": rng.randint(0, 120)
+        }
+        for i in range(count)
+    ]
+
+
+def timed(function):
+    started = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - started
+
+
+if __name__ == "__main__":
+    agent = EventAgent()
+    print(f"{'events':>10}{'score_event':>14}{'numpy build':>14}{'numpy query':>14}{'speedup':>10}")
+
+    for size in SIZES:
+        events = synthetic_events(size, agent.knowledge_graph)
+        scorer = BatchScorer(agent.knowledge_graph, agent.score_weights)
+        _, build_time = timed(lambda: scorer.build(events))
+
+        python_time = 0.0
+        numpy_time = 0.0
+        for preferences in PREFERENCES:
+            agent.user_preferences = preferences
+            expected, elapsed = timed(lambda: agent.top_k_events(events, 3))
+            python_time += elapsed
+            indexes, elapsed = timed(lambda: scorer.top_k(events, preferences, 3, radius_km=agent.location_radius_km))
+            numpy_time += elapsed
+
+            # Same events, same scores, same order
+            expected = [(event["id"], score) for score, _, event in expected]
+            actual = [(events[i]["id"], agent.score_event(events[i])[0]) for i in indexes]
+            assert actual == expected, f"{size} events, {preferences}: {actual} != {expected}"
+
+        python_time /= len(PREFERENCES)
+        numpy_time /= len(PREFERENCES)
+        print(f"{size:>10}{python_time * 1000:>11.1f} ms{build_time * 1000:>11.1f} ms"
+              f"{numpy_time * 1000:>11.1f} ms{python_time / numpy_time:>9.1f}x")
@@ -0,0 +1,120 @@
+"""
+Run many conversations at once against agent_server.py.
+
+Starts the stub Ollama server from benchmark_async_turn.py and the agent server on free
+ports, then opens SESSIONS sessions that each send TURNS over HTTP at the same time
+(half of them over WebSocket). Prints the turn latencies, how many LLM requests ran
+at once, and the memory a session costs.
+
+Run from the repository root:
+    python benchmarks/benchmark_server.py [sessions]
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from http.server import ThreadingHTTPServer
+
+import aiohttp
+from aiohttp import web
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import benchmark_async_turn
+from benchmark_async_turn import StubOllamaHandler
+from async_agent import AsyncEventAgent
+from agent_server import AgentServer
+
+SESSIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+LLM_CONCURRENCY = 16
+TURNS = ["Hi!", "I like music and I live in Ljubljana", "Show me some events", "Tell me a joke about concerts"]
+
+
+async def http_conversation(client, url, latencies):
+    async with client.post(f"{url}/sessions") as response:
+        session_id = (await response.json())["session_id"]
+    for user_input in TURNS:
+        started = time.perf_counter()
+        async with client.post(f"{url}/sessions/{session_id}/messages", json={"message": user_input}) as response:
+            response.raise_for_status()
+            await response.json()
+        latencies.append(time.perf_counter() - started)
+
+
+async def websocket_conversation(client, url, latencies):
+    async with client.post(f"{url}/sessions") as response:
+        session_id = (await response.json())["session_id"]
+    async with client.ws_connect(f"{url}/sessions/{session_id}/ws") as ws:
+        for user_input in TURNS:
+            started = time.perf_counter()
+            await ws.send_str(user_input)
+            while (await ws.receive_json())["type"] != "done":
+                pass
+            latencies.append(time.perf_counter() - started)
+
+
+async def run_benchmark(server):
+    runner = web.AppRunner(server.create_app())
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+
+    latencies = []
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*[
+            (http_conversation if i % 2 else websocket_conversation)(client, url, latencies) for i in range(SESSIONS)
+        ])
+        elapsed = time.perf_counter() - started
+        async with client.get(f"{url}/stats") as response:
+            stats = await response.json()
+
+    await runner.cleanup()
+    return elapsed, sorted(latencies), stats
+
+
+def session_memory(server, count):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    sessions = [server.create_session() for _ in range(count)]
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    for session in sessions:
+        server.end_session(session.session_id)
+    return used / count
+
+
+if __name__ == "__main__":
+    benchmark_async_turn.LLM_DELAY = 0.05
+    stub = ThreadingHTTPServer(("127.0.0.1", 0), StubOllamaHandler)
+    threading.Thread(target=stub.serve_forever, daemon=True).start()
+
+    with open(os.devnull, "w") as devnull:
+        stdout, sys.stdout = sys.stdout, devnull # The agent prints every decision
+        try:
+            agent = AsyncEventAgent()
+            agent.llm.base_url = f"http://127.0.0.1:{stub.server_address[1]}"
+            server = AgentServer(agent, llm_concurrency=LLM_CONCURRENCY, max_sessions=SESSIONS * 2)
+            elapsed, latencies, stats = asyncio.run(run_benchmark(server))
+            per_session = session_memory(server, SESSIONS)
+        finally:
+            sys.stdout = stdout
+    stub.shutdown()
+
+    turns = len(latencies)
+    print(f"{SESSIONS} sessions x {len(TURNS)} turns, stub LLM delay {benchmark_async_turn.LLM_DELAY * 1000:.0f} ms, "
+          f"at most {LLM_CONCURRENCY} LLM requests at once")
+    print(f"Total: {elapsed:.2f} s, {turns / elapsed:.0f} turns/s")
+    print(f"Turn latency: p50 {latencies[turns // 2] * 1000:.0f} ms, p95 {latencies[int(turns * 0.95)] * 1000:.0f} ms, "
+          f"max {latencies[-1] * 1000:.0f} ms")
+    scheduler = stats["llm"]["backends"][0]["llm"]["scheduler"]
+    print(f"LLM calls: {stats['llm']['calls']}, peak in flight: {scheduler['peak_in_flight']}, "
+          f"peak waiting: {scheduler['peak_depth']}, dropped: {scheduler['rejected'] + scheduler['expired'] + scheduler['shed']}, "
+          f"errors: {stats['llm']['errors']}")
+    print(f"Memory per session: {per_session / 1024:.1f} KB")
@@ -0,0 +1,125 @@
+"""
+Measure the session store: what a turn costs on the request path, resuming, compaction,
+and how much a crash loses.
+
+  - save() (write-behind) vs. committing every turn to SQLite right away,
+  - loading sessions back and checking they match what was saved,
+  - how many turns stay on disk when old turns are folded into the summary,
+  - a child process that saves a turn every TURN_INTERVAL seconds and crashes;
+    the turns it loses have to fit in the flush interval.
+
+Run from the repository root:
+    python benchmarks/benchmark_session_store.py
+"""
+
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from conversation import ConversationContext
+from session_store import SessionStore
+
+SESSIONS = 1000
+TURNS = 10
+FLUSH_INTERVAL = 0.5
+TURN_INTERVAL = 0.01
+PREFERENCES = {"interests": ["music", "theater"], "location": "Ljubljana", "preferred_price": "moderate", "date": ""}
+
+
+def conversations(max_tokens=1500):
+    for i in range(SESSIONS):
+        yield f"session-{i}", ConversationContext(max_tokens=max_tokens, summarize=lambda summary, turns: "Likes music.")
+
+
+def write_behind(path):
+    store = SessionStore(path, flush_interval=FLUSH_INTERVAL)
+    contexts = dict(conversations())
+    elapsed = 0.0
+    for turn in range(TURNS):
+        for session_id, context in contexts.items():
+            context.add_turn(f"Message {turn} of {session_id}", "Here are some events for you: " + "x" * 200)
+            started = time.perf_counter()
+            store.save(session_id, PREFERENCES, context)
+            elapsed += time.perf_counter() - started
+    store.close()
+    return elapsed / (SESSIONS * TURNS), store.get_stats(), contexts
+
+
+def write_through(path):
+    db = sqlite3.connect(path)
+    db.execute("CREATE TABLE turns (session_id TEXT, number INTEGER, user_input TEXT, agent_response TEXT, preferences TEXT)")
+    started = time.perf_counter()
+    for turn in range(TURNS):
+        for i in range(SESSIONS):
+            db.execute("INSERT INTO turns VALUES (?, ?, ?, ?, ?)",
+                       (f"session-{i}", turn, "Message", "Here are some events for you: " + "x" * 200, json.dumps(PREFERENCES)))
+            db.commit()
+    db.close()
+    return (time.perf_counter() - started) / (SESSIONS * TURNS)
+
+
+def crash_child(path):
+    store = SessionStore(path, flush_interval=FLUSH_INTERVAL)
+    context = ConversationContext()
+    while True:
+        context.add_turn("Hi", "Hello")
+        store.save("crash", PREFERENCES, context)
+        print(context.turn_count, flush=True)
+        if context.turn_count * TURN_INTERVAL >= 3 * FLUSH_INTERVAL + 0.25:
+            os._exit(1) # No close, no last flush
+        time.sleep(TURN_INTERVAL)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "--crash":
+        crash_child(sys.argv[2])
+
+    with tempfile.TemporaryDirectory() as directory:
+        per_save, stats, contexts = write_behind(os.path.join(directory, "sessions.sqlite"))
+        per_commit = write_through(os.path.join(directory, "naive.sqlite"))
+        print(f"{SESSIONS} sessions x {TURNS} turns")
+        print(f"Request path per turn: write-behind save {per_save * 1e6:.1f} µs, "
+              f"commit every turn {per_commit * 1e6:.1f} µs ({per_commit / per_save:.0f}x)")
+        print(f"Writer: {stats['flushes']} flushes, {stats['turns_written']} turns, "
+              f"avg {stats['avg_flush_time'] * 1000:.1f} ms per flush")
+
+        store = SessionStore(os.path.join(directory, "sessions.sqlite"))
+        started = time.perf_counter()
+        states = {session_id: store.load(session_id) for session_id in contexts}
+        per_load = (time.perf_counter() - started) / SESSIONS
+        matching = 0
+        for session_id, context in contexts.items():
+            restored = ConversationContext()
+            restored.restore(states[session_id]["summary"], states[session_id]["turns"], states[session_id]["turn_count"])
+            matching += restored.get_context() == context.get_context() and states[session_id]["preferences"] == PREFERENCES
+        store.close()
+        print(f"Resume: {per_load * 1000:.2f} ms per session, {matching}/{SESSIONS} match what was saved")
+
+        # Small context: old turns are folded into the summary and deleted from the file
+        path = os.path.join(directory, "compacted.sqlite")
+        store = SessionStore(path, flush_interval=FLUSH_INTERVAL)
+        for session_id, context in conversations(max_tokens=300):
+            for turn in range(TURNS):
+                context.add_turn(f"Message {turn}", "Here are some events for you: " + "x" * 200)
+                store.save(session_id, PREFERENCES, context)
+            kept = len(context.turns)
+        store.close()
+        rows = sqlite3.connect(path).execute("SELECT COUNT(*) FROM turns").fetchone()[0]
+        print(f"Compaction: {rows / SESSIONS:.1f} turns per session on disk of {TURNS} "
+              f"(the context keeps {kept}, the rest is in the summary)")
+
+        path = os.path.join(directory, "crash.sqlite")
+        child = subprocess.run([sys.executable, __file__, "--crash", path], capture_output=True, text=True)
+        saved = int(child.stdout.split()[-1])
+        store = SessionStore(path)
+        recovered = store.load("crash")["turn_count"]
+        store.close()
+        lost = saved - recovered
+        print(f"Crash: {saved} turns saved, {recovered} recovered, lost {lost} "
+              f"(~{lost * TURN_INTERVAL * 1000:.0f} ms of turns, flush interval {FLUSH_INTERVAL * 1000:.0f} ms)")
@@ -0,0 +1,60 @@
+"""
+Compare loading the catalog from JSON with opening a binary snapshot.
+
+Writes synthetic catalogs of growing size as JSON and as snapshots, then times
+loading each one and answering the first suggest_events with the NumPy scorer.
+Checks that both give the same top events.
+
+Run from the repository root:
+    python benchmarks/benchmark_snapshot.py
+"""
+
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from final_version import EventAgent
+from event_store import EventStore, Event
+from event_snapshot import write_snapshot
+from benchmark_scoring import synthetic_events, timed, PREFERENCES
+
+SIZES = [10_000, 100_000, 1_000_000]
+
+
+def first_suggestion(agent, store):
+    agent.event_store = store
+    started = time.perf_counter()
+    store.as_dicts() # Load or open the catalog
+    load_time = time.perf_counter() - started
+    agent.user_preferences = PREFERENCES[0]
+    with contextlib.redirect_stdout(io.StringIO()): # suggest_events prints what it found
+        top_events = agent.suggest_events()
+    return [(event["id"], event["score"]) for event in top_events], load_time, time.perf_counter() - started
+
+
+if __name__ == "__main__":
+    agent = EventAgent()
+    agent.current_date = "2025-01-01" # The synthetic events are in 2025, none should be over
+    print(f"{'events':>10}{'json load':>12}{'json first':>12}{'snap load':>12}{'snap first':>12}{'write':>10}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        for size in SIZES:
+            events = synthetic_events(size, agent.knowledge_graph)
+            json_path = os.path.join(directory, f"events_{size}.json")
+            snapshot_path = os.path.join(directory, f"events_{size}.evsnap")
+            with open(json_path, 'w', encoding='utf-8') as file:
+                json.dump(events, file, indent=4)
+            _, write_time = timed(lambda: write_snapshot(snapshot_path, [Event.from_dict(event) for event in events], agent.knowledge_graph))
+
+            expected, json_load, json_first = first_suggestion(agent, EventStore(json_path, agent.knowledge_graph))
+            actual, snapshot_load, snapshot_first = first_suggestion(agent, EventStore(snapshot_path, agent.knowledge_graph))
+            assert actual == expected, f"{size} events: {actual} != {expected}"
+
+            print(f"{size:>10}{json_load * 1000:>9.1f} ms{json_first * 1000:>9.1f} ms"
+                  f"{snapshot_load * 1000:>9.1f} ms{snapshot_first * 1000:>9.1f} ms{write_time:>8.1f} s")
@@ -0,0 +1,123 @@
+import hashlib
+import json
+from event_store import Event
+from eventim.eventim_API_example import EventimAPI
+
+# Eventim category names -> the agent's interests
+CATEGORY_MAP = {
+    "Rock & pop": "music",
+    "Metal": "music",
+    "Glasba": "music",
+    "Gledališče": "theater",
+    "Komedija": "theater",
+    "Kultura": "theater",
+    "Šport": "sports",
+    "Razstava": "history"
+}
+
+
+def event_from_product(details):
+    """Map Eventim event details (from EventimAPI.get_event_details) to the agent's event schema"""
+    category = "other"
+    # Subcategories come after their parent, so look at the most specific ones first
+    for name in reversed(details.get("categories") or []):
+        if name in CATEGORY_MAP:
+            category = CATEGORY_MAP[name]
+            break
+
+    location = details.get("location") or {}
+    coordinates = location.get("geoLocation") or {}
+    start_date = (details.get("startDate") or "")[:10]
+    end_date = (details.get("endDate") or "")[:10]
+    return Event(
+        id=str(details["productId"]),
+        name=details.get("name") or "",
+        category=category,
+        date=start_date,
+        organizer="", # Eventim doesn't tell us the organizer
+        venue=location.get("name") or "",
+        price=details.get("price"), # None when Eventim doesn't list a price
+        end_date=end_date if end_date > start_date else "", # Only for events running several days
+        latitude=coordinates.get("latitude"),
+        longitude=coordinates.get("longitude")
+    )
+
+
+class CatalogSync:
+    """Keeps an EventStore in sync with the Eventim catalog.
+
+    Every product's mapped record is hashed. On each run only new products,
+    products whose hash changed, and products that disappeared or sold out are
+    applied to the store and the knowledge graph, everything else is skipped.
+    """
+
+    def __init__(self, event_store, knowledge_graph, api=None):
+        self.event_store = event_store
+        self.knowledge_graph = knowledge_graph
+        self.api = api or EventimAPI()
+        self.hashes = {} # productId -> hash of the record in the store
+
+    def content_hash(self, event, city):
+        record = json.dumps([event.to_dict(), city], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(record.encode("utf-8")).hexdigest()
+
+    def run(self):
+        """Fetch the catalog and apply only the differences, return what changed"""
+        stats = {"added": 0, "changed": 0, "removed": 0, "unchanged": 0}
+        seen = set()
+        venues = self.knowledge_graph.setdefault("venues", {})
+        cities = self.knowledge_graph.setdefault("cities", {})
+        self.event_store.get_events() # Make sure a file-backed store is loaded before we change it
+
+        for product in self.api.fetch_all_events():
+            details = self.api.get_event_details(product)
+            if details["status"] == "SoldOut" or details["inStock"] is False:
+                continue # Treated like a removed product below
+
+            event = event_from_product(details)
+            city = (details.get("location") or {}).get("city") or ""
+            seen.add(event.id)
+
+            content_hash = self.content_hash(event, city)
+            previous_hash = self.hashes.get(event.id)
+            # Also check the store, in case it was reloaded from its file since the last run
+            if previous_hash == content_hash and event.id in self.event_store.events_by_id:
+                stats["unchanged"] += 1
+                continue
+
+            # The store finds each event's city through the knowledge graph venues
+            if event.venue and event.venue not in venues:
+                venues[event.venue] = {"location": city, "type": "eventim venue"}
+            # Cities we have no centre for get the first event's coordinates, close enough for radius search
+            if city and city not in cities and event.latitude is not None and event.longitude is not None:
+                cities[city] = {"latitude": event.latitude, "longitude": event.longitude}
+
+            self.event_store.add_event(event)
+            self.hashes[event.id] = content_hash
+            stats["changed" if previous_hash else "added"] += 1
+
+        for product_id in list(self.hashes):
+            if product_id not in seen:
+                self.event_store.remove_event(product_id)
+                del self.hashes[product_id]
+                stats["removed"] += 1
+
+        return stats
+
+
+if __name__ == "__main__":
+    import os
+    import sys
+    from event_store import EventStore
+
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    with open(os.path.join(script_dir, "resources", "knowledge_graph.json"), 'r', encoding='utf-8') as file:
+        knowledge_graph = json.load(file)
+
+    # Pass the stub server URL to try it without the network, e.g. http://127.0.0.1:8765/products
+    api = EventimAPI(base_url=sys.argv[1]) if len(sys.argv) > 1 else EventimAPI()
+    store = EventStore(knowledge_graph=knowledge_graph)
+    sync = CatalogSync(store, knowledge_graph, api)
+
+    print(f"First sync: {sync.run()}, {len(store)} events")
+    print(f"Second sync: {sync.run()}, {len(store)} events")
@@ -0,0 +1,97 @@
+from collections import deque
+
+
+def estimate_tokens(text):
+    # Rough estimate, llama tokenizers average about 4 characters per token for English
+    return len(text) // 4 + 1
+
+
+class ConversationContext:
+    """Conversation history for prompts, kept within a token budget.
+
+    Recent turns are kept word for word. When they go over max_tokens, the oldest
+    turns are evicted (down to low_watermark of the budget, so this happens rarely)
+    and, if a summarize function is given, folded into a rolling summary.
+    The rendered context is cached, so a new turn only renders its own lines.
+    """
+
+    def __init__(self, max_tokens=1500, low_watermark=0.75, summarize=None):
+        self.max_tokens = max_tokens
+        self.low_watermark = low_watermark
+        self.summarize = summarize # summarize(previous_summary, evicted_text) -> new summary
+        self.turns = deque() # Recent turns as {"user": ..., "agent": ...}
+        self.rendered_turns = deque() # (rendered text, tokens) for each turn in self.turns
+        self.turn_count = 0
+        self.tokens = 0
+        self.summary = ""
+        self.cached_context = ""
+
+    def render_turn(self, number, turn):
+        return f"{number}. User: {turn['user']}\n   Agent: {turn['agent']}...\n"
+
+    def add_turn(self, user_input, agent_response):
+        """Add conversation turn to the context"""
+        turn = {"user": user_input, "agent": agent_response}
+        self.turn_count += 1
+        rendered = self.render_turn(self.turn_count, turn)
+        tokens = estimate_tokens(rendered)
+
+        self.turns.append(turn)
+        self.rendered_turns.append((rendered, tokens))
+        self.tokens += tokens
+
+        if self.tokens + estimate_tokens(self.summary) > self.max_tokens:
+            self.evict()
+        else:
+            # Only the new turn is rendered, the rest of the context stays cached
+            self.cached_context += rendered
+
+    def evict(self):
+        """Drop the oldest turns until the context is under the low watermark"""
+        target = self.max_tokens * self.low_watermark
+        evicted = []
+        # Always keep the latest turn, even if it alone is over the budget
+        while len(self.turns) > 1 and self.tokens + estimate_tokens(self.summary) > target:
+            self.turns.popleft()
+            rendered, tokens = self.rendered_turns.popleft()
+            self.tokens -= tokens
+            evicted.append(rendered)
+
+        if evicted and self.summarize:
+            self.summary = self.summarize(self.summary, "".join(evicted))
+
+        self.cached_context = self.render_prefix() + "".join(rendered for rendered, _ in self.rendered_turns)
+
+    def first_turn(self):
+        """Number of the oldest turn still kept word for word, the ones before it are in the summary"""
+        return self.turn_count - len(self.turns) + 1
+
+    def restore(self, summary, turns, turn_count):
+        """Continue a saved conversation: turns are (number, user_input, agent_response), oldest first"""
+        self.clear()
+        self.summary = summary
+        self.turn_count = turn_count
+        for number, user_input, agent_response in turns:
+            turn = {"user": user_input, "agent": agent_response}
+            rendered = self.render_turn(number, turn)
+            self.turns.append(turn)
+            self.rendered_turns.append((rendered, estimate_tokens(rendered)))
+            self.tokens += self.rendered_turns[-1][1]
+        self.cached_context = self.render_prefix() + "".join(rendered for rendered, _ in self.rendered_turns)
+
+    def render_prefix(self):
+        if not self.summary:
+            return ""
+        return f"Summary of the earlier conversation: {self.summary}\n"
+
+    def get_context(self):
+        """Get conversation history context"""
+        return self.cached_context
+
+    def clear(self):
+        self.turns.clear()
+        self.rendered_turns.clear()
+        self.turn_count = 0
+        self.tokens = 0
+        self.summary = ""
+        self.cached_context = ""
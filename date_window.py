@@ -0,0 +1,121 @@
+import re
+from datetime import date, timedelta
+
+# English and Slovenian month names, with the common abbreviations and Slovenian cases
+MONTHS = {}
+for number, names in enumerate([
+    "january jan januar januarja", "february feb februar februarja", "march mar marec marca",
+    "april apr aprila", "may maj maja", "june jun junij junija", "july jul julij julija",
+    "august aug avgust avg avgusta", "september sep sept septembra", "october oct oktober okt oktobra",
+    "november nov novembra", "december dec decembra"
+], 1):
+    MONTHS.update(dict.fromkeys(names.split(), number))
+WORD = r"([a-zčšž]+)"
+# Month words that are also ordinary words ("may", "nov" is Slovenian for new), only a month after "in"
+AMBIGUOUS_MONTHS = {"may", "maj", "maja", "mar", "nov", "jan", "feb", "apr", "jun", "jul", "aug", "avg", "sep", "sept", "oct", "okt", "dec"}
+# Whole words only, so "weekends", "weekly" or "monthly" aren't read as this weekend, week or month
+TODAY = {"today", "tonight", "danes", "nocoj"}
+TOMORROW = {"tomorrow", "jutri"}
+WEEKEND = {"weekend", "vikend", "vikenda", "vikendu"}
+WEEK = {"week", "teden", "tedna", "tednu"}
+MONTH = {"month", "mesec", "mesecu"}
+# Windows in the past ("last month") aren't something to look for events in
+PAST = {"last", "past", "previous", "prejšnji", "prejšnja", "prejšnjo", "prejšnjem", "prejšnjega", "lani"}
+
+
+def month_window(year, month):
+    start = date(year, month, 1)
+    end = date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+    return start, end
+
+
+def parse_window(text, today):
+    """Turn what the user said about dates into (first_day, last_day) as dates, None if unknown"""
+    text = text.strip().lower()
+
+    # 2025-11-20 to 2025-11-23, as the preference extractor stores windows
+    match = re.search(r"(\d{4}-\d{2}-\d{2})\s*(?:to|do|-|–)\s*(\d{4}-\d{2}-\d{2})", text)
+    if match:
+        return date.fromisoformat(match.group(1)), date.fromisoformat(match.group(2))
+
+    match = re.search(r"(\d{4})-(\d{2})-(\d{2})", text)
+    if match:
+        day = date(*map(int, match.groups()))
+        return day, day
+
+    # 20.11.2025, 20. 11. or 20.11.
+    match = re.search(r"(\d{1,2})\.\s*(\d{1,2})\.\s*(\d{4})?", text)
+    if match:
+        day, month = int(match.group(1)), int(match.group(2))
+        year = int(match.group(3)) if match.group(3) else today.year
+        day = date(year, month, day)
+        if not match.group(3) and day < today:
+            day = day.replace(year=year + 1)
+        return day, day
+
+    words = set(re.findall(WORD, text))
+    if words & PAST:
+        return None
+    if words & TODAY:
+        return today, today
+    if words & TOMORROW:
+        return today + timedelta(days=1), today + timedelta(days=1)
+
+    match = re.search(r"\b(?:next|naslednjih)\s+(\d+)\s+(?:days|dni)\b", text)
+    if match:
+        return today, today + timedelta(days=int(match.group(1)) - 1)
+
+    next_one = "next" in words or any(word.startswith(("naslednj", "prihodnj")) for word in words)
+    if words & WEEKEND:
+        saturday = today + timedelta(days=(5 - today.weekday()) % 7)
+        if today.weekday() == 6:
+            saturday = today - timedelta(days=1) # Sunday is still this weekend
+        if next_one:
+            saturday += timedelta(days=7)
+        return saturday, saturday + timedelta(days=1)
+    if words & WEEK:
+        monday = today - timedelta(days=today.weekday()) + timedelta(days=7 if next_one else 0)
+        return monday, monday + timedelta(days=6)
+    if words & MONTH:
+        month = today.month + (1 if next_one else 0)
+        return month_window(today.year + (month - 1) // 12, (month - 1) % 12 + 1)
+
+    # "November 20", "20 November", "20. novembra", or only "November"
+    # the first number next to a month word, so "3 concerts on 20 november" is the 20th
+    day, month = next(((m.group(1), m.group(2)) for m in re.finditer(r"(\d{1,2})\.?\s+" + WORD, text)
+                       if m.group(2) in MONTHS), (None, None))
+    if not day:
+        day, month = next(((m.group(2), m.group(1)) for m in re.finditer(WORD + r"\s+(\d{1,2})\b", text)
+                           if m.group(1) in MONTHS), (None, None))
+    if day:
+        day = date(today.year, MONTHS[month], int(day))
+        if day < today:
+            day = day.replace(year=today.year + 1)
+        return day, day
+    words = re.findall(WORD, text)
+    for i, word in enumerate(words):
+        if word in MONTHS and (word not in AMBIGUOUS_MONTHS or (i > 0 and words[i - 1] in ("in", "v", "during", "meseca"))):
+            year = today.year if MONTHS[word] >= today.month else today.year + 1
+            return month_window(year, MONTHS[word])
+
+    return None
+
+
+def date_window(text, current_date):
+    """Like parse_window, with ISO date strings in and out: ("2025-11-22", "2025-11-23") or None"""
+    if not text:
+        return None
+    try:
+        window = parse_window(text, date.fromisoformat(current_date))
+    except ValueError: # A day that doesn't exist, like 31.2.
+        return None
+    if window is None:
+        return None
+    return window[0].isoformat(), window[1].isoformat()
+
+
+def overlaps(start, end, window):
+    """True if an event from start to end (ISO dates, end "" for one day) falls into the window"""
+    if not start:
+        return False
+    return start <= window[1] and (end or start) >= window[0]
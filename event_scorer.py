@@ -0,0 +1,166 @@
+from dataclasses import dataclass
+import numpy as np
+from event_store import event_id_key
+from event_snapshot import SnapshotEvents
+from geo_index import city_centroid, distances_km, event_coordinates
+
+
+@dataclass(frozen=True, slots=True)
+class Columns:
+    """The encoded catalog. Never changed once built, a new catalog gets new Columns."""
+    source: object # The events list the columns were built from
+    category_codes: dict
+    city_codes: dict
+    category: np.ndarray
+    city: np.ndarray
+    price: np.ndarray
+    follows: np.ndarray
+    latitude: np.ndarray
+    longitude: np.ndarray
+    rank: np.ndarray # Position of every event when ordered by date, then id, used to break ties
+
+
+class BatchScorer:
+    """Scores the whole catalog at once with NumPy.
+
+    Category, city (from the venue), coordinates, price and "organizer is followed" are encoded
+    as NumPy columns once per catalog, then every score is a handful of vectorized
+    operations against the current user preferences. Gives the same scores as
+    EventAgent.score_event.
+
+    Sessions of the server score from several threads at once. A new catalog is encoded
+    into new Columns that replace the old ones in one assignment, and every top_k call
+    reads self.columns once, so it never sees half-built columns.
+    """
+
+    def __init__(self, knowledge_graph, weights):
+        self.knowledge_graph = knowledge_graph
+        self.weights = weights # {"interest": 3, "location": 3, "price": 2, "organizer": 2}
+        self.columns = None # Columns of the last catalog scored
+
+    def build(self, events):
+        """Encode the events as columns, return the new Columns"""
+        if isinstance(events, SnapshotEvents):
+            return self.build_from_snapshot(events)
+        venues = self.knowledge_graph.get("venues", {})
+        organizers = self.knowledge_graph.get("organizers", {})
+        category_codes = {}
+        city_codes = {}
+
+        count = len(events)
+        category = np.empty(count, dtype=np.int32)
+        city = np.empty(count, dtype=np.int32)
+        price = np.empty(count, dtype=np.float64)
+        follows = np.zeros(count, dtype=bool)
+        latitude = np.full(count, np.nan)
+        longitude = np.full(count, np.nan)
+
+        for i, event in enumerate(events):
+            category[i] = category_codes.setdefault(event.get("category"), len(category_codes))
+            event_city = venues.get(event.get("venue"), {}).get("location")
+            city[i] = city_codes.setdefault(event_city, len(city_codes)) if event_city else -1
+            price[i] = event.get("price") if event.get("price") is not None else np.inf
+            follows[i] = bool(organizers.get(event.get("organizer"), {}).get("user_follows"))
+            coordinates = event_coordinates(event.get("latitude"), event.get("longitude"), event.get("venue"), self.knowledge_graph)
+            if coordinates:
+                latitude[i], longitude[i] = coordinates
+
+        # Position of every event when ordered by date, then id, used to break ties
+        dates = np.array([event.get("date", "") for event in events], dtype=str)
+        ids = [str(event.get("id")) for event in events]
+        if all(event_id.isdigit() for event_id in ids):
+            order = np.lexsort((np.array(ids, dtype=np.int64), dates))
+        else:
+            order = sorted(range(count), key=lambda i: (dates[i], event_id_key(ids[i])))
+        rank = np.empty(count, dtype=np.int64)
+        rank[order] = np.arange(count)
+
+        self.columns = Columns(events, category_codes, city_codes, category, city, price, follows, latitude, longitude, rank)
+        return self.columns
+
+    def build_from_snapshot(self, events):
+        """Use the columns of a snapshot directly, only the followed organizers are computed"""
+        snapshot = events.snapshot
+        organizers = self.knowledge_graph.get("organizers", {})
+        followed = np.array([bool(organizers.get(name, {}).get("user_follows")) for name in snapshot.dictionaries["organizer"]], dtype=bool)
+        latitude, longitude = snapshot.coordinates(self.knowledge_graph)
+        self.columns = Columns(
+            source=events,
+            category_codes={name: code for code, name in enumerate(snapshot.dictionaries["category"])},
+            city_codes={name: code for code, name in enumerate(snapshot.dictionaries["city"]) if name},
+            category=snapshot.columns["category"],
+            city=snapshot.columns["city"],
+            price=snapshot.columns["price"], # NaN never passes the price check, like np.inf
+            follows=followed[snapshot.columns["organizer"]],
+            latitude=latitude,
+            longitude=longitude,
+            rank=snapshot.columns["rank"]
+        )
+        return self.columns
+
+    def score(self, user_preferences, indexes=None, radius_km=None, columns=None):
+        """Return the scores of all events (or only the ones at indexes) as an array"""
+        encoded = columns or self.columns
+        columns = (encoded.category, encoded.city, encoded.price, encoded.follows, encoded.latitude, encoded.longitude)
+        if indexes is not None:
+            columns = [column[indexes] for column in columns]
+        category, city, price, follows, latitude, longitude = columns
+        scores = np.zeros(len(category), dtype=np.float64)
+
+        # Check interest match
+        if user_preferences.get("interests"):
+            codes = [encoded.category_codes[c] for c in user_preferences["interests"] if c in encoded.category_codes]
+            scores += self.weights["interest"] * np.isin(category, codes)
+
+        # Check location, in the city or within radius_km of its centre
+        location = user_preferences.get("location")
+        if location:
+            nearby = np.zeros(len(category), dtype=bool)
+            city_code = encoded.city_codes.get(location)
+            if city_code is not None:
+                nearby |= city == city_code
+            centroid = city_centroid(location, self.knowledge_graph)
+            if radius_km and centroid:
+                nearby |= distances_km(latitude, longitude, *centroid) <= radius_km
+            scores += self.weights["location"] * nearby
+
+        # Check price
+        limit = self.knowledge_graph.get("pricing", {}).get(user_preferences.get("preferred_price"))
+        if user_preferences.get("preferred_price") and limit is not None:
+            scores += self.weights["price"] * (price <= limit)
+
+        # Check if organizer is followed
+        scores += self.weights["organizer"] * follows
+
+        return scores
+
+    def top_k(self, events, user_preferences, k, candidates=None, radius_km=None):
+        """Return the indexes of the k best events with a positive score, best first.
+        If candidates (indexes from EventStore.find_candidates) are given, only those are scored."""
+        if k <= 0:
+            return []
+        columns = self.columns # Read once, another thread may swap in a new catalog meanwhile
+        if columns is None or events is not columns.source:
+            columns = self.build(events)
+
+        if candidates is None:
+            scores = self.score(user_preferences, radius_km=radius_km, columns=columns)
+            candidates = np.flatnonzero(scores > 0)
+            candidate_scores = scores[candidates]
+        else:
+            candidates = np.asarray(candidates, dtype=np.int64)
+            candidate_scores = self.score(user_preferences, candidates, radius_km, columns)
+            positive = candidate_scores > 0
+            candidates = candidates[positive]
+            candidate_scores = candidate_scores[positive]
+
+        # Drop everything below the k-th best score without sorting the catalog
+        if len(candidates) > k:
+            threshold = -np.partition(-candidate_scores, k - 1)[k - 1]
+            keep = candidate_scores >= threshold
+            candidates = candidates[keep]
+            candidate_scores = candidate_scores[keep]
+
+        # Sort the few that are left by score, then date, then id
+        order = np.lexsort((columns.rank[candidates], -candidate_scores))[:k]
+        return candidates[order].tolist()
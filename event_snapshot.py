@@ -0,0 +1,234 @@
+"""
+Compact binary snapshot of the event catalog, read through mmap.
+
+The file holds one column per field:
+- price, latitude and longitude (float64, NaN when unknown)
+- date and end_date (uint32 YYYYMMDD, 0 when unknown)
+- category, venue, organizer and city as dictionary codes (int32) plus their dictionaries
+- id and name as UTF-8 blobs with an offsets table
+- rank, the position of every event when ordered by date and then id
+
+Opening a snapshot only reads its small header and the dictionaries. The columns are
+NumPy views straight into the mapped file, so opening costs about the same for any
+catalog size, and processes that open the same file share its pages.
+
+Convert the JSON files with:
+    python event_snapshot.py resources/events.json resources/events.evsnap
+    python event_snapshot.py eventim/eventim_API_response.json resources/eventim.evsnap
+"""
+
+import json
+import mmap
+import os
+import struct
+import numpy as np
+from event_store import Event, event_id_key
+
+MAGIC = b"EVSNAP01"
+DICTIONARY_FIELDS = ["category", "venue", "organizer", "city"]
+STRING_FIELDS = ["id", "name"]
+
+
+def encode_date(date):
+    return int(date[:10].replace("-", "")) if date and date[:10].replace("-", "").isdigit() else 0
+
+
+def decode_date(value):
+    value = int(value)
+    return f"{value // 10000:04d}-{value // 100 % 100:02d}-{value % 100:02d}" if value else ""
+
+
+def encode_strings(values):
+    """Return (utf-8 blob, offsets), value i is blob[offsets[i]:offsets[i + 1]]"""
+    encoded = [value.encode("utf-8") for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.uint64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def write_snapshot(path, events, knowledge_graph=None, cities=None):
+    """Write Event records to a snapshot file.
+
+    The city of each event comes from cities (one per event) if given,
+    otherwise from the venue in the knowledge graph.
+    """
+    venues = (knowledge_graph or {}).get("venues", {})
+    if cities is None:
+        cities = [venues.get(event.venue, {}).get("location") or "" for event in events]
+
+    columns = {
+        "price": np.array([np.nan if event.price is None else event.price for event in events], dtype=np.float64),
+        "date": np.array([encode_date(event.date) for event in events], dtype=np.uint32),
+        "end_date": np.array([encode_date(event.end_date) for event in events], dtype=np.uint32),
+        "latitude": np.array([np.nan if event.latitude is None else event.latitude for event in events], dtype=np.float64),
+        "longitude": np.array([np.nan if event.longitude is None else event.longitude for event in events], dtype=np.float64)
+    }
+
+    for field in DICTIONARY_FIELDS:
+        values = cities if field == "city" else [getattr(event, field) for event in events]
+        dictionary = {}
+        columns[field] = np.array([dictionary.setdefault(value, len(dictionary)) for value in values], dtype=np.int32)
+        columns[f"{field}.values"], columns[f"{field}.offsets"] = encode_strings(list(dictionary))
+
+    for field in STRING_FIELDS:
+        columns[f"{field}.values"], columns[f"{field}.offsets"] = encode_strings([getattr(event, field) for event in events])
+
+    order = sorted(range(len(events)), key=lambda i: (events[i].date, event_id_key(events[i].id)))
+    columns["rank"] = np.empty(len(events), dtype=np.int64)
+    columns["rank"][order] = np.arange(len(events))
+
+    # Lay the columns out one after another, each aligned to 8 bytes
+    header = {"count": len(events), "columns": {}}
+    offset = 0
+    for name, column in columns.items():
+        offset += -offset % 8
+        header["columns"][name] = {"dtype": column.dtype.str, "offset": offset, "length": len(column)}
+        offset += column.nbytes
+    header_bytes = json.dumps(header).encode("utf-8")
+    data_start = len(MAGIC) + 8 + len(header_bytes)
+    data_start += -data_start % 8
+
+    # Write next to the target and swap it in, readers of the old file keep their mapping
+    temp_path = path + ".tmp"
+    with open(temp_path, 'wb') as file:
+        file.write(MAGIC + struct.pack("<Q", len(header_bytes)) + header_bytes)
+        for name, column in columns.items():
+            file.seek(data_start + header["columns"][name]["offset"])
+            file.write(column.tobytes())
+    os.replace(temp_path, path)
+
+
+class EventSnapshot:
+    """Read-only view of a snapshot file"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as file:
+            self.buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self.buffer[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not an event snapshot")
+        header_length = struct.unpack_from("<Q", self.buffer, len(MAGIC))[0]
+        header_end = len(MAGIC) + 8 + header_length
+        header = json.loads(self.buffer[len(MAGIC) + 8:header_end])
+        data_start = header_end + -header_end % 8
+
+        self.count = header["count"]
+        self.columns = {
+            name: np.frombuffer(self.buffer, dtype=column["dtype"], count=column["length"], offset=data_start + column["offset"])
+            for name, column in header["columns"].items()
+        }
+        # Snapshots written before events had coordinates and end dates
+        for name in ("latitude", "longitude"):
+            self.columns.setdefault(name, np.full(self.count, np.nan))
+        self.columns.setdefault("end_date", np.zeros(self.count, dtype=np.uint32))
+        # Dictionaries are small, decode them once
+        self.dictionaries = {field: self.strings(field) for field in DICTIONARY_FIELDS}
+
+    def __len__(self):
+        return self.count
+
+    def strings(self, field):
+        offsets = self.columns[f"{field}.offsets"]
+        values = self.columns[f"{field}.values"].tobytes()
+        return [values[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
+
+    def string(self, field, i):
+        offsets = self.columns[f"{field}.offsets"]
+        return self.columns[f"{field}.values"][offsets[i]:offsets[i + 1]].tobytes().decode("utf-8")
+
+    def value(self, field, i):
+        """Value of a dictionary-encoded field for event i"""
+        return self.dictionaries[field][self.columns[field][i]]
+
+    def codes(self, field, values):
+        """Dictionary codes of the given values, values that don't occur are left out"""
+        dictionary = self.dictionaries[field]
+        return [code for code, value in enumerate(dictionary) if value in values]
+
+    def coordinates(self, knowledge_graph):
+        """Latitude and longitude arrays, with the venue's coordinates for events that have none"""
+        venues = knowledge_graph.get("venues", {})
+        venue_coordinates = np.array([
+            (venues.get(venue, {}).get("latitude", np.nan), venues.get(venue, {}).get("longitude", np.nan))
+            for venue in self.dictionaries["venue"]
+        ], dtype=np.float64).reshape(-1, 2)[self.columns["venue"]]
+        latitudes, longitudes = self.columns["latitude"], self.columns["longitude"]
+        unknown = np.isnan(latitudes) | np.isnan(longitudes)
+        return np.where(unknown, venue_coordinates[:, 0], latitudes), np.where(unknown, venue_coordinates[:, 1], longitudes)
+
+    def event(self, i):
+        price = self.columns["price"][i]
+        latitude, longitude = self.columns["latitude"][i], self.columns["longitude"][i]
+        return Event(
+            id=self.string("id", i),
+            name=self.string("name", i),
+            category=self.value("category", i),
+            date=decode_date(self.columns["date"][i]),
+            end_date=decode_date(self.columns["end_date"][i]),
+            organizer=self.value("organizer", i),
+            venue=self.value("venue", i),
+            price=None if np.isnan(price) else int(price) if price.is_integer() else price.item(),
+            latitude=None if np.isnan(latitude) else latitude.item(),
+            longitude=None if np.isnan(longitude) else longitude.item()
+        )
+
+    def events(self):
+        return [self.event(i) for i in range(self.count)]
+
+
+class SnapshotEvents:
+    """The events of a snapshot as a read-only list of dicts, built when accessed"""
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+
+    def __len__(self):
+        return len(self.snapshot)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("event index out of range")
+        return self.snapshot.event(i).to_dict()
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+
+def convert_json(json_path, snapshot_path, knowledge_graph=None):
+    """Convert resources/events.json, or an Eventim API response, to a snapshot"""
+    with open(json_path, 'r', encoding='utf-8') as file:
+        data = json.load(file)
+
+    if isinstance(data, dict) and "products" in data:
+        from catalog_sync import event_from_product
+        from eventim.eventim_API_example import EventimAPI
+        api = EventimAPI()
+        details = [api.get_event_details(product) for product in data["products"]]
+        events = [event_from_product(detail) for detail in details]
+        cities = [(detail.get("location") or {}).get("city") or "" for detail in details]
+    else:
+        events = [Event.from_dict(event) for event in data]
+        cities = None
+
+    write_snapshot(snapshot_path, events, knowledge_graph, cities)
+    return len(events)
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) != 3:
+        print("Usage: python event_snapshot.py <events.json> <snapshot.evsnap>")
+        sys.exit(1)
+
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    with open(os.path.join(script_dir, "resources", "knowledge_graph.json"), 'r', encoding='utf-8') as file:
+        knowledge_graph = json.load(file)
+
+    count = convert_json(sys.argv[1], sys.argv[2], knowledge_graph)
+    print(f"Wrote {count} events to {sys.argv[2]}")
@@ -0,0 +1,382 @@
+import bisect
+import json
+import os
+import threading
+from collections import defaultdict
+from dataclasses import dataclass, asdict
+import numpy as np
+from geo_index import GeoGrid, city_centroid, distances_km, event_coordinates
+
+
+def event_id_key(event_id):
+    # Numeric ids sort as numbers ("2" before "10"), anything else as text after them
+    event_id = str(event_id)
+    return (0, int(event_id), "") if event_id.isdigit() else (1, 0, event_id)
+
+
+@dataclass(slots=True)
+class Event:
+    id: str
+    name: str
+    category: str
+    date: str
+    organizer: str
+    venue: str
+    price: float # None if the price isn't known
+    end_date: str = "" # Last day of events running for several days, "" for one-day events
+    latitude: float = None # None if the event has no coordinates, then its venue's are used
+    longitude: float = None
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            id=str(data.get("id")),
+            name=data.get("name", ""),
+            category=data.get("category", ""),
+            date=data.get("date", ""),
+            organizer=data.get("organizer", ""),
+            venue=data.get("venue", ""),
+            price=data.get("price"), # A missing price is unknown, not free
+            end_date=data.get("end_date", ""),
+            latitude=data.get("latitude"),
+            longitude=data.get("longitude")
+        )
+
+    def to_dict(self):
+        return asdict(self)
+
+    def last_day(self):
+        return max(self.date, self.end_date or "")
+
+
+class EventStore:
+    """Events loaded once from a JSON file and kept in memory.
+
+    The file is only parsed again when its modification time or size changes,
+    so asking for events costs one stat() call instead of reading and parsing JSON.
+
+    The store also keeps inverted indexes (category, city, organizer -> event ids,
+    and events sorted by price, plus a GeoGrid of their coordinates and a time index),
+    updated as events are added or removed. They let find_candidates return only the
+    events that can match the user's preferences.
+
+    The time index keeps one-day events sorted by date, and events running for several
+    days sorted by their last day. A date window is then a bisect into each list, and
+    evict_before drops the events that are over with another bisect.
+    Without a path, the store only holds the events added to it.
+
+    A path ending in .evsnap is opened as an EventSnapshot instead. Then nothing is
+    parsed up front: as_dicts, find_candidates and len work on the mapped columns,
+    and the events only become Python records when the store is changed or
+    get_events is called.
+    """
+
+    def __init__(self, path=None, knowledge_graph=None):
+        self.path = path
+        self.knowledge_graph = knowledge_graph or {} # Used to find the city of each venue
+        self.loaded = path is None
+        self.file_signature = None # (mtime, size) of the file we loaded
+        self.events_by_id = {}
+        self.events = None # Cached list of Event records
+        self.event_dicts = None # Cached list-of-dict view, built on first use
+        self.positions = None # Event id -> position in the cached lists
+        self.snapshot = None # EventSnapshot when loaded from a snapshot file
+        self.evicted_before = "" # Events that ended before this date are dropped, see evict_before
+        # Sessions of the server use the store from worker threads, every change and view is made holding it.
+        # Reentrant, so methods holding it can call each other.
+        self.lock = threading.RLock()
+        self.clear_indexes()
+
+    def is_stale(self):
+        if not self.loaded:
+            return True
+        if self.path is None:
+            return False
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return self.file_signature is not None
+        return (stat.st_mtime_ns, stat.st_size) != self.file_signature
+
+    def refresh(self):
+        """Reload the events if the file changed, return True if they were reloaded.
+        Threads asking at the same time wait for one reload instead of each doing their own."""
+        if not self.is_stale():
+            return False
+        with self.lock:
+            if not self.is_stale():
+                return False
+            self.reload()
+            return True
+
+    def reload(self):
+        """Load the events from the file"""
+        self.loaded = True
+        self.snapshot = None
+        try:
+            stat = os.stat(self.path)
+            if self.path.endswith(".evsnap"):
+                from event_snapshot import EventSnapshot
+                self.set_events([])
+                self.snapshot = EventSnapshot(self.path)
+                self.file_signature = (stat.st_mtime_ns, stat.st_size)
+                return
+            with open(self.path, 'r', encoding='utf-8') as file:
+                data = json.load(file)
+            self.set_events([Event.from_dict(event) for event in data])
+            self.file_signature = (stat.st_mtime_ns, stat.st_size)
+        except Exception as e:
+            print(f"❌ Error loading events: {e}. Using empty list.")
+            self.set_events([])
+            self.file_signature = None
+
+    def set_events(self, events):
+        with self.lock:
+            self.events_by_id = {}
+            self.clear_indexes()
+            for event in events:
+                if self.is_past(event):
+                    continue
+                self.events_by_id[event.id] = event
+                self.index_event(event, sorted_indexes=False)
+            # One sort per list instead of inserting every event into the sorted lists
+            priced = sorted((event for event in self.events_by_id.values() if event.price is not None), key=lambda event: event.price)
+            self.prices = [event.price for event in priced]
+            self.price_ids = [event.id for event in priced]
+            for dates, ids, key in self.time_indexes():
+                dated = sorted((event for event in self.events_by_id.values() if self.time_index_of(event) is dates), key=key)
+                dates[:] = [key(event) for event in dated]
+                ids[:] = [event.id for event in dated]
+            self.invalidate_views()
+
+    def materialize(self):
+        """Turn a snapshot into Python records and indexes, so the store can be changed"""
+        with self.lock:
+            self.refresh()
+            if self.snapshot is not None:
+                snapshot = self.snapshot
+                self.snapshot = None
+                self.set_events(snapshot.events())
+
+    def add_event(self, event):
+        """Add or replace one event, updating the indexes"""
+        with self.lock:
+            self.materialize()
+            if isinstance(event, dict):
+                event = Event.from_dict(event)
+            if event.id in self.events_by_id:
+                self.unindex_event(self.events_by_id[event.id])
+            self.events_by_id[event.id] = event
+            self.index_event(event)
+            self.invalidate_views()
+
+    def remove_event(self, event_id):
+        """Remove one event, updating the indexes"""
+        with self.lock:
+            self.materialize()
+            event = self.events_by_id.pop(str(event_id), None)
+            if event is not None:
+                self.unindex_event(event)
+                self.invalidate_views()
+            return event
+
+    def invalidate_views(self):
+        self.events = None
+        self.event_dicts = None
+        self.positions = None
+
+    def clear_indexes(self):
+        self.by_category = defaultdict(set)
+        self.by_city = defaultdict(set)
+        self.by_organizer = defaultdict(set)
+        # Prices in ascending order, with the matching event ids at the same positions
+        self.prices = []
+        self.price_ids = []
+        self.geo = GeoGrid()
+        # One-day events by date, and events running for several days by their last day
+        self.dates = []
+        self.date_ids = []
+        self.span_ends = []
+        self.span_ids = []
+
+    def time_indexes(self):
+        """(sorted dates, ids, key) of the two time index lists"""
+        return [(self.dates, self.date_ids, lambda event: event.date), (self.span_ends, self.span_ids, Event.last_day)]
+
+    def time_index_of(self, event):
+        if not event.date:
+            return None
+        return self.span_ends if event.last_day() > event.date else self.dates
+
+    def is_past(self, event):
+        return bool(event.date) and event.last_day() < self.evicted_before
+
+    def city_of(self, event):
+        return self.knowledge_graph.get("venues", {}).get(event.venue, {}).get("location")
+
+    def coordinates_of(self, event):
+        return event_coordinates(event.latitude, event.longitude, event.venue, self.knowledge_graph)
+
+    def index_event(self, event, sorted_indexes=True):
+        self.by_category[event.category].add(event.id)
+        self.by_city[self.city_of(event)].add(event.id)
+        self.by_organizer[event.organizer].add(event.id)
+        coordinates = self.coordinates_of(event)
+        if coordinates:
+            self.geo.add(event.id, *coordinates)
+        if not sorted_indexes:
+            return
+        for values, ids, key in self.sorted_indexes_of(event):
+            i = bisect.bisect_right(values, key)
+            values.insert(i, key)
+            ids.insert(i, event.id)
+
+    def sorted_indexes_of(self, event):
+        """(sorted values, ids, this event's value) of the sorted lists the event belongs in"""
+        indexes = []
+        if event.price is not None:
+            indexes.append((self.prices, self.price_ids, event.price))
+        for dates, ids, key in self.time_indexes():
+            if self.time_index_of(event) is dates:
+                indexes.append((dates, ids, key(event)))
+        return indexes
+
+    def unindex_event(self, event):
+        for index, key in [(self.by_category, event.category), (self.by_city, self.city_of(event)), (self.by_organizer, event.organizer)]:
+            index[key].discard(event.id)
+            if not index[key]:
+                del index[key]
+        self.geo.remove(event.id)
+        for values, ids, key in self.sorted_indexes_of(event):
+            i = bisect.bisect_left(values, key)
+            while ids[i] != event.id:
+                i += 1
+            del values[i]
+            del ids[i]
+
+    def evict_before(self, date):
+        """Drop the events that ended before date (an ISO date), return how many.
+        Events loaded or reloaded later are dropped too if they already ended."""
+        with self.lock:
+            self.evicted_before = max(self.evicted_before, date)
+            if self.refresh():
+                return 0 # Past events were filtered while loading
+            if self.snapshot is not None:
+                return 0 # Read-only, find_candidates skips past events instead
+            past = []
+            for dates, ids, _ in self.time_indexes():
+                past += ids[:bisect.bisect_left(dates, self.evicted_before)]
+            for event_id in past:
+                self.remove_event(event_id)
+            return len(past)
+
+    def ids_in_window(self, window):
+        """Ids of the events taking place on at least one day of window, (first_day, last_day)"""
+        with self.lock:
+            start, end = window
+            ids = set(self.date_ids[bisect.bisect_left(self.dates, start):bisect.bisect_right(self.dates, end)])
+            # Events running for several days: the ones still running on the first day, that started by the last one
+            for event_id in self.span_ids[bisect.bisect_left(self.span_ends, start):]:
+                if self.events_by_id[event_id].date <= end:
+                    ids.add(event_id)
+            return ids
+
+    def find_candidates(self, user_preferences, radius_km=None, window=None):
+        """Return the positions (in get_events/as_dicts) of the events matching at least one preference.
+        With radius_km, events that close to the centre of the user's city count as in it.
+        With a date window (first_day, last_day), only events taking place then are returned."""
+        with self.lock:
+            self.refresh()
+            if self.snapshot is not None:
+                return self.find_snapshot_candidates(user_preferences, radius_km, window)
+            self.get_events()
+            candidate_ids = set()
+
+            for interest in user_preferences.get("interests") or []:
+                candidate_ids |= self.by_category.get(interest, set())
+
+            if user_preferences.get("location"):
+                candidate_ids |= self.by_city.get(user_preferences["location"], set())
+                centroid = city_centroid(user_preferences["location"], self.knowledge_graph)
+                if radius_km and centroid:
+                    candidate_ids.update(self.geo.within(*centroid, radius_km))
+
+            limit = self.knowledge_graph.get("pricing", {}).get(user_preferences.get("preferred_price"))
+            if user_preferences.get("preferred_price") and limit is not None:
+                candidate_ids.update(self.price_ids[:bisect.bisect_right(self.prices, limit)])
+
+            for organizer, info in self.knowledge_graph.get("organizers", {}).items():
+                if info.get("user_follows"):
+                    candidate_ids |= self.by_organizer.get(organizer, set())
+
+            if window:
+                candidate_ids &= self.ids_in_window(window)
+
+            return sorted(self.positions[event_id] for event_id in candidate_ids)
+
+    def find_snapshot_candidates(self, user_preferences, radius_km=None, window=None):
+        """find_candidates on the snapshot columns"""
+        columns = self.snapshot.columns
+        matches = np.zeros(len(self.snapshot), dtype=bool)
+
+        if user_preferences.get("interests"):
+            matches |= np.isin(columns["category"], self.snapshot.codes("category", user_preferences["interests"]))
+
+        if user_preferences.get("location"):
+            matches |= np.isin(columns["city"], self.snapshot.codes("city", [user_preferences["location"]]))
+            centroid = city_centroid(user_preferences["location"], self.knowledge_graph)
+            if radius_km and centroid:
+                latitudes, longitudes = self.snapshot.coordinates(self.knowledge_graph)
+                matches |= distances_km(latitudes, longitudes, *centroid) <= radius_km
+
+        limit = self.knowledge_graph.get("pricing", {}).get(user_preferences.get("preferred_price"))
+        if user_preferences.get("preferred_price") and limit is not None:
+            matches |= columns["price"] <= limit
+
+        followed = [organizer for organizer, info in self.knowledge_graph.get("organizers", {}).items() if info.get("user_follows")]
+        matches |= np.isin(columns["organizer"], self.snapshot.codes("organizer", followed))
+
+        # Dates are stored as YYYYMMDD numbers, 0 when unknown
+        from event_snapshot import encode_date
+        start, end = columns["date"], np.maximum(columns["date"], columns["end_date"])
+        if self.evicted_before:
+            matches &= (start == 0) | (end >= encode_date(self.evicted_before))
+        if window:
+            matches &= (start > 0) & (start <= encode_date(window[1])) & (end >= encode_date(window[0]))
+
+        return np.flatnonzero(matches)
+
+    def get_events(self):
+        """Return the events as Event records, reloading them if the file changed"""
+        with self.lock:
+            self.materialize()
+            if self.events is None:
+                self.events = list(self.events_by_id.values())
+                self.positions = {event.id: i for i, event in enumerate(self.events)}
+            return self.events
+
+    def get_event(self, event_id):
+        with self.lock:
+            self.get_events()
+            return self.events_by_id.get(str(event_id))
+
+    def as_dicts(self):
+        """Return the events as a list of dicts, like the JSON file"""
+        with self.lock:
+            self.refresh()
+            if self.snapshot is not None:
+                if self.event_dicts is None:
+                    from event_snapshot import SnapshotEvents
+                    self.event_dicts = SnapshotEvents(self.snapshot)
+                return self.event_dicts
+            events = self.get_events()
+            if self.event_dicts is None:
+                self.event_dicts = [event.to_dict() for event in events]
+            return self.event_dicts
+
+    def __len__(self):
+        with self.lock:
+            self.refresh()
+            if self.snapshot is not None:
+                return len(self.snapshot)
+            return len(self.get_events())
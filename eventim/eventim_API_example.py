@@ -74,16 +74,209 @@ Entry example in the products response:
 
 import requests
 import json
+import codecs
+import hashlib
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+
+class EventimCache:
+    """On-disk cache of Eventim responses, kept between runs.
+
+    Entries are keyed on the request parameters. A fresh entry (younger than ttl
+    seconds) is returned without any request. A stale one is revalidated with
+    If-None-Match / If-Modified-Since, so an unchanged page only costs a 304.
+    When the bodies take more than max_bytes, the least recently used are removed.
+    """
+
+    def __init__(self, cache_dir, ttl=300, max_bytes=50 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock() # fetch_all_events uses the cache from several threads
+        self.index_path = os.path.join(cache_dir, "index.json")
+        self.stats = {"hits": 0, "misses": 0, "revalidations": 0, "updates": 0, "evictions": 0}
+
+        os.makedirs(cache_dir, exist_ok=True)
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as file:
+                self.index = json.load(file) # key -> {"etag", "last_modified", "fetched_at", "last_used", "size"}
+        except (OSError, json.JSONDecodeError):
+            self.index = {}
+
+    def key(self, params):
+        return hashlib.sha256(json.dumps(params, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def body_path(self, key):
+        return os.path.join(self.cache_dir, key + ".json")
+
+    def save_index(self):
+        # Write to a temporary file first, so a crash can't leave a half-written index
+        temp_path = self.index_path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            json.dump(self.index, file)
+        os.replace(temp_path, self.index_path)
+
+    def lookup(self, params):
+        """Return (entry, body) for the params, or (None, None) if they aren't cached"""
+        key = self.key(params)
+        with self.lock:
+            entry = self.index.get(key)
+            if entry is None:
+                return None, None
+            try:
+                with open(self.body_path(key), 'rb') as file:
+                    body = file.read()
+            except OSError:
+                del self.index[key]
+                return None, None
+            entry["last_used"] = time.time()
+            return dict(entry), body
+
+    def is_fresh(self, entry):
+        return time.time() - entry["fetched_at"] < self.ttl
+
+    def conditional_headers(self, entry):
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def store(self, params, body, etag=None, last_modified=None):
+        """Save a response body, then evict old entries if the cache is too big"""
+        key = self.key(params)
+        with self.lock:
+            with open(self.body_path(key), 'wb') as file:
+                file.write(body)
+            now = time.time()
+            self.index[key] = {"etag": etag, "last_modified": last_modified, "fetched_at": now, "last_used": now, "size": len(body)}
+            self.evict()
+            self.save_index()
+
+    def refresh(self, params):
+        """The server said the cached body is still valid (304), start its ttl again"""
+        key = self.key(params)
+        with self.lock:
+            if key in self.index:
+                self.index[key]["fetched_at"] = time.time()
+                self.save_index()
+
+    def evict(self):
+        total = sum(entry["size"] for entry in self.index.values())
+        for key in sorted(self.index, key=lambda key: self.index[key]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            total -= self.index.pop(key)["size"]
+            self.stats["evictions"] += 1
+            try:
+                os.remove(self.body_path(key))
+            except OSError:
+                pass
+
+    def count(self, name):
+        with self.lock:
+            self.stats[name] += 1
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats["entries"] = len(self.index)
+        stats["bytes"] = sum(entry["size"] for entry in self.index.values())
+        return stats
+
+
+class ProductStreamParser:
+    """Incremental parser for the "products" array of an Eventim response.
+
+    Feed it the response bytes as they arrive, and it yields every product as soon
+    as its closing brace is read. Only one product is ever held in memory. Other
+    top-level fields like "facets" are skipped without being parsed.
+    """
+
+    SPECIAL = re.compile(r'[{}\[\]":]')
+    STRING = re.compile(r'"(?:[^"\\]|\\.)*"', re.DOTALL)
+
+    def __init__(self):
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.buffer = ""
+        self.pos = 0 # Where scanning continues, always outside of a string
+        self.depth = 0
+        self.last_key = None # Last string seen at the top level of the response
+        self.in_products = False
+        self.product_start = None
+        self.done = False
+
+    def feed(self, chunk):
+        """Add bytes from the response, yield the products they complete"""
+        if self.done:
+            return
+        self.buffer += self.decoder.decode(chunk)
+
+        while True:
+            match = self.SPECIAL.search(self.buffer, self.pos)
+            if match is None:
+                break
+            char = match.group()
+            i = match.start()
+
+            if char == '"':
+                string = self.STRING.match(self.buffer, i)
+                if string is None:
+                    break # The string continues in the next chunk
+                if self.depth == 1 and not self.in_products:
+                    self.last_key = string.group()
+                self.pos = string.end()
+                continue
+
+            self.pos = i + 1
+            if char == ":":
+                continue
+            if char in "{[":
+                self.depth += 1
+                if char == "[" and self.depth == 2 and self.last_key == '"products"':
+                    self.in_products = True
+                elif char == "{" and self.in_products and self.depth == 3:
+                    self.product_start = i
+            else:
+                self.depth -= 1
+                if self.in_products and self.depth == 2 and char == "}":
+                    yield json.loads(self.buffer[self.product_start:i + 1])
+                    self.product_start = None
+                elif self.in_products and self.depth == 1:
+                    # End of the products array, the rest of the response isn't needed
+                    self.done = True
+                    self.buffer = ""
+                    return
+
+            # Drop everything we don't need anymore, so the buffer stays one product big
+            if self.product_start is None:
+                self.buffer = self.buffer[self.pos:]
+                self.pos = 0
+
 
 class EventimAPI:
     BASE_URL = "https://public-api.eventim.com/websearch/search/api/exploration/v1/products"
 
-    def __init__(self, web_id="web__eventim-svn", language="sl"):
+    def __init__(self, web_id="web__eventim-svn", language="sl", base_url=None, max_workers=4, timeout=(3.05, 30), cache=None):
         self.web_id = web_id
         self.language = language
         self.page = 1
         self.sort = "DateAsc"
         self.top = 50
+        self.base_url = base_url or self.BASE_URL
+        self.max_workers = max_workers # How many pages fetch_all_events downloads at the same time
+        self.timeout = timeout
+        self.cache = cache # Optional EventimCache
+
+        # One pooled session, big enough for all the workers to keep their connection open
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
 
     def fetch_events(self, page=1, sort="DateAsc", top=50):
         params = {
@@ -93,11 +286,89 @@ class EventimAPI:
             "sort": sort,
             "top": top
         }
-        response = requests.get(self.BASE_URL, params=params)
-        if response.status_code == 200:
-            return response.json()
-        else:
+        if self.cache is None:
+            response = self.session.get(self.base_url, params=params, timeout=self.timeout)
+            if response.status_code == 200:
+                return response.json()
+            else:
+                response.raise_for_status()
+
+        return json.loads(self.fetch_cached(params))
+
+    def fetch_cached(self, params):
+        """Return the response body for params, downloading it only if the cache can't answer"""
+        entry, body = self.cache.lookup(params)
+        if entry is not None and self.cache.is_fresh(entry):
+            self.cache.count("hits")
+            return body
+
+        headers = self.cache.conditional_headers(entry) if entry is not None else {}
+        response = self.session.get(self.base_url, params=params, headers=headers, timeout=self.timeout)
+
+        if response.status_code == 304 and entry is not None:
+            self.cache.count("revalidations")
+            self.cache.refresh(params)
+            return body
+        if response.status_code != 200:
+            response.raise_for_status()
+
+        self.cache.count("updates" if entry is not None else "misses")
+        self.cache.store(params, response.content, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+        return response.content
+
+    def fetch_all_events(self, sort="DateAsc", top=50):
+        """Yield every product in the catalog, each productId only once.
+
+        Page 1 tells us totalPages, the remaining pages are then fetched concurrently
+        (at most max_workers at a time) and their products are yielded as soon as
+        each page arrives, not in page order.
+        """
+        seen = set()
+
+        def new_products(data):
+            for product in data.get("products", []):
+                product_id = product.get("productId")
+                if product_id not in seen:
+                    seen.add(product_id)
+                    yield product
+
+        first_page = self.fetch_events(page=1, sort=sort, top=top)
+        yield from new_products(first_page)
+
+        total_pages = first_page.get("totalPages", 1)
+        if total_pages <= 1:
+            return
+
+        pool = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            futures = [pool.submit(self.fetch_events, page, sort, top) for page in range(2, total_pages + 1)]
+            for future in as_completed(futures):
+                yield from new_products(future.result())
+        finally:
+            # If the caller stops early, don't wait for pages nobody will read
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def stream_event_details(self, page=1, sort="DateAsc", top=50):
+        """Yield the details of every product on a page while the response is still downloading.
+
+        Memory stays at about one product, no matter how big top is, so the whole
+        catalog can be pulled with a single request. Doesn't use the cache.
+        """
+        params = {
+            "webId": self.web_id,
+            "language": self.language,
+            "page": page,
+            "sort": sort,
+            "top": top
+        }
+        parser = ProductStreamParser()
+        with self.session.get(self.base_url, params=params, timeout=self.timeout, stream=True) as response:
             response.raise_for_status()
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                for product in parser.feed(chunk):
+                    yield self.get_event_details(product)
+                if parser.done:
+                    break
 
     def get_event_details(self, event):
         details = {
@@ -119,10 +390,13 @@ class EventimAPI:
         return details
 
 if __name__ == "__main__":
-    api = EventimAPI()
+    cache = EventimCache(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".eventim_cache"))
+    api = EventimAPI(cache=cache)
     events_data = api.fetch_events(page=1)
     events = events_data.get("products", [])
 
     for event in events:
         details = api.get_event_details(event)
-        print(json.dumps(details, indent=4, ensure_ascii=False))
\ No newline at end of file
+        print(json.dumps(details, indent=4, ensure_ascii=False))
+
+    print(f"Cache: {cache.get_stats()}")
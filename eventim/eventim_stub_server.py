@@ -0,0 +1,88 @@
+"""
+Local stand-in for the Eventim products API, for trying things out without the network.
+
+Replays eventim_API_response.json for every requested page. Products on page N > 1
+get their productId suffixed with the page number, so every page holds different
+products, like the real catalog. Set a delay to simulate a slow network.
+
+Run on its own:
+    python eventim/eventim_stub_server.py [port] [delay_seconds]
+
+Then point the API at it:
+    EventimAPI(base_url="http://127.0.0.1:8765/products")
+"""
+
+import copy
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+RESPONSE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "eventim_API_response.json")
+
+
+class StubEventimHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    recorded_response = None
+    delay = 0.0
+
+    def log_message(self, *args):
+        pass
+
+    def page_body(self, page):
+        response = copy.deepcopy(self.recorded_response)
+        response["page"] = page
+        if page > 1:
+            for product in response["products"]:
+                product["productId"] = f"{product['productId']}{page:02d}"
+        return json.dumps(response, ensure_ascii=False).encode("utf-8")
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        page = int(query.get("page", ["1"])[0])
+        time.sleep(self.delay)
+
+        body = self.page_body(page)
+        etag = '"' + hashlib.sha256(body).hexdigest()[:16] + '"'
+
+        # Answer conditional requests like the real API, an unchanged page is just a 304
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_stub_server(port=0, delay=0.0, handler=StubEventimHandler):
+    """Start the stub server in a background thread, return (server, products_url)"""
+    with open(RESPONSE_PATH, 'r', encoding='utf-8') as file:
+        recorded_response = json.load(file)
+    handler = type("RecordedEventimHandler", (handler,), {"recorded_response": recorded_response, "delay": delay})
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/products"
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+    delay = float(sys.argv[2]) if len(sys.argv) > 2 else 0.0
+    server, url = start_stub_server(port, delay)
+    print(f"Stub Eventim API running at {url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
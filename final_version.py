@@ -1,23 +1,81 @@
 from datetime import datetime
+import heapq
+import time
 import random
 import requests
 import json
 import os
 from json_repair import repair_json
+from llm_client import OllamaClient, TierStats
+from conversation import ConversationContext
+from event_store import EventStore, event_id_key
+from event_scorer import BatchScorer
+from geo_index import haversine_km, city_centroid, event_coordinates
+from date_window import date_window, overlaps
+from response_cache import ResponseCache
+from intent_router import IntentRouter, parse_action
+from preference_extractor import PreferenceExtractor
+from catalog_sync import CatalogSync
+from prompts import build_messages, turn_analysis_system, DECIDE_ACTION_SYSTEM, USER_PREFERENCES_SYSTEM, GENERAL_CHAT_SYSTEM
 
 class EventAgent:
     def __init__(self):
-        self.ollama_url = "http://localhost:11434/api/generate"
-        self.model_name = "llama3.1" # Choose 3.2 if you need a lighter model - don't forget to download it first
-        self.current_date = datetime.now().strftime("%Y-%m-%d")
-        self.conversation_history = [] # Store conversation for context
+        self.llm = OllamaClient("http://localhost:11434") # Pooled keep-alive connection to Ollama
+        self.model_name = "llama3.1" # Chat answers and summaries. Choose 3.2 if you need a lighter model - don't forget to download it first
+        # Classification calls (action, preferences) go to the small model first, and to model_name only
+        # if its answer isn't valid. None to use model_name for everything.
+        self.small_model_name = "llama3.2"
+        self.small_model_available = None # Checked once at /api/tags, see has_small_model
+        self.tier_stats = TierStats()
+        self.fixed_date = None # ISO date to use as today (the benchmarks pin one), None for the real date
+        self.reset_session()
+        self.knowledge_graph = self.create_knowledge_graph()
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+        self.event_store = EventStore(self.events_path(script_dir), self.knowledge_graph) # Loaded once, reloaded when the file changes
+        self.score_weights = {"interest": 3, "location": 3, "price": 2, "organizer": 2}
+        self.batch_scorer = BatchScorer(self.knowledge_graph, self.score_weights) # Set to None to score events one by one
+        self.location_radius_km = 25 # Events this close to the centre of the user's city count as in it, None for the city only
+        self.catalog_sync = None # Created on the first sync_eventim_events call
+        # The bundled events.json holds sample events with fixed dates, so they are never dropped as over.
+        # Syncing a live catalog turns this on.
+        self.evict_past_events = False
+        self.actions = ["general_chat", "suggest_events", "quit"]
+        self.use_turn_analysis = True # Decide action and update preferences in one LLM call
+        self.intent_router = IntentRouter(self.actions) # Answers clear messages without the LLM, None to always ask it
+        self.preference_extractor = PreferenceExtractor(self.knowledge_graph) # Finds preference changes without the LLM, None to always ask it
+        self.turn_analysis_system = turn_analysis_system(self.knowledge_graph)
+        # Answers of the classification calls, pass path="llm_cache.sqlite" to keep them between runs. None to disable.
+        self.response_cache = ResponseCache()
+
+    @property
+    def current_date(self):
+        # Looked up on every use, so an agent running past midnight moves on to the next day
+        return self.fixed_date or datetime.now().strftime("%Y-%m-%d")
+
+    @current_date.setter
+    def current_date(self, date):
+        self.fixed_date = date
+
+    # Attributes that belong to one user, everything else can be shared by many conversations (see agent_server.py)
+    SESSION_STATE = ("conversation", "conversation_history", "user_preferences")
+
+    def reset_session(self):
+        """Start a new conversation with empty preferences"""
+        # Store conversation for context, within a token budget so prompts don't keep growing
+        self.conversation = ConversationContext(max_tokens=1500, summarize=self.summarize_history)
+        self.conversation_history = self.conversation.turns
         self.user_preferences = {
             "interests": [],
             "location": "",
             "preferred_price": "",
             "date": ""
         }
-        self.knowledge_graph = self.create_knowledge_graph()
+
+    def restore_session(self, state):
+        """Continue a conversation saved in a SessionStore"""
+        self.reset_session()
+        self.user_preferences.update(state["preferences"])
+        self.conversation.restore(state["summary"], state["turns"], state["turn_count"])
 
     def create_knowledge_graph(self):
         # Create knowledge graph
@@ -41,45 +99,84 @@ class EventAgent:
 
         # Check interest match
         if self.user_preferences["interests"] and event.get("category") in self.user_preferences["interests"]:
-            score += 3
+            score += self.score_weights["interest"]
             reasons.append(f"matches {event['category']} interest")
         
         # Check location
-        if self.user_preferences["location"] and self.knowledge_graph["venues"][event.get("venue")].get("location") == self.user_preferences["location"]:
-            score += 3
+        location = self.user_preferences["location"]
+        if location and self.knowledge_graph["venues"][event.get("venue")].get("location") == location:
+            score += self.score_weights["location"]
             reasons.append("in your city")
+        elif location and self.location_radius_km:
+            centroid = city_centroid(location, self.knowledge_graph)
+            coordinates = event_coordinates(event.get("latitude"), event.get("longitude"), event.get("venue"), self.knowledge_graph)
+            if centroid and coordinates:
+                distance = haversine_km(*centroid, *coordinates)
+                if distance <= self.location_radius_km:
+                    score += self.score_weights["location"]
+                    reasons.append(f"{distance:.0f} km from {location}")
 
         # Check price
-        if self.user_preferences["preferred_price"] and event.get("price") <= self.knowledge_graph["pricing"][self.user_preferences["preferred_price"]]:
-            score += 2
+        if self.user_preferences["preferred_price"] and event.get("price") is not None and event.get("price") <= self.knowledge_graph["pricing"][self.user_preferences["preferred_price"]]:
+            score += self.score_weights["price"]
             reasons.append("in your price range")
         
         # Check if organizer is followed
         organizer = event.get("organizer")
         if organizer in self.knowledge_graph["organizers"]:
             if self.knowledge_graph["organizers"][organizer].get("user_follows"):
-                score += 2
+                score += self.score_weights["organizer"]
                 reasons.append("by organizer you follow")
         
         return score, reasons
 
-    # Get and score events using knowledge graph. Return sorted list of events.
-    def suggest_events(self):
+    # Get and score events using knowledge graph. Return the k best events, sorted.
+    def suggest_events(self, events=None, k=3):
         # Get and score events using knowledge graph
-        events = self.get_mock_events()
-        scored_events = []
-        for event in events:
-            score, reasons = self.score_event(event)
-            if score > 0:
-                scored_events.append({
-                    **event,
-                    "score": score,
-                    "reasons": reasons
-                })
-
-        scored_events.sort(key=lambda x: x.get("score", 0), reverse=True)
-        print("scored_events: ", scored_events[:3])
-        return scored_events[:3]
+        candidates = None
+        # Only events on the dates the user asked for, like "this weekend", None if they didn't ask
+        today = self.current_date
+        window = date_window(self.user_preferences.get("date"), today)
+        if events is None:
+            # Other sessions of the server change the store too, the candidate positions must match these events
+            with self.event_store.lock:
+                if self.evict_past_events:
+                    self.event_store.evict_before(today) # Never suggest events that are over
+                events = self.get_mock_events()
+                # Only events matching at least one preference can score above zero, the store's indexes find them
+                candidates = self.event_store.find_candidates(self.user_preferences, self.location_radius_km, window)
+        elif window:
+            candidates = [i for i, event in enumerate(events) if overlaps(event.get("date"), event.get("end_date"), window)]
+
+        if self.batch_scorer:
+            # Score all candidates at once, and only build the reasons for the winners
+            winners = self.batch_scorer.top_k(events, self.user_preferences, k, candidates, self.location_radius_km)
+            top_events = [(*self.score_event(events[i]), events[i]) for i in winners]
+        elif candidates is not None:
+            top_events = self.top_k_events([events[i] for i in candidates], k)
+        else:
+            top_events = self.top_k_events(events, k)
+
+        # Only the winners are copied into the output format
+        scored_events = [{**event, "score": score, "reasons": reasons} for score, reasons, event in top_events]
+        print("scored_events: ", scored_events)
+        return scored_events
+
+    def top_k_events(self, events, k):
+        """Score events one by one, return the k best as (score, reasons, event)"""
+        def matching_events():
+            for event in events:
+                score, reasons = self.score_event(event)
+                if score > 0:
+                    yield score, reasons, event
+
+        # Keep only the best k in a bounded heap instead of sorting everything.
+        # Ties go to the earlier event, then to the lower id, so the order is always the same.
+        return heapq.nsmallest(
+            k,
+            matching_events(),
+            key=lambda match: (-match[0], match[2].get("date", ""), event_id_key(match[2].get("id")))
+        )
 
     def format_events(self, events):
         formatted_events = []
@@ -94,124 +191,349 @@ class EventAgent:
         print("formatted_events: ", formatted_events)
         return formatted_events
 
+    def events_response(self, events):
+        """The answer to a suggest_events turn"""
+        if not events:
+            # Nothing matched, or every event is already over
+            return ("I couldn't find any upcoming events that match your preferences. "
+                    "Try other interests, another city or different dates.")
+        return "Here are some events for you:\n\n" + "\n\n".join(self.format_events(events))
+
+    def events_path(self, script_dir):
+        # Prefer the binary snapshot (see event_snapshot.py) unless events.json was edited after it was made
+        json_path = os.path.join(script_dir, "resources", "events.json")
+        snapshot_path = os.path.join(script_dir, "resources", "events.evsnap")
+        if os.path.exists(snapshot_path) and os.path.getmtime(snapshot_path) >= os.path.getmtime(json_path):
+            return snapshot_path
+        return json_path
+
     def get_mock_events(self):
-        # Mock API call - returns fake events
-        try:
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            events_file_path = os.path.join(script_dir, "resources", "events.json")
-            
-            with open(events_file_path, 'r', encoding='utf-8') as file:
-                events = json.load(file)
-            return events
-        except Exception as e:
-            print(f"❌ Error loading events: {e}. Using empty list.")
-            return []
+        # Mock API call - returns fake events from the in-memory event store
+        return self.event_store.as_dicts()
+
+    def sync_eventim_events(self, api=None):
+        """Bring the Eventim catalog into the event store, applying only what changed since the last sync"""
+        if self.catalog_sync is None:
+            self.catalog_sync = CatalogSync(self.event_store, self.knowledge_graph, api)
+            self.evict_past_events = True # Real events end, unlike the samples
+        stats = self.catalog_sync.run()
+        print(f"Synced Eventim events: {stats}")
+        return stats
 
     def update_user_preferences(self, user_input):
-    # Update user preferences based on input using LLM
-        user_preferences = self.user_preferences
-        
-        prompt = f"""You are a JSON-only response system. You must respond with ONLY valid JSON, no other text.
-
-Update the user preferences based on the user's message.
-Keep all other fields unchanged and don't remove or add any fields.
-
-IMPORTANT: Only update preferences if the user explicitly mentions interests, location, or price preferences. 
-For simple greetings like "Hi", "Hello", "How are you?", do NOT change any preferences.
-
-If user expresses interest in a specific topic, update the interests field, if it's one of the following:
-- music
-- theater
-- sports
-- entrepreneurship
-- technology
-- history
+    # Update user preferences based on input, with the LLM only if the local extractor can't
+        delta = self.local_preference_delta(user_input)
+        if delta is not None:
+            self.apply_preference_delta(delta)
+            return
+        messages = self.user_preferences_messages(user_input)
 
-Examples - if the user said:
-- "I enjoy learning about AI" → add "technology" to interests
+        try:
+            response = self.ask_ollama_chat_cached("user_preferences", messages, user_input, self.is_preferences_response,
+                                                   context=self.preferences_context())
+            self.set_user_preferences(response)
+        except Exception as e:
+            return f"Error updating preferences: {e}"
 
-For preferred_price, you can only add the following:
-- affordable (up to 20 EUR)
-- moderate (up to 50 EUR)
-For anything above 50 EUR, do not update the preferred_price field.
+    def user_preferences_messages(self, user_input):
+        return build_messages(USER_PREFERENCES_SYSTEM, user_preferences=self.user_preferences, user_input=user_input)
 
-Examples - if the user said:
-- "I prefer free events" → update "preferred_price" to "affordable"
-- "I prefer events up to 50 EUR" → update "preferred_price" to "moderate"
+    def local_preference_delta(self, user_input):
+        """The preference changes found without the LLM, or None if the LLM should look at the message"""
+        if self.preference_extractor is None:
+            return None
+        delta, matched = self.preference_extractor.extract(user_input, self.current_date)
+        # Nothing found in a message that seems to be about preferences, like "I prefer something fancy"
+        if not matched and self.preference_extractor.looks_like_preference(user_input):
+            return None
+        return delta
 
-Current user preferences: {json.dumps(user_preferences)}
+    def preferences_context(self):
+        # The preference update returns all preferences, so its cached answers are only valid for the same ones
+        return json.dumps(self.user_preferences, sort_keys=True)
 
-User said: "{user_input}"
+    def is_preferences_response(self, response):
+        return self.parse_preferences(response) is not None
 
-CRITICAL: Respond with ONLY the JSON object, no explanations, no markdown, no code blocks, no extra text.
-"""
+    def parse_preferences(self, response):
+        """Validate a user_preferences response, return the four preferences or None"""
+        interests = self.knowledge_graph.get("interests", [])
+        price_tiers = list(self.knowledge_graph.get("pricing", {}))
 
+        text = response.strip()
         try:
-            response = self.ask_ollama(prompt)
-            
-            # Try to parse the response directly as JSON
+            preferences = json.loads(text)
+        except json.JSONDecodeError:
+            # If direct parsing fails, try with json_repair
             try:
-                updated_preferences = json.loads(response.strip())
+                preferences = json.loads(repair_json(text))
             except json.JSONDecodeError:
-                # If direct parsing fails, try with json_repair
-                clean_json = repair_json(response.strip())
-                updated_preferences = json.loads(clean_json)
-                
-            # Update user preferences
-            print(f"Updated preferences: {updated_preferences}")
-            self.user_preferences = updated_preferences
-                
-        except Exception as e:
-            return f"Error updating preferences: {e}"
+                return None
+
+        # A small model may answer {} or other keys, that must not replace the preferences
+        if not isinstance(preferences, dict):
+            return None
+        if not isinstance(preferences.get("interests"), list) or not set(preferences["interests"]) <= set(interests):
+            return None
+        for key in ["location", "preferred_price", "date"]:
+            if not isinstance(preferences.get(key), str):
+                return None
+        if preferences["preferred_price"] and preferences["preferred_price"] not in price_tiers:
+            return None
+        return {key: preferences[key] for key in ["interests", "location", "preferred_price", "date"]}
+
+    def set_user_preferences(self, response):
+        updated_preferences = self.parse_preferences(response)
+        if updated_preferences is None:
+            print(f"❌ Invalid preferences from the model: {response!r}. Keeping the current ones.")
+            return
+
+        # Update user preferences
+        print(f"Updated preferences: {updated_preferences}")
+        self.user_preferences = {**self.user_preferences, **updated_preferences}
 
     # Add conversation turn to history
     def add_to_history(self, user_input, agent_response):
         """Add conversation turn to history"""
-        self.conversation_history.append({
-            "user": user_input,
-            "agent": agent_response
-        })
+        self.conversation.add_turn(user_input, agent_response)
     
     def get_history_context(self):
         """Get conversation history context"""
-        history_context = ""
-        if self.conversation_history:
-            for i, turn in enumerate(self.conversation_history, 1):
-                history_context += f"{i}. User: {turn['user']}\n"
-                history_context += f"   Agent: {turn['agent']}...\n"
-        return history_context
+        return self.conversation.get_context()
+
+    def summary_prompt(self, summary, evicted_turns):
+        return f"""Summarize this conversation between a user and an event assistant in at most 3 sentences.
+Keep the user's interests, location, price and date preferences, and which events were suggested.
+
+Summary so far: {summary or "(none)"}
+
+Conversation to add to the summary:
+{evicted_turns}
+
+Respond with ONLY the summary."""
+
+    def summarize_history(self, summary, evicted_turns):
+        """Fold turns that no longer fit in the context into a short rolling summary"""
+        try:
+            return self.llm.generate(self.model_name, self.summary_prompt(summary, evicted_turns)).strip()
+        except requests.exceptions.RequestException as e:
+            print(f"❌ Error summarizing conversation: {e}. Keeping the previous summary.")
+            return summary
     
     # Send a prompt to the Ollama LLM and get a response
-    def ask_ollama(self, prompt):
-        
-        payload = {
-            "model": self.model_name,
-            "prompt": prompt,
-            "stream": False
-        }
-        
+    def ask_ollama(self, prompt, **options):
         try:
-            response = requests.post(self.ollama_url, json=payload)
-            response.raise_for_status()
-            return response.json()["response"]
+            return self.llm.generate(self.model_name, prompt, **options)
         except requests.exceptions.RequestException as e:
             return f"Error communicating with Ollama: {e}"
 
+    # Send chat messages to the Ollama LLM and get a response
+    def ask_ollama_chat(self, messages, model=None, **options):
+        try:
+            return self.llm.chat(model or self.model_name, messages, **options)
+        except requests.exceptions.RequestException as e:
+            return f"Error communicating with Ollama: {e}"
+
+    def has_small_model(self):
+        """True if the small model is downloaded, asked once. Without it every classification call would fail on it first."""
+        if self.small_model_available is None:
+            try:
+                available = self.small_model_name in self.llm.list_models()
+            except requests.exceptions.RequestException:
+                available = True # Can't tell, a failing call still escalates to model_name
+            self.set_small_model_available(available)
+        return self.small_model_available
+
+    def set_small_model_available(self, available):
+        self.small_model_available = available
+        if not available:
+            print(f"⚠️ {self.small_model_name} isn't downloaded, using {self.model_name} for everything. "
+                  f"Run 'ollama pull {self.small_model_name}' to use it.")
+
+    def classification_models(self):
+        """(tier, model) to try for a classification call, the small model first"""
+        if self.small_model_name and self.small_model_name != self.model_name and self.has_small_model():
+            return [("small", self.small_model_name), ("large", self.model_name)]
+        return [("large", self.model_name)]
+
+    def ask_ollama_chat_tiered(self, messages, is_valid, **options):
+        """Ask the small model, and the large one only if the small one's answer doesn't pass is_valid"""
+        models = self.classification_models()
+        for tier, model in models:
+            started = time.perf_counter()
+            response = self.ask_ollama_chat(messages, model=model, **options)
+            self.tier_stats.record(tier, started)
+            if is_valid(response) or tier == models[-1][0]:
+                return response
+            self.tier_stats.escalated()
+
+    def cache_key(self, template, messages, user_input, context, options):
+        # The system prompt and options (like the JSON schema) are part of the template id
+        template_id = self.response_cache.template_id(template, messages[0]["content"], options)
+        return self.response_cache.key(self.classification_models()[0][1], template_id, user_input, context)
+
+    # Send chat messages for a classification call, answering repeated messages from the cache
+    def ask_ollama_chat_cached(self, template, messages, user_input, is_valid, context="", **options):
+        """Like ask_ollama_chat, for calls whose answer only depends on the user input (and context).
+        Responses that pass is_valid are cached, so a repeated "Hi!" doesn't reach the model."""
+        if self.response_cache is None:
+            return self.ask_ollama_chat_tiered(messages, is_valid, **options)
+        key = self.cache_key(template, messages, user_input, context, options)
+        response = self.response_cache.get(key)
+        if response is None:
+            response = self.ask_ollama_chat_tiered(messages, is_valid, **options)
+            if is_valid(response):
+                self.response_cache.put(key, response)
+        return response
+
+    # Send chat messages to the Ollama LLM and yield the response token by token
+    def ask_ollama_chat_stream(self, messages):
+        try:
+            for token in self.llm.chat_stream(self.model_name, messages):
+                yield token
+        except requests.exceptions.RequestException as e:
+            yield f"Error communicating with Ollama: {e}"
+
     def decide_action(self, user_input):
         """Agent decides what action to take"""
-        prompt = f"""Based on this user input, decide what action to take.
+        action = self.route_intent(user_input)
+        if action:
+            return action
+        messages, schema = self.decide_action_messages(user_input)
+        response = self.ask_ollama_chat_cached("decide_action", messages, user_input, self.is_action, format=schema)
+        return self.action_from_response(response)
+
+    def route_intent(self, user_input):
+        # Clear cases like "bye" or "show me events" don't need the LLM
+        return self.intent_router.route(user_input) if self.intent_router else None
+
+    def action_from_response(self, response):
+        action = parse_action(response, self.actions)
+        if action is None:
+            print(f"❌ Invalid action from the model: {response!r}. Using general_chat.")
+            return "general_chat"
+        return action
 
-        User input: "{user_input}"
+    def is_action(self, response):
+        return parse_action(response, self.actions) is not None
 
-        Available actions:
-        - general_chat: Have a normal conversation.
-        - suggest_events: Show personalized event recommendations. Return this action ONLY if the user asks for them in some way.
-        - quit: Quit the agent, end the conversation
-        
-        Respond with ONLY the action name (general_chat, suggest_events or quit), nothing else."""
+    def decide_action_messages(self, user_input):
+        """Build the decide_action messages and the JSON schema that limits the answer to the valid actions"""
+        schema = {
+            "type": "object",
+            "properties": {"action": {"type": "string", "enum": self.actions}},
+            "required": ["action"]
+        }
+        return build_messages(DECIDE_ACTION_SYSTEM, user_input=user_input), schema
+
+    def analyze_turn(self, user_input):
+        """Decide the action and the preference changes with one structured LLM call.
+        Returns (action, preference_delta), or None if the response isn't valid."""
+        analysis = self.local_turn_analysis(user_input)
+        if analysis:
+            return analysis
+        messages, schema = self.analyze_turn_messages(user_input)
+        # The prompt has the current preferences, so the answer is only valid for the same ones
+        response = self.ask_ollama_chat_cached("turn_analysis", messages, user_input, self.is_turn_analysis,
+                                               context=self.preferences_context(), format=schema)
+        return self.parse_turn_analysis(response)
+
+    def local_turn_analysis(self, user_input):
+        """(action, preference_delta) when the router and the extractor can both answer, otherwise None"""
+        action = self.route_intent(user_input)
+        if action == "quit":
+            return "quit", self.empty_preference_delta() # Nothing to update when the user leaves
+        delta = self.local_preference_delta(user_input) if action else None
+        return (action, delta) if delta is not None else None
+
+    def is_turn_analysis(self, response):
+        return self.parse_turn_analysis(response) is not None
+
+    def analyze_turn_messages(self, user_input):
+        """Build the turn analysis messages and the JSON schema its response must follow"""
+        interests = self.knowledge_graph.get("interests", [])
+        price_tiers = list(self.knowledge_graph.get("pricing", {}))
+
+        # Ollama constrains the response to this JSON schema
+        schema = {
+            "type": "object",
+            "properties": {
+                "action": {"type": "string", "enum": self.actions},
+                "add_interests": {"type": "array", "items": {"type": "string", "enum": interests}},
+                "remove_interests": {"type": "array", "items": {"type": "string", "enum": interests}},
+                "location": {"type": "string"},
+                "preferred_price": {"type": "string", "enum": [""] + price_tiers},
+                "date": {"type": "string"}
+            },
+            "required": ["action", "add_interests", "remove_interests", "location", "preferred_price", "date"]
+        }
 
-        action = self.ask_ollama(prompt).strip().lower()
-        return action
+        messages = build_messages(self.turn_analysis_system, user_preferences=self.user_preferences, user_input=user_input)
+        return messages, schema
+
+    def parse_turn_analysis(self, response):
+        """Validate the turn analysis response, return (action, preference_delta) or None"""
+        interests = self.knowledge_graph.get("interests", [])
+        price_tiers = list(self.knowledge_graph.get("pricing", {}))
+
+        try:
+            analysis = json.loads(response.strip())
+        except json.JSONDecodeError:
+            return None
+
+        # Validate, older Ollama versions ignore the schema and only enforce JSON
+        if not isinstance(analysis, dict) or analysis.get("action") not in self.actions:
+            return None
+        delta = {key: analysis.get(key) for key in ["add_interests", "remove_interests", "location", "preferred_price", "date"]}
+        for key in ["add_interests", "remove_interests"]:
+            if not isinstance(delta[key], list) or not set(delta[key]) <= set(interests):
+                return None
+        for key in ["location", "preferred_price", "date"]:
+            if not isinstance(delta[key], str):
+                return None
+        if delta["preferred_price"] and delta["preferred_price"] not in price_tiers:
+            return None
+
+        return analysis["action"], delta
+
+    def empty_preference_delta(self):
+        return {"add_interests": [], "remove_interests": [], "location": "", "preferred_price": "", "date": ""}
+
+    def apply_preference_delta(self, delta):
+        """Apply the changes from analyze_turn to the user preferences"""
+        interests = [i for i in self.user_preferences["interests"] if i not in delta.get("remove_interests", [])]
+        for interest in delta.get("add_interests", []):
+            if interest not in interests:
+                interests.append(interest)
+        self.user_preferences["interests"] = interests
+
+        # Empty strings mean "not mentioned", so keep the old value
+        for key in ["location", "preferred_price", "date"]:
+            if delta.get(key):
+                self.user_preferences[key] = delta[key]
+        print(f"Updated preferences: {self.user_preferences}")
+
+    def general_chat_messages(self, user_input, history_context):
+        return build_messages(GENERAL_CHAT_SYSTEM, history_context, self.user_preferences, user_input)
+
+    def print_llm_stats(self):
+        # Prompt tokens Ollama didn't have to evaluate came from its prompt cache
+        stats = self.llm.get_stats()
+        print(f"📊 LLM calls: {stats['calls']}, avg latency: {stats['avg_latency']:.2f}s, "
+              f"prompt tokens evaluated: {stats['prompt_eval_tokens']} of ~{stats['prompt_tokens']} "
+              f"(cache hit rate ~{stats['cache_hit_rate']:.0%}), generated tokens: {stats['eval_tokens']}")
+        tiers = self.tier_stats.get_stats()
+        print(f"📊 Classification calls: {tiers['small']['calls']} to {self.small_model_name} "
+              f"(avg {tiers['small']['avg_latency']:.2f}s), {tiers['large']['calls']} to {self.model_name} "
+              f"(avg {tiers['large']['avg_latency']:.2f}s), escalated {tiers['escalations']} ({tiers['escalation_rate']:.0%})")
+        if self.intent_router is not None:
+            routes = self.intent_router.get_stats()
+            print(f"📊 Intent router: {routes['rules'] + routes['overlap']} of {routes['rules'] + routes['overlap'] + routes['llm']} "
+                  f"messages routed without the model ({routes['llm_calls_saved']:.0%})")
+        if self.response_cache is not None:
+            cache = self.response_cache.get_stats()
+            print(f"📊 Response cache: {cache['hits']} of {cache['hits'] + cache['misses']} classification calls "
+                  f"answered without the model ({cache['hit_rate']:.0%}), {cache['entries']} entries")
 
     # Run the agent in interactive mode
     def run(self):
@@ -226,8 +548,12 @@ CRITICAL: Respond with ONLY the JSON object, no explanations, no markdown, no co
                 if not user_input:
                     continue
 
-                # Decide what action to take
-                action = self.decide_action(user_input)
+                # Decide what action to take, together with the preference changes if possible
+                analysis = self.analyze_turn(user_input) if self.use_turn_analysis else None
+                if analysis:
+                    action, preference_delta = analysis
+                else:
+                    action = self.decide_action(user_input)
 
                 print(f"Decided action: {action}")
 
@@ -237,10 +563,14 @@ CRITICAL: Respond with ONLY the JSON object, no explanations, no markdown, no co
                 if action == "quit":
                     # Quit the agent
                     print("🤖 Goodbye!")
+                    self.print_llm_stats()
                     break
 
                 # Update user preferences
-                self.update_user_preferences(user_input)
+                if analysis:
+                    self.apply_preference_delta(preference_delta)
+                else:
+                    self.update_user_preferences(user_input)
 
                 # Build conversation history context
                 history_context = self.get_history_context()
@@ -248,16 +578,15 @@ CRITICAL: Respond with ONLY the JSON object, no explanations, no markdown, no co
                 
                 if action == "general_chat":
                     # Have a normal conversation
-                    prompt = f"""You are a helpful event assistant.
-                    Have a normal conversation with the user.
-                    Ask the user about their interests and if they want to see events.
-                    This is the user's message: {user_input}.
-                    These are the user's preferences: {json.dumps(self.user_preferences)}.
-                    Previous conversation: {history_context}
-                    Respond naturally and helpfully.
-                    """
-                    response = self.ask_ollama(prompt)
-                    print(f"🤖 {response}\n")
+                    messages = self.general_chat_messages(user_input, history_context)
+                    # Print the tokens as they arrive, and keep the full text for history
+                    print("🤖 ", end="", flush=True)
+                    tokens = []
+                    for token in self.ask_ollama_chat_stream(messages):
+                        print(token, end="", flush=True)
+                        tokens.append(token)
+                    print("\n")
+                    response = "".join(tokens)
 
                     # Store conversation in history
                     self.add_to_history(user_input, response)
@@ -270,9 +599,7 @@ CRITICAL: Respond with ONLY the JSON object, no explanations, no markdown, no co
                     suggested_events = self.suggest_events()
 
                     # Format events
-                    formatted_events = self.format_events(suggested_events)
-
-                    response = "Here are some events for you:\n\n" + "\n\n".join(formatted_events)
+                    response = self.events_response(suggested_events)
 
                     print(f"🤖 {response}\n")
 
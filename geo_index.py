@@ -0,0 +1,88 @@
+import math
+from collections import defaultdict
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180 # Along a meridian, about 111 km
+
+
+def haversine_km(latitude1, longitude1, latitude2, longitude2):
+    """Great-circle distance between two points in km"""
+    latitude1, longitude1, latitude2, longitude2 = map(math.radians, (latitude1, longitude1, latitude2, longitude2))
+    a = math.sin((latitude2 - latitude1) / 2) ** 2 + math.cos(latitude1) * math.cos(latitude2) * math.sin((longitude2 - longitude1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def distances_km(latitudes, longitudes, latitude, longitude):
+    """haversine_km from one point to arrays of points, NaN where a point is unknown"""
+    latitudes, longitudes = np.radians(latitudes), np.radians(longitudes)
+    latitude, longitude = math.radians(latitude), math.radians(longitude)
+    a = np.sin((latitudes - latitude) / 2) ** 2 + math.cos(latitude) * np.cos(latitudes) * np.sin((longitudes - longitude) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+def event_coordinates(latitude, longitude, venue, knowledge_graph):
+    """Coordinates of an event as (latitude, longitude), its venue's if it has none, or None"""
+    if latitude is not None and longitude is not None:
+        return latitude, longitude
+    info = knowledge_graph.get("venues", {}).get(venue, {})
+    if info.get("latitude") is not None and info.get("longitude") is not None:
+        return info["latitude"], info["longitude"]
+    return None
+
+
+def city_centroid(city, knowledge_graph):
+    """Centre of a city from the knowledge graph "cities" table, or None"""
+    info = knowledge_graph.get("cities", {}).get(city)
+    if not info:
+        return None
+    return info["latitude"], info["longitude"]
+
+
+class GeoGrid:
+    """Points bucketed into a grid of cells a few km wide.
+
+    A radius query only looks at the cells overlapping the circle's bounding box
+    and computes exact distances for the points in them, instead of for every point.
+    """
+
+    def __init__(self, cell_km=10.0):
+        self.cell_degrees = cell_km / KM_PER_DEGREE
+        self.cells = defaultdict(set)
+        self.points = {} # key -> (latitude, longitude)
+
+    def cell_of(self, latitude, longitude):
+        return math.floor(latitude / self.cell_degrees), math.floor(longitude / self.cell_degrees)
+
+    def add(self, key, latitude, longitude):
+        self.remove(key)
+        self.points[key] = (latitude, longitude)
+        self.cells[self.cell_of(latitude, longitude)].add(key)
+
+    def remove(self, key):
+        point = self.points.pop(key, None)
+        if point is None:
+            return
+        cell = self.cell_of(*point)
+        self.cells[cell].discard(key)
+        if not self.cells[cell]:
+            del self.cells[cell]
+
+    def within(self, latitude, longitude, radius_km):
+        """Return the keys of the points at most radius_km away"""
+        latitude_span = radius_km / KM_PER_DEGREE
+        # A degree of longitude gets shorter towards the poles
+        longitude_span = latitude_span / max(math.cos(math.radians(min(abs(latitude) + latitude_span, 89.0))), 1e-6)
+        low_row, low_column = self.cell_of(latitude - latitude_span, longitude - longitude_span)
+        high_row, high_column = self.cell_of(latitude + latitude_span, longitude + longitude_span)
+
+        found = []
+        for row in range(low_row, high_row + 1):
+            for column in range(low_column, high_column + 1):
+                for key in self.cells.get((row, column), ()):
+                    if haversine_km(latitude, longitude, *self.points[key]) <= radius_km:
+                        found.append(key)
+        return found
+
+    def __len__(self):
+        return len(self.points)
@@ -0,0 +1,114 @@
+import json
+import re
+from response_cache import normalize_input
+
+# Whole messages that leave no doubt, checked first (normalized: lowercase, no punctuation)
+RULES = {
+    "quit": r"(ok |okay |well |no )?(bye|bye bye|goodbye|good bye|quit|exit|stop|see you|see ya|that s all|i m done|"
+            r"adijo|nasvidenje|na svidenje|lp|adio|ciao|čao|konec|izhod|zapri|to je vse|končaj)( now| for now| thanks| hvala)?",
+    "general_chat": r"(hi|hello|hey|hiya|good (morning|afternoon|evening)|živjo|zdravo|živijo|pozdravljen[a]?|dober dan|"
+                    r"dobro jutro|dober večer|hej|thanks|thank you|thx|hvala|najlepša hvala|ok|okay|cool|nice|super|"
+                    r"how are you|kako si|kako gre|who are you|kdo si|what can you do|kaj znaš)( there| again| too| lepa)?",
+    "suggest_events": r"(show|find|recommend|suggest|list|give) (me )?(some |any |a few )?(events?|concerts?|shows?)( please)?|"
+                      r"(events?|concerts?|dogodki|koncerti)( please| prosim)?|"
+                      r"(what s on|what s happening|kaj se dogaja|kaj je nocoj)( (in|at|this|today|tonight|v|na|ta|danes|nocoj)\b.*)?|"
+                      r"(pokaži|predlagaj|priporoči|poišči) (mi )?(kakšne )?(dogodke|koncerte|predstave)( prosim)?"
+}
+
+# Token weights for the overlap classifier. Slovenian words are matched by their stem.
+# quit isn't here: "Where is the exit?" mentions leaving without meaning it, and quitting ends
+# the conversation (the server deletes the session), so only a whole-message rule can choose it.
+LEXICON = {
+    "suggest_events": {
+        "event": 1.5, "events": 1.5, "concert": 1.5, "concerts": 1.5, "show": 1, "shows": 1.5, "gig": 1.5, "gigs": 1.5,
+        "festival": 1, "festivals": 1.5, "tickets": 1, "happening": 1.5, "recommend": 1.5, "recommendation": 1.5,
+        "recommendations": 1.5, "suggest": 1.5, "suggestions": 1.5, "find": 1, "any": 0.5, "tonight": 1, "weekend": 1,
+        "going": 0.5, "dogod": 1.5, "koncert": 1.5, "predstav": 1.5, "vstopnic": 1, "dogaja": 1.5,
+        "priporoč": 1.5, "predlagaj": 1.5, "predlog": 1.5, "pokaži": 1, "poišči": 1, "vikend": 1, "nocoj": 1
+    },
+    "general_chat": {
+        "hi": 2, "hello": 2, "hey": 2, "thanks": 2, "thank": 2, "how": 1, "who": 1, "why": 1, "you": 0.5, "your": 0.5,
+        "joke": 2, "weather": 1.5, "name": 1, "tell": 0.5, "think": 1,
+        "živjo": 2, "zdravo": 2, "hvala": 2, "kako": 1, "kdo": 1, "zakaj": 1, "šalo": 2, "vreme": 1.5, "povej": 0.5,
+        # Telling about yourself is chat too, the preferences are picked up separately
+        "like": 1.5, "love": 1.5, "enjoy": 1.5, "interested": 1.5, "prefer": 1.5, "live": 1.5, "budget": 1.5,
+        "všeč": 1.5, "rad": 1.5, "rada": 1.5, "zanima": 1.5, "živim": 1.5
+    }
+}
+STEM_LENGTH = 4 # Lexicon words at least this long also match longer words (dogodki, dogodke, koncerta ...)
+# "I don't want to quit yet" mentions quitting, but means the opposite, so the LLM decides
+NEGATIONS = {"not", "don", "dont", "never", "no", "ne", "nočem", "nisem", "nikoli"}
+
+
+def parse_action(response, actions):
+    """Return the action in an LLM response ({"action": ...} or plain text), None if there's no valid one"""
+    text = response.strip()
+    try:
+        data = json.loads(text)
+        if isinstance(data, dict):
+            text = str(data.get("action", ""))
+        elif isinstance(data, str):
+            text = data
+    except json.JSONDecodeError:
+        pass
+    # "suggest_events." or "Action: quit" still name exactly one action
+    found = [action for action in actions if re.search(rf"\b{action}\b", text.lower())]
+    return found[0] if len(found) == 1 else None
+
+
+class IntentRouter:
+    """Routes messages to an action without the LLM when the answer is clear.
+
+    Tier 1 matches whole messages against compiled rules ("bye", "živjo", "show me events").
+    Tier 2 adds up lexicon weights of the words in the message, and answers when one
+    action clearly wins. It never answers quit, that takes a whole-message rule. Everything else returns None and should go to the LLM.
+    """
+
+    def __init__(self, actions, min_score=1.5, min_margin=1.0):
+        self.actions = actions
+        self.min_score = min_score
+        self.min_margin = min_margin
+        self.rules = [(action, re.compile(pattern)) for action, pattern in RULES.items() if action in actions]
+        self.words = {action: LEXICON[action] for action in actions if action in LEXICON}
+        self.stats = {"rules": 0, "overlap": 0, "llm": 0}
+
+    def word_weight(self, action, word):
+        words = self.words[action]
+        if word in words:
+            return words[word]
+        for stem, weight in words.items():
+            if len(stem) >= STEM_LENGTH and word.startswith(stem):
+                return weight
+        return 0
+
+    def scores(self, words):
+        return {action: sum(self.word_weight(action, word) for word in set(words)) for action in self.words}
+
+    def route(self, user_input):
+        """Return the action for the message, or None if the LLM should decide"""
+        text = normalize_input(user_input)
+        for action, rule in self.rules:
+            if rule.fullmatch(text):
+                self.stats["rules"] += 1
+                return action
+
+        words = text.split()
+        if NEGATIONS & set(words):
+            self.stats["llm"] += 1
+            return None
+
+        scores = self.scores(words)
+        ranked = sorted(scores.values(), reverse=True)
+        best = max(scores, key=scores.get) if scores else None
+        if best and ranked[0] >= self.min_score and ranked[0] - (ranked[1] if len(ranked) > 1 else 0) >= self.min_margin:
+            self.stats["overlap"] += 1
+            return best
+
+        self.stats["llm"] += 1
+        return None
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        total = sum(self.stats.values())
+        stats["llm_calls_saved"] = (stats["rules"] + stats["overlap"]) / total if total else 0.0
+        return stats
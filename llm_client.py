@@ -0,0 +1,233 @@
+import time
+import json
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from conversation import estimate_tokens
+
+
+def model_names(tags):
+    """Model names in an /api/tags response, with and without the :latest tag"""
+    names = set()
+    for model in tags.get("models", []):
+        name = model.get("name") or model.get("model", "")
+        names.add(name)
+        if name.endswith(":latest"):
+            names.add(name[:-len(":latest")])
+    return names
+
+
+class BaseOllamaClient:
+    """Payloads and counters shared by the sync and the async Ollama clients"""
+
+    def __init__(self, base_url="http://localhost:11434", keep_alive="30m"):
+        self.base_url = base_url.rstrip("/")
+        self.keep_alive = keep_alive # Keep the model loaded in Ollama between turns
+        self.stats = {
+            "calls": 0,
+            "errors": 0,
+            "total_latency": 0.0,
+            "last_latency": 0.0,
+            "last_time_to_first_token": 0.0,
+            "bytes_sent": 0,
+            "bytes_received": 0,
+            "prompt_tokens": 0, # Estimated size of the prompts we sent
+            "prompt_eval_tokens": 0, # Prompt tokens Ollama had to evaluate, the rest came from its cache
+            "eval_tokens": 0 # Generated tokens
+        }
+
+    def generate_payload(self, model, prompt, stream, options):
+        return {
+            "model": model,
+            "prompt": prompt,
+            "stream": stream,
+            "keep_alive": self.keep_alive,
+            **options
+        }
+
+    def chat_payload(self, model, messages, stream, options):
+        return {
+            "model": model,
+            "messages": messages,
+            "stream": stream,
+            "keep_alive": self.keep_alive,
+            **options
+        }
+
+    def count_request(self, body):
+        self.stats["calls"] += 1
+        self.stats["bytes_sent"] += len(body)
+
+    def count_latency(self, started):
+        latency = time.perf_counter() - started
+        self.stats["last_latency"] = latency
+        self.stats["total_latency"] += latency
+
+    def count_tokens(self, payload, data):
+        # Ollama reports prompt_eval_count for the tokens it evaluated, cached prefix tokens aren't counted
+        if "messages" in payload:
+            prompt = "".join(message["content"] for message in payload["messages"])
+        else:
+            prompt = payload.get("prompt", "")
+        self.stats["prompt_tokens"] += estimate_tokens(prompt)
+        self.stats["prompt_eval_tokens"] += data.get("prompt_eval_count", 0)
+        self.stats["eval_tokens"] += data.get("eval_count", 0)
+
+    def get_stats(self):
+        """Return call counters, including the average latency per call"""
+        stats = dict(self.stats)
+        stats["avg_latency"] = stats["total_latency"] / stats["calls"] if stats["calls"] else 0.0
+        # Estimated share of prompt tokens served from Ollama's KV cache
+        if stats["prompt_tokens"]:
+            stats["cache_hit_rate"] = max(0.0, 1 - stats["prompt_eval_tokens"] / stats["prompt_tokens"])
+        else:
+            stats["cache_hit_rate"] = 0.0
+        return stats
+
+
+class TierStats:
+    """Calls and latency per model tier, and how often the small model's answer wasn't good enough"""
+
+    def __init__(self):
+        self.tiers = {"small": {"calls": 0, "total_latency": 0.0}, "large": {"calls": 0, "total_latency": 0.0}}
+        self.escalations = 0 # Small model answers that failed validation, so the large model was asked too
+
+    def record(self, tier, started):
+        self.tiers[tier]["calls"] += 1
+        self.tiers[tier]["total_latency"] += time.perf_counter() - started
+
+    def escalated(self):
+        self.escalations += 1
+
+    def get_stats(self):
+        stats = {}
+        for tier, counts in self.tiers.items():
+            stats[tier] = {**counts, "avg_latency": counts["total_latency"] / counts["calls"] if counts["calls"] else 0.0}
+        stats["escalations"] = self.escalations
+        small_calls = self.tiers["small"]["calls"]
+        stats["escalation_rate"] = self.escalations / small_calls if small_calls else 0.0
+        return stats
+
+
+class OllamaClient(BaseOllamaClient):
+    """Shared HTTP client for talking to Ollama.
+
+    Keeps one pooled keep-alive session, so every prompt reuses an open
+    connection instead of doing a new TCP handshake.
+    """
+
+    def __init__(self, base_url="http://localhost:11434", connect_timeout=3.05, read_timeout=120,
+                 max_retries=3, backoff_factor=0.5, pool_size=10, keep_alive="30m"):
+        super().__init__(base_url, keep_alive)
+        self.timeout = (connect_timeout, read_timeout) # A stalled Ollama can't hang the agent forever
+
+        # Retry connection resets and 5xx errors a few times, waiting a bit longer each time.
+        # A read timeout isn't retried, the model may still be generating and would only be asked again.
+        retry = Retry(
+            total=max_retries,
+            connect=max_retries,
+            read=0,
+            status=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(500, 502, 503, 504),
+            allowed_methods=frozenset(["GET", "POST"]),
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def post(self, path, payload):
+        """POST a JSON payload to an Ollama endpoint and return the parsed JSON response"""
+        body = json.dumps(payload).encode("utf-8")
+        started = time.perf_counter()
+        self.count_request(body)
+        try:
+            response = self.session.post(
+                self.base_url + path,
+                data=body,
+                headers={"Content-Type": "application/json"},
+                timeout=self.timeout
+            )
+            response.raise_for_status()
+            self.stats["bytes_received"] += len(response.content)
+            data = response.json()
+            self.count_tokens(payload, data)
+            return data
+        except requests.exceptions.RequestException:
+            self.stats["errors"] += 1
+            raise
+        finally:
+            self.count_latency(started)
+
+    def post_stream(self, path, payload):
+        """POST a JSON payload and yield each line of Ollama's NDJSON stream as a dict"""
+        body = json.dumps(payload).encode("utf-8")
+        started = time.perf_counter()
+        self.count_request(body)
+        try:
+            with self.session.post(
+                self.base_url + path,
+                data=body,
+                headers={"Content-Type": "application/json"},
+                timeout=self.timeout,
+                stream=True
+            ) as response:
+                response.raise_for_status()
+                first_token = True
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    self.stats["bytes_received"] += len(line)
+                    if first_token:
+                        self.stats["last_time_to_first_token"] = time.perf_counter() - started
+                        first_token = False
+                    chunk = json.loads(line)
+                    if chunk.get("error"):
+                        raise requests.exceptions.RequestException(chunk["error"])
+                    if chunk.get("done"):
+                        self.count_tokens(payload, chunk)
+                    yield chunk
+                    if chunk.get("done"):
+                        break
+        except requests.exceptions.RequestException:
+            self.stats["errors"] += 1
+            raise
+        finally:
+            self.count_latency(started)
+
+    def list_models(self):
+        """Names of the models downloaded in Ollama, from /api/tags"""
+        response = self.session.get(self.base_url + "/api/tags", timeout=self.timeout)
+        response.raise_for_status()
+        return model_names(response.json())
+
+    def generate(self, model, prompt, **options):
+        """Send a prompt to /api/generate and return the generated text"""
+        payload = self.generate_payload(model, prompt, False, options)
+        return self.post("/api/generate", payload)["response"]
+
+    def generate_stream(self, model, prompt, **options):
+        """Send a prompt to /api/generate and yield the generated tokens as they arrive"""
+        payload = self.generate_payload(model, prompt, True, options)
+        for chunk in self.post_stream("/api/generate", payload):
+            if chunk.get("response"):
+                yield chunk["response"]
+
+    def chat(self, model, messages, **options):
+        """Send messages to /api/chat and return the assistant's reply"""
+        payload = self.chat_payload(model, messages, False, options)
+        return self.post("/api/chat", payload)["message"]["content"]
+
+    def chat_stream(self, model, messages, **options):
+        """Send messages to /api/chat and yield the reply's tokens as they arrive"""
+        payload = self.chat_payload(model, messages, True, options)
+        for chunk in self.post_stream("/api/chat", payload):
+            content = chunk.get("message", {}).get("content")
+            if content:
+                yield content
+
+    def close(self):
+        self.session.close()
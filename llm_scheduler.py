@@ -0,0 +1,157 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+
+# Request priorities, lower goes first. Classification calls are short and the turn waits on them,
+# chat answers are long generations.
+CLASSIFY = 0
+CHAT = 1
+PRIORITY_NAMES = {CLASSIFY: "classify", CHAT: "chat"}
+
+
+class LLMOverloaded(Exception):
+    """The scheduler dropped a request: the queue was full, or it couldn't start before its deadline"""
+
+
+class Waiter:
+    __slots__ = ("future", "queued_at")
+
+    def __init__(self, future, queued_at):
+        self.future = future
+        self.queued_at = queued_at
+
+
+class LLMScheduler:
+    """Admission control in front of one Ollama backend.
+
+    At most max_in_flight requests run at once, the rest wait in a queue per priority.
+    Classification calls start before any waiting chat answer. Within a priority, sessions
+    take turns, so one busy session can't starve the others. A request that can't start
+    within its priority's deadline (in seconds) is dropped with LLMOverloaded: right away
+    if the expected wait is already longer, otherwise when the deadline passes. When
+    max_queue requests are waiting, a new one pushes out the newest lower-priority request,
+    or is rejected if there is none.
+    """
+
+    def __init__(self, max_in_flight=4, max_queue=256, deadlines=None):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.deadlines = deadlines or {CLASSIFY: 10.0, CHAT: 30.0}
+        self.queues = {priority: OrderedDict() for priority in sorted(self.deadlines)} # session -> deque of waiters
+        self.in_flight = 0
+        self.depth = 0
+        self.service_time = None # Moving average of how long a request runs
+        self.waits = {priority: deque(maxlen=1000) for priority in self.deadlines} # Recent queue waits
+        self.stats = {"admitted": 0, "completed": 0, "rejected": 0, "expired": 0, "shed": 0,
+                      "peak_in_flight": 0, "peak_depth": 0}
+
+    def estimated_wait(self, priority):
+        """Seconds until a new request with this priority could start, from the average service time"""
+        if self.service_time is None:
+            return 0.0
+        ahead = sum(len(waiters) for p, queue in self.queues.items() if p <= priority for waiters in queue.values())
+        free = self.max_in_flight - self.in_flight
+        return max(0, ahead + 1 - free) / self.max_in_flight * self.service_time
+
+    async def acquire(self, priority=CHAT, session=None):
+        """Wait for a free slot, raise LLMOverloaded if the request was dropped"""
+        if self.in_flight < self.max_in_flight and self.depth == 0:
+            self.start(priority, 0.0)
+            return
+        if self.depth >= self.max_queue and not self.shed_below(priority):
+            self.stats["rejected"] += 1
+            raise LLMOverloaded(f"{self.depth} requests are already waiting")
+        deadline = self.deadlines[priority]
+        if self.estimated_wait(priority) > deadline:
+            self.stats["rejected"] += 1
+            raise LLMOverloaded(f"expected wait is longer than {deadline:.0f} s")
+
+        waiter = Waiter(asyncio.get_running_loop().create_future(), time.monotonic())
+        self.queues[priority].setdefault(session, deque()).append(waiter)
+        self.depth += 1
+        self.stats["peak_depth"] = max(self.stats["peak_depth"], self.depth)
+        try:
+            await asyncio.wait_for(waiter.future, deadline)
+        except asyncio.TimeoutError:
+            self.depth -= 1 # The cancelled waiter stays queued, dispatch skips it
+            self.stats["expired"] += 1
+            raise LLMOverloaded(f"no free slot within {deadline:.0f} s")
+        except asyncio.CancelledError:
+            if waiter.future.cancelled():
+                self.depth -= 1
+            elif waiter.future.exception() is None:
+                self.release(0.0) # Got a slot just before being cancelled, pass it on
+            raise
+
+    def start(self, priority, waited):
+        self.in_flight += 1
+        self.stats["admitted"] += 1
+        self.stats["peak_in_flight"] = max(self.stats["peak_in_flight"], self.in_flight)
+        self.waits[priority].append(waited)
+
+    def release(self, service_time):
+        """Free the slot of a finished request and start the next ones in line"""
+        self.in_flight -= 1
+        self.stats["completed"] += 1
+        if service_time:
+            self.service_time = service_time if self.service_time is None else 0.8 * self.service_time + 0.2 * service_time
+        self.dispatch()
+
+    def dispatch(self):
+        while self.in_flight < self.max_in_flight:
+            found = self.next_waiter()
+            if found is None:
+                return
+            priority, waiter = found
+            self.start(priority, time.monotonic() - waiter.queued_at)
+            waiter.future.set_result(None)
+
+    def next_waiter(self):
+        for priority, queue in self.queues.items():
+            while queue:
+                session, waiters = next(iter(queue.items()))
+                waiter = waiters.popleft()
+                if waiters:
+                    queue.move_to_end(session) # Next time, the next session goes first
+                else:
+                    del queue[session]
+                if waiter.future.done():
+                    continue # Timed out, cancelled or shed
+                self.depth -= 1
+                return priority, waiter
+        return None
+
+    def shed_below(self, priority):
+        """Drop the newest waiting request with a lower priority than priority, return True if there was one"""
+        for lower in sorted(self.queues, reverse=True):
+            if lower <= priority:
+                break
+            queue = self.queues[lower]
+            for session in list(reversed(queue)):
+                waiters = queue[session]
+                while waiters:
+                    waiter = waiters.pop()
+                    if not waiter.future.done():
+                        if not waiters:
+                            del queue[session]
+                        waiter.future.set_exception(LLMOverloaded("pushed out by a more urgent request"))
+                        self.depth -= 1
+                        self.stats["shed"] += 1
+                        return True
+                del queue[session]
+        return False
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats["in_flight"] = self.in_flight
+        stats["queue_depth"] = self.depth
+        stats["avg_service_time"] = self.service_time or 0.0
+        for priority, name in PRIORITY_NAMES.items():
+            if priority not in self.queues:
+                continue
+            waits = sorted(self.waits[priority])
+            stats[f"{name}_waiting"] = sum(1 for waiters in self.queues[priority].values()
+                                           for waiter in waiters if not waiter.future.done())
+            stats[f"{name}_avg_wait"] = sum(waits) / len(waits) if waits else 0.0
+            stats[f"{name}_p95_wait"] = waits[int(len(waits) * 0.95)] if waits else 0.0
+        return stats
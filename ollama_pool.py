@@ -0,0 +1,217 @@
+import asyncio
+import time
+import aiohttp
+from llm_client import model_names
+from llm_scheduler import CHAT, LLMOverloaded
+
+# Errors after which the request is tried again on another backend
+RETRYABLE = (aiohttp.ClientError, asyncio.TimeoutError, LLMOverloaded)
+
+
+class Backend:
+    """One Ollama host in the pool, with its circuit breaker.
+
+    After failure_threshold failures in a row the circuit opens, and the host gets no
+    requests for cooldown seconds. Then one trial request (or a successful health probe)
+    decides whether it closes again.
+    """
+
+    def __init__(self, client, failure_threshold=3, cooldown=10.0):
+        self.client = client
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.models = None # Models the host has, from /api/tags. None until the first probe.
+        self.warm = {} # model -> when it last answered, Ollama keeps it loaded for a while after that
+        self.outstanding = 0
+        self.failures = 0 # In a row
+        self.open_until = 0.0
+        self.stats = {"requests": 0, "failures": 0, "circuit_opened": 0}
+
+    def available(self, now):
+        if self.open_until > now:
+            return False
+        if self.failures >= self.failure_threshold:
+            return self.outstanding == 0 # Half open: one trial request at a time
+        return True
+
+    def has_model(self, model):
+        return self.models is None or model in self.models
+
+    def succeeded(self, model):
+        self.failures = 0
+        self.open_until = 0.0
+        self.warm[model] = time.monotonic()
+
+    def failed(self):
+        self.failures += 1
+        self.stats["failures"] += 1
+        if self.failures >= self.failure_threshold:
+            if self.open_until <= time.monotonic():
+                self.stats["circuit_opened"] += 1
+            self.open_until = time.monotonic() + self.cooldown
+
+    async def probe(self, timeout):
+        """Ask the host for its models, and open or close the circuit by the answer"""
+        try:
+            async with self.client.get_session().get(self.client.base_url + "/api/tags",
+                                                     timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                response.raise_for_status()
+                self.models = model_names(await response.json(content_type=None))
+            self.failures = 0
+            self.open_until = 0.0
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+            self.failures = max(self.failures, self.failure_threshold - 1)
+            self.failed()
+
+    def get_stats(self, now):
+        if self.open_until > now:
+            circuit = "open"
+        elif self.failures >= self.failure_threshold:
+            circuit = "half open"
+        else:
+            circuit = "closed"
+        return {
+            "url": self.client.base_url,
+            "circuit": circuit,
+            "outstanding": self.outstanding,
+            "models": sorted(self.models) if self.models is not None else None,
+            **self.stats,
+            "llm": self.client.get_stats()
+        }
+
+
+class AsyncOllamaPool:
+    """Spreads requests over several Ollama hosts, with the same interface as AsyncOllamaClient.
+
+    Each request goes to the available host with the fewest outstanding requests that
+    has the model. Hosts that answered for the model recently still have it loaded, the
+    others count affinity_penalty requests extra, so models don't keep swapping in and
+    out. Hosts are probed at /api/tags every probe_interval seconds, and a request that
+    fails on one host is tried on the next one (streams only until the first token).
+    """
+
+    def __init__(self, clients, probe_interval=15.0, probe_timeout=2.0, affinity_penalty=4, warm_for=30 * 60,
+                 failure_threshold=3, cooldown=10.0):
+        self.backends = [Backend(client, failure_threshold, cooldown) for client in clients]
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+        self.affinity_penalty = affinity_penalty
+        self.warm_for = warm_for
+        self.prober = None # Started with the first request, it needs the running event loop
+        self.stats = {"retries": 0, "no_backend": 0}
+
+    def start_probing(self):
+        if self.prober is None or self.prober.done():
+            self.prober = asyncio.create_task(self.probe_forever())
+
+    async def probe_all(self):
+        await asyncio.gather(*(backend.probe(self.probe_timeout) for backend in self.backends))
+
+    async def probe_forever(self):
+        while True:
+            await self.probe_all()
+            await asyncio.sleep(self.probe_interval)
+
+    async def has_model(self, model):
+        """False only if every host is known to be without the model"""
+        await self.probe_all()
+        return any(backend.has_model(model) for backend in self.backends)
+
+    def pick(self, model, tried):
+        """The backend for the next try, None if there's none left"""
+        now = time.monotonic()
+        backends = [backend for backend in self.backends if backend not in tried and backend.available(now)]
+        # Hosts whose model list is out of date may still have it, so they're the last resort
+        with_model = [backend for backend in backends if backend.has_model(model)]
+
+        def load(backend):
+            cold = now - backend.warm.get(model, -self.warm_for) >= self.warm_for
+            return backend.outstanding + (self.affinity_penalty if cold else 0), backend.stats["requests"]
+
+        return min(with_model or backends, key=load, default=None)
+
+    async def call(self, model, request):
+        """Run request(client) on the best backend, and on the next ones if it fails"""
+        self.start_probing()
+        tried = []
+        last_error = None
+        while True:
+            backend = self.pick(model, tried)
+            if backend is None:
+                break
+            tried.append(backend)
+            backend.outstanding += 1
+            backend.stats["requests"] += 1
+            try:
+                result = await request(backend.client)
+            except RETRYABLE as e:
+                self.count_failure(backend, model, e)
+                last_error = e
+                continue
+            finally:
+                backend.outstanding -= 1
+            backend.succeeded(model)
+            return result
+        self.stats["no_backend"] += 1
+        raise last_error or aiohttp.ClientConnectionError("No available Ollama backend")
+
+    def count_failure(self, backend, model, error):
+        self.stats["retries"] += 1
+        if isinstance(error, aiohttp.ClientResponseError) and error.status == 404:
+            if backend.models is not None:
+                backend.models.discard(model) # The host doesn't have the model, it isn't down
+        elif not isinstance(error, LLMOverloaded):
+            backend.failed()
+
+    async def generate(self, model, prompt, priority=CHAT, session=None, **options):
+        return await self.call(model, lambda client: client.generate(model, prompt, priority, session, **options))
+
+    async def chat(self, model, messages, priority=CHAT, session=None, **options):
+        return await self.call(model, lambda client: client.chat(model, messages, priority, session, **options))
+
+    async def chat_stream(self, model, messages, priority=CHAT, session=None, **options):
+        self.start_probing()
+        tried = []
+        last_error = None
+        while True:
+            backend = self.pick(model, tried)
+            if backend is None:
+                break
+            tried.append(backend)
+            backend.outstanding += 1
+            backend.stats["requests"] += 1
+            streamed = False
+            try:
+                async for token in backend.client.chat_stream(model, messages, priority, session, **options):
+                    streamed = True
+                    yield token
+            except RETRYABLE as e:
+                self.count_failure(backend, model, e)
+                if streamed:
+                    raise # The user already saw part of the answer
+                last_error = e
+                continue
+            finally:
+                backend.outstanding -= 1
+            backend.succeeded(model)
+            return
+        self.stats["no_backend"] += 1
+        raise last_error or aiohttp.ClientConnectionError("No available Ollama backend")
+
+    def get_stats(self):
+        """Counters of all backends added up, and each backend's own under "backends" """
+        now = time.monotonic()
+        backends = [backend.get_stats(now) for backend in self.backends]
+        stats = dict(self.stats)
+        for key in ["calls", "errors", "coalesced", "bytes_sent", "bytes_received", "prompt_tokens", "prompt_eval_tokens",
+                    "eval_tokens", "total_latency"]:
+            stats[key] = sum(backend["llm"].get(key, 0) for backend in backends)
+        stats["avg_latency"] = stats["total_latency"] / stats["calls"] if stats["calls"] else 0.0
+        stats["backends"] = backends
+        return stats
+
+    async def close(self):
+        if self.prober is not None:
+            self.prober.cancel()
+        for backend in self.backends:
+            await backend.client.close()
@@ -0,0 +1,181 @@
+import re
+from datetime import date
+from response_cache import normalize_input
+from date_window import parse_window
+
+# English words that name each interest, matched whole ("tech" isn't "techno")
+INTEREST_WORDS = {
+    "music": ["music", "musical", "musicals", "concert", "concerts", "gig", "gigs", "band", "bands", "jazz", "rock", "pop",
+              "techno", "classical", "opera", "operas", "festival", "festivals"],
+    "theater": ["theater", "theaters", "theatre", "theatres", "drama", "comedy", "standup", "stand up", "ballet"],
+    "sports": ["sport", "sports", "football", "soccer", "basketball", "hockey", "hiking", "running", "climbing", "match",
+               "matches"],
+    "entrepreneurship": ["entrepreneurship", "entrepreneur", "entrepreneurs", "startup", "startups", "business",
+                         "networking"],
+    "technology": ["technology", "tech", "ai", "programming", "coding", "software", "computers", "robotics"],
+    "history": ["history", "historic", "historical", "museum", "museums", "castle", "castles", "heritage",
+                # Slovenian grad (castle) is too short a stem, "graduate" starts with it
+                "grad", "grada", "gradu", "gradom", "gradovi", "gradov", "gradove", "gradovih"]
+}
+# Slovenian stems, these also match longer words (glasbo, koncerte, zgodovino ...)
+INTEREST_STEMS = {
+    "music": ["glasb", "koncert", "festival"],
+    "theater": ["gledališ", "predstav", "komedij", "balet"],
+    "sports": ["šport", "nogomet", "košark", "hokej", "tekm", "pohod"],
+    "entrepreneurship": ["podjetn", "posel", "poslovn"],
+    "technology": ["tehnolog", "programiranj", "računalni", "umetna inteligenca"],
+    "history": ["zgodovin", "muzej", "dedišč"]
+}
+STEM_LENGTH = 4 # Only stems at least this long match longer words
+# Phrases with an interest word that mean something else, left out before matching ("rock climbing" is sports)
+OTHER_MEANINGS = ["rock climbing", "pop up"]
+
+# Words that make a sentence about an interest mean "not anymore"
+NEGATIONS = {"not", "don", "dont", "no", "never", "stop", "stopped", "quit", "done", "tired", "bored", "sick", "hate", "dislike", "anymore", "ne", "nočem", "nisem", "ni", "več", "dovolj", "sovražim"}
+# Clauses are read on their own, so a negation only applies to its own clause
+CLAUSE_BREAKS = r"\b(?:but|although|however|ampak|vendar|toda)\b|[.;!?]"
+# A city after these is where the user was, "I moved from Ljubljana to Maribor" is about Maribor
+FROM_WORDS = {"from", "iz"}
+
+# "budget" isn't here, "my budget is 100 EUR" isn't affordable, the amount decides
+PRICE_WORDS = {
+    "affordable": ["free", "cheap", "cheaper", "cheapest", "affordable", "inexpensive", "low cost"],
+    "moderate": ["moderate", "moderately", "mid range", "midrange", "reasonable", "reasonably priced", "not too expensive"]
+}
+PRICE_STEMS = {
+    "affordable": ["brezplač", "poceni", "ugodn"],
+    "moderate": ["zmern", "srednj"]
+}
+# "up to 30", "under 15", "do 20" or "30 EUR", "15€", "20 evrov"
+AMOUNT = re.compile(r"(?:up to|under|below|max|maximum|less than|at most|do|pod|največ)\s+(\d+(?:[.,]\d+)?)|"
+                    r"(\d+(?:[.,]\d+)?)\s*(?:eur|€|evr)")
+AMOUNT_CONTEXT = re.compile(r"eur|€|evr|price|cost|budget|pay|spend|cena|stane|proračun|plačam|up to|under|below|največ")
+
+# Without any of these, a message with no match isn't about preferences, so the LLM isn't asked.
+# English cues are matched whole ("fan" isn't "fantastic"), with the Slovenian words too short to be stems
+PREFERENCE_WORDS = ["like", "likes", "liked", "love", "loves", "loved", "enjoy", "enjoys", "enjoyed", "interest",
+                    "interests", "interested", "into", "fan", "fans", "prefer", "prefers", "preferred", "favorite",
+                    "favourite", "favorites", "favourites", "hobby", "hobbies", "budget", "price", "prices", "cost",
+                    "costs", "expensive", "live", "lives", "living", "from", "near", "moved", "visiting", "when",
+                    "date", "dates", "rad", "rada", "radi", "raje", "drag", "draga", "drago", "dragi", "drage",
+                    "cena", "ceno", "cene"]
+# Slovenian stems, these also match longer words (zanimajo, ljubim, proračuna ...)
+PREFERENCE_STEMS = ["všeč", "zanima", "ljubi", "živim", "prihajam", "proračun", "kdaj", "datum"]
+
+def city_stems(city):
+    """Forms a city name can start with in Slovenian cases: Ljubljana -> ljubljani, Koper -> kopru"""
+    name = city.casefold()
+    stems = {name}
+    if name[-1] in "aeiou":
+        stems.add(name[:-1])
+    elif len(name) > 3 and name[-2] == "e":
+        stems.add(name[:-2] + name[-1]) # The e drops out: Koper -> Kopra, Kopru
+    return stems
+
+
+class PreferenceExtractor:
+    """Finds preference changes in a message with word lists, instead of asking the LLM.
+
+    Returns the same delta as the turn analysis: interests to add or remove, a known
+    city (from the knowledge graph venues and cities), a price tier from the knowledge
+    graph pricing (by word or amount), and a date window.
+    """
+
+    def __init__(self, knowledge_graph):
+        self.knowledge_graph = knowledge_graph
+        self.interests = [interest for interest in INTEREST_WORDS if interest in knowledge_graph.get("interests", INTEREST_WORDS)]
+        self.tiers = sorted(knowledge_graph.get("pricing", {}).items(), key=lambda tier: tier[1])
+
+    def cities(self):
+        # Read every time, the catalog sync adds venues and cities
+        cities = {info.get("location") for info in self.knowledge_graph.get("venues", {}).values()}
+        cities |= set(self.knowledge_graph.get("cities", {}))
+        return sorted(city for city in cities if city)
+
+    def word_matches(self, words, text, lexicon_words, stems=()):
+        """True if the text has one of lexicon_words whole, or a word starting with one of stems"""
+        for word in [*lexicon_words, *stems]:
+            if " " in word and re.search(rf"\b{word}\b", text):
+                return True
+        if set(lexicon_words) & set(words):
+            return True
+        return any(w.startswith(stem) for stem in stems if len(stem) >= STEM_LENGTH for w in words)
+
+    def find_interests(self, user_input):
+        add, remove = [], []
+        # Look at each clause on its own, so "I like music but not sports" removes only sports
+        for clause in re.split(CLAUSE_BREAKS, user_input.casefold()):
+            clause = normalize_input(clause)
+            for phrase in OTHER_MEANINGS:
+                clause = re.sub(rf"\b{phrase}\b", phrase.split()[-1], clause)
+            words = clause.split()
+            # A negated clause ("I'm done with jazz") only ever removes interests
+            negated = bool(NEGATIONS & set(words))
+            for interest in self.interests:
+                if self.word_matches(words, clause, INTEREST_WORDS[interest], INTEREST_STEMS.get(interest, ())):
+                    (remove if negated else add).append(interest)
+        return add, [interest for interest in remove if interest not in add]
+
+    def find_city(self, user_input):
+        """The first city mentioned, leaving out negated clauses ("I live in Maribor, not Bled").
+        A city after "from" only counts if there is no other one."""
+        found = [] # (after "from", clause, position, city)
+        # Commas split clauses too here, "not Bled" in the example is one
+        for c, clause in enumerate(re.split(CLAUSE_BREAKS + "|,", user_input.casefold())):
+            words = normalize_input(clause).split()
+            if NEGATIONS & set(words):
+                continue
+            for city in self.cities():
+                city_words = city.casefold().split()
+                for i in range(len(words) - len(city_words) + 1):
+                    window = words[i:i + len(city_words)]
+                    if window[:-1] == city_words[:-1] and any(
+                        window[-1].startswith(stem) and len(window[-1]) - len(stem) <= 3 for stem in city_stems(city_words[-1])
+                    ):
+                        found.append((i > 0 and words[i - 1] in FROM_WORDS, c, i, city))
+                        break
+        return min(found)[3] if found else ""
+
+    def find_price(self, user_input, text, words):
+        # An amount says more than a word: "my budget is 100 EUR" is above every tier, not "affordable"
+        raw = user_input.casefold()
+        amounts = [float((match.group(1) or match.group(2)).replace(",", ".")) for match in AMOUNT.finditer(raw)]
+        if amounts and AMOUNT_CONTEXT.search(raw): # "next 7 days" isn't a price
+            # The cheapest tier that covers the amount, nothing above the most expensive one
+            for tier, limit in self.tiers:
+                if amounts[0] <= limit:
+                    return tier
+            return ""
+        for tier, _ in self.tiers:
+            if self.word_matches(words, text, PRICE_WORDS.get(tier, [tier]), PRICE_STEMS.get(tier, ())):
+                return tier
+        return ""
+
+    def find_date(self, user_input, current_date):
+        try:
+            window = parse_window(user_input, date.fromisoformat(current_date))
+        except ValueError:
+            return ""
+        if window is None:
+            return ""
+        start, end = window[0].isoformat(), window[1].isoformat()
+        return start if start == end else f"{start} to {end}"
+
+    def extract(self, user_input, current_date):
+        """Return (delta, matched), matched is False if nothing was found"""
+        text = normalize_input(user_input)
+        words = text.split()
+        add, remove = self.find_interests(user_input)
+        delta = {
+            "add_interests": add,
+            "remove_interests": remove,
+            "location": self.find_city(user_input),
+            "preferred_price": self.find_price(user_input, text, words),
+            "date": self.find_date(user_input, current_date)
+        }
+        return delta, any(delta.values())
+
+    def looks_like_preference(self, user_input):
+        """True if the message seems to talk about preferences, so an empty result should go to the LLM"""
+        text = normalize_input(user_input)
+        return self.word_matches(text.split(), text, PREFERENCE_WORDS, PREFERENCE_STEMS)
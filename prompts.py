@@ -0,0 +1,92 @@
+"""
+Prompt assembly for the /api/chat endpoint.
+
+Ollama keeps the evaluated prompt in its KV cache and only re-evaluates what comes
+after the longest prefix it has already seen. So every prompt starts with a fixed
+system message (the long instructions), and the parts that change every turn
+(history, preferences, the user's message) come last, in the user message.
+"""
+
+import json
+
+DECIDE_ACTION_SYSTEM = """Based on the user input, decide what action to take.
+
+Available actions:
+- general_chat: Have a normal conversation.
+- suggest_events: Show personalized event recommendations. Return this action ONLY if the user asks for them in some way.
+- quit: Quit the agent, end the conversation
+
+Respond with ONLY a JSON object with the action name, like {"action": "general_chat"}, nothing else."""
+
+USER_PREFERENCES_SYSTEM = """You are a JSON-only response system. You must respond with ONLY valid JSON, no other text.
+
+Update the user preferences based on the user's message.
+Keep all other fields unchanged and don't remove or add any fields.
+
+IMPORTANT: Only update preferences if the user explicitly mentions interests, location, or price preferences.
+For simple greetings like "Hi", "Hello", "How are you?", do NOT change any preferences.
+
+If user expresses interest in a specific topic, update the interests field, if it's one of the following:
+- music
+- theater
+- sports
+- entrepreneurship
+- technology
+- history
+
+Examples - if the user said:
+- "I enjoy learning about AI" → add "technology" to interests
+
+For preferred_price, you can only add the following:
+- affordable (up to 20 EUR)
+- moderate (up to 50 EUR)
+For anything above 50 EUR, do not update the preferred_price field.
+
+Examples - if the user said:
+- "I prefer free events" → update "preferred_price" to "affordable"
+- "I prefer events up to 50 EUR" → update "preferred_price" to "moderate"
+
+CRITICAL: Respond with ONLY the JSON object, no explanations, no markdown, no code blocks, no extra text."""
+
+GENERAL_CHAT_SYSTEM = """You are a helpful event assistant.
+Have a normal conversation with the user.
+Ask the user about their interests and if they want to see events.
+Respond naturally and helpfully."""
+
+
+def turn_analysis_system(knowledge_graph):
+    # Only depends on the knowledge graph, so it's built once and stays the same every turn
+    interests = knowledge_graph.get("interests", [])
+    pricing = knowledge_graph.get("pricing", {})
+    price_tiers = " or ".join(f'"{tier}" (up to {limit} EUR)' for tier, limit in pricing.items())
+
+    return f"""You are a JSON-only response system. Analyze the user's message and respond with ONLY valid JSON.
+
+Decide what action to take:
+- general_chat: Have a normal conversation.
+- suggest_events: Show personalized event recommendations. Use this action ONLY if the user asks for them in some way.
+- quit: Quit the agent, end the conversation
+
+Then decide what changed in the user's preferences:
+- add_interests / remove_interests: only these interests are allowed: {", ".join(interests)}
+- location: the city the user mentioned, or "" if they didn't mention one
+- preferred_price: {price_tiers}, or "" if they didn't mention a price
+- date: the date or period the user mentioned as they said it (like "this weekend", "2025-11-20", "next 7 days"), or "" if they didn't mention one
+For simple greetings like "Hi", "Hello", "How are you?", do NOT change any preferences."""
+
+
+def build_messages(system, history_context=None, user_preferences=None, user_input=None):
+    """Build /api/chat messages: the static system text first, the volatile parts last.
+    History only grows at the end, so it goes before the preferences and the message."""
+    parts = []
+    if history_context:
+        parts.append(f"Previous conversation:\n{history_context}")
+    if user_preferences is not None:
+        parts.append(f"Current user preferences: {json.dumps(user_preferences)}")
+    if user_input is not None:
+        parts.append(f'User said: "{user_input}"')
+
+    return [
+        {"role": "system", "content": system},
+        {"role": "user", "content": "\n\n".join(parts)}
+    ]
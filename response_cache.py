@@ -0,0 +1,102 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalize_input(text):
+    """Fold case, punctuation and whitespace, so "Hello!" and "  hello" are the same message"""
+    return " ".join(re.sub(r"[^\w\s]", " ", text.casefold()).split())
+
+
+class ResponseCache:
+    """LRU cache with a TTL for LLM responses that only depend on their input.
+
+    Keys combine the model, a template id (fingerprint of the system prompt and
+    options, so changing a prompt never returns old answers), the normalized user
+    input and any extra context the answer depends on. With a path, entries are
+    also kept in SQLite and survive restarts.
+    """
+
+    def __init__(self, max_entries=512, ttl=24 * 3600, path=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict() # key -> (response, stored_at), least recently used first
+        self.lock = threading.Lock() # The async agent calls the LLM from threads too
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0, "stores": 0}
+
+        self.db = None
+        if path:
+            self.db = sqlite3.connect(path, check_same_thread=False)
+            self.db.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, response TEXT, stored_at REAL)")
+            self.db.execute("DELETE FROM responses WHERE stored_at < ?", (time.time() - ttl,))
+            self.db.commit()
+
+    def template_id(self, name, system_prompt, options=None):
+        fingerprint = json.dumps([system_prompt, options or {}], sort_keys=True)
+        return f"{name}:{hashlib.sha256(fingerprint.encode('utf-8')).hexdigest()[:12]}"
+
+    def key(self, model, template_id, user_input, context=""):
+        return json.dumps([model, template_id, normalize_input(user_input), context], ensure_ascii=False)
+
+    def get(self, key):
+        """Return the cached response, or None"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None and self.db is not None:
+                row = self.db.execute("SELECT response, stored_at FROM responses WHERE key = ?", (key,)).fetchone()
+                if row:
+                    entry = self.remember(key, *row)
+
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            response, stored_at = entry
+            if time.time() - stored_at > self.ttl:
+                self.forget(key)
+                self.stats["expired"] += 1
+                self.stats["misses"] += 1
+                return None
+
+            self.entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return response
+
+    def put(self, key, response):
+        with self.lock:
+            stored_at = time.time()
+            self.remember(key, response, stored_at)
+            self.stats["stores"] += 1
+            if self.db is not None:
+                self.db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?)", (key, response, stored_at))
+                self.db.commit()
+
+    def remember(self, key, response, stored_at):
+        self.entries[key] = (response, stored_at)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.stats["evictions"] += 1
+        return self.entries[key]
+
+    def forget(self, key):
+        self.entries.pop(key, None)
+        if self.db is not None:
+            self.db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self.db.commit()
+
+    def get_stats(self):
+        with self.lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self.entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
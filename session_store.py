@@ -0,0 +1,214 @@
+import itertools
+import json
+import sqlite3
+import threading
+import time
+
+DELETED = object() # Pending entry of a session that was deleted
+
+
+class SessionStore:
+    """Keeps conversations and preferences in SQLite (WAL mode), written behind the turns.
+
+    save only records what changed in memory, a writer thread commits everything that
+    piled up in one transaction every flush_interval seconds (sooner when max_pending
+    sessions are waiting). A crash loses the changes of the last flush_interval seconds
+    at most, plus a write that was running.
+    Only the turns still in the conversation context are kept, the older ones are
+    deleted when they're folded into the summary. Sessions nobody touched for
+    expire_after seconds are deleted.
+
+    Several processes can share the file, a session should only be open in one of
+    them at a time: after a process releases it (idle eviction), any other one can
+    load it.
+    """
+
+    def __init__(self, path, flush_interval=1.0, max_pending=500, expire_after=30 * 24 * 3600):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.expire_after = expire_after
+        self.lock = threading.Lock()
+        self.pending = {} # session id -> changes not written yet, or DELETED
+        self.in_flight = {} # The batch flush is writing now, load still reads it until it's committed
+        self.saved_turns = {} # session id -> turn_count already handed to save, so only new turns are copied
+        self.stats = {"saves": 0, "flushes": 0, "sessions_written": 0, "turns_written": 0, "flush_time": 0.0,
+                      "loads": 0, "expired": 0}
+
+        self.db = self.connect() # Used by the writer thread only
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY, preferences TEXT, summary TEXT,
+                turn_count INTEGER, first_turn INTEGER, updated_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS turns (
+                session_id TEXT, number INTEGER, user_input TEXT, agent_response TEXT,
+                PRIMARY KEY (session_id, number)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS sessions_updated_at ON sessions (updated_at);
+        """)
+        self.reader = self.connect()
+        self.reader_lock = threading.Lock()
+
+        self.wake = threading.Event()
+        self.closed = False
+        self.writer = threading.Thread(target=self.write_behind, daemon=True)
+        self.writer.start()
+
+    def connect(self):
+        db = sqlite3.connect(self.path, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL") # Readers don't wait for the writer
+        db.execute("PRAGMA synchronous=NORMAL") # A commit survives a crash of the process, the window covers the rest
+        return db
+
+    def save(self, session_id, preferences, conversation):
+        """Record the session's state after a turn. Doesn't touch the disk."""
+        new = conversation.turn_count - self.saved_turns.get(session_id, 0)
+        kept = len(conversation.turns)
+        first_new = max(kept - new, 0)
+        first_number = conversation.turn_count - kept + 1
+        turns = [(first_number + first_new + i, turn["user"], turn["agent"])
+                 for i, turn in enumerate(itertools.islice(conversation.turns, first_new, None))]
+        self.saved_turns[session_id] = conversation.turn_count
+
+        with self.lock:
+            entry = self.pending.get(session_id)
+            if entry is None or entry is DELETED:
+                entry = self.pending[session_id] = {"turns": []}
+            entry.update(preferences=json.dumps(preferences), summary=conversation.summary,
+                         turn_count=conversation.turn_count, first_turn=conversation.first_turn())
+            entry["turns"] += turns
+            self.stats["saves"] += 1
+            if len(self.pending) >= self.max_pending:
+                self.wake.set()
+
+    def delete(self, session_id):
+        self.saved_turns.pop(session_id, None)
+        with self.lock:
+            self.pending[session_id] = DELETED
+
+    def release(self, session_id):
+        """Forget what was saved for a session that's no longer in memory. Its data stays."""
+        self.saved_turns.pop(session_id, None)
+
+    def load(self, session_id):
+        """Return {"preferences", "summary", "turn_count", "turns"} of a saved session, or None"""
+        with self.lock:
+            # Oldest first: the batch being written, then what was saved after it
+            entries = [entry for entry in (self.in_flight.get(session_id), self.pending.get(session_id)) if entry is not None]
+            entries = [entry if entry is DELETED else {**entry, "turns": list(entry["turns"])} for entry in entries]
+        if entries and entries[-1] is DELETED:
+            return None
+        deleted = DELETED in entries
+        if deleted:
+            entries = entries[entries.index(DELETED) + 1:] # Saved again after it was deleted, older data doesn't count
+
+        row, rows = None, []
+        if not deleted:
+            with self.reader_lock:
+                row = self.reader.execute("SELECT preferences, summary, turn_count, first_turn FROM sessions WHERE session_id = ?",
+                                          (session_id,)).fetchone()
+                rows = self.reader.execute("SELECT number, user_input, agent_response FROM turns WHERE session_id = ? ORDER BY number",
+                                           (session_id,)).fetchall() if row else []
+        if row is None and not entries:
+            return None
+
+        state = {"preferences": "{}", "summary": "", "turn_count": 0, "first_turn": 1}
+        if row:
+            state.update(preferences=row[0], summary=row[1], turn_count=row[2], first_turn=row[3])
+        turns = {number: (number, user_input, agent_response) for number, user_input, agent_response in rows}
+        for entry in entries:
+            # Not committed yet, newer than what's on disk (the writer may have just written it, the numbers match then)
+            state.update({key: entry[key] for key in ["preferences", "summary", "turn_count", "first_turn"]})
+            turns.update((turn[0], turn) for turn in entry["turns"])
+
+        self.saved_turns[session_id] = state["turn_count"]
+        self.stats["loads"] += 1
+        return {
+            "preferences": json.loads(state["preferences"]),
+            "summary": state["summary"],
+            "turn_count": state["turn_count"],
+            "turns": [turns[number] for number in sorted(turns) if number >= state["first_turn"]]
+        }
+
+    def write_behind(self):
+        last_expiry = 0.0
+        while not self.closed:
+            self.wake.wait(self.flush_interval)
+            self.wake.clear()
+            self.flush()
+            if time.time() - last_expiry > 3600:
+                self.expire()
+                last_expiry = time.time()
+
+    def flush(self):
+        """Write everything saved since the last flush in one transaction"""
+        with self.lock:
+            batch, self.pending = self.pending, {}
+            self.in_flight = batch
+        if not batch:
+            return
+        started = time.perf_counter()
+        try:
+            self.write(batch)
+        except sqlite3.Error as e:
+            print(f"❌ Error saving sessions: {e}. Trying again at the next flush.")
+            self.requeue(batch)
+            return
+        finally:
+            with self.lock:
+                self.in_flight = {} # Committed or back in pending, load finds it there now
+        self.stats["flushes"] += 1
+        self.stats["sessions_written"] += len(batch)
+        self.stats["flush_time"] += time.perf_counter() - started
+
+    def write(self, batch):
+        now = time.time()
+        with self.db:
+            for session_id, entry in batch.items():
+                if entry is DELETED:
+                    self.db.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+                    self.db.execute("DELETE FROM turns WHERE session_id = ?", (session_id,))
+                    continue
+                self.db.execute(
+                    "INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, ?, ?, ?)",
+                    (session_id, entry["preferences"], entry["summary"], entry["turn_count"], entry["first_turn"], now)
+                )
+                self.db.executemany("INSERT OR REPLACE INTO turns VALUES (?, ?, ?, ?)",
+                                    [(session_id, *turn) for turn in entry["turns"] if turn[0] >= entry["first_turn"]])
+                # Compaction: turns folded into the summary aren't needed to resume
+                self.db.execute("DELETE FROM turns WHERE session_id = ? AND number < ?", (session_id, entry["first_turn"]))
+        self.stats["turns_written"] += sum(len(entry["turns"]) for entry in batch.values() if entry is not DELETED)
+
+    def requeue(self, batch):
+        """Put a batch that couldn't be written back in front of the newer changes"""
+        with self.lock:
+            for session_id, entry in batch.items():
+                newer = self.pending.get(session_id)
+                if newer is None:
+                    self.pending[session_id] = entry
+                elif newer is not DELETED and entry is not DELETED:
+                    newer["turns"] = entry["turns"] + newer["turns"]
+
+    def expire(self):
+        """Delete the sessions nobody touched for expire_after seconds"""
+        cutoff = time.time() - self.expire_after
+        with self.db:
+            self.db.execute("DELETE FROM turns WHERE session_id IN (SELECT session_id FROM sessions WHERE updated_at < ?)", (cutoff,))
+            self.stats["expired"] += self.db.execute("DELETE FROM sessions WHERE updated_at < ?", (cutoff,)).rowcount
+
+    def get_stats(self):
+        with self.lock:
+            stats = dict(self.stats)
+            stats["pending"] = len(self.pending)
+        stats["avg_flush_time"] = stats["flush_time"] / stats["flushes"] if stats["flushes"] else 0.0
+        return stats
+
+    def close(self):
+        """Stop the writer and write what's left"""
+        self.closed = True
+        self.wake.set()
+        self.writer.join()
+        self.flush()
+        self.db.close()
+        self.reader.close()
@@ -4,10 +4,11 @@ import requests
 import json
 import os
 from json_repair import repair_json
+from llm_client import OllamaClient
 
 class EventAgent:
     def __init__(self):
-        self.ollama_url = "http://localhost:11434/api/generate"
+        self.llm = OllamaClient("http://localhost:11434") # Pooled keep-alive connection to Ollama
         self.model_name = "llama3.1" # Choose 3.2 if you need a lighter model - don't forget to download it first
         self.current_date = datetime.now().strftime("%Y-%m-%d")
         self.conversation_history = [] # Store conversation for context
@@ -107,17 +108,8 @@ CRITICAL: Respond with ONLY the JSON object, no explanations, no markdown, no co
     
     # Send a prompt to the Ollama LLM and get a response
     def ask_ollama(self, prompt):
-        
-        payload = {
-            "model": self.model_name,
-            "prompt": prompt,
-            "stream": False
-        }
-        
         try:
-            response = requests.post(self.ollama_url, json=payload)
-            response.raise_for_status()
-            return response.json()["response"]
+            return self.llm.generate(self.model_name, prompt)
         except requests.exceptions.RequestException as e:
             return f"Error communicating with Ollama: {e}"
 
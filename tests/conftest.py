@@ -0,0 +1,42 @@
+import json
+import os
+import random
+import sys
+import pytest
+
+# The modules live in the repository root, like for the benchmarks
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+RESOURCES = os.path.join(ROOT, "resources")
+
+PREFERENCES = [
+    {"interests": ["music"], "location": "Ljubljana", "preferred_price": "affordable", "date": ""},
+    {"interests": ["technology", "history"], "location": "", "preferred_price": "moderate", "date": ""},
+    {"interests": [], "location": "Maribor", "preferred_price": "", "date": "2027-03-01 to 2027-03-31"},
+    {"interests": ["sports"], "location": "Bled", "preferred_price": "", "date": ""}
+]
+
+
+@pytest.fixture(scope="session")
+def knowledge_graph():
+    with open(os.path.join(RESOURCES, "knowledge_graph.json"), 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+
+def synthetic_events(count, knowledge_graph, seed=42):
+    """Events in 2027 over the knowledge graph's venues and organizers, some running several days, some without a price"""
+    rng = random.Random(seed)
+    events = []
+    for i in range(count):
+        start = f"2027-{rng.randint(1, 12):02d}-{rng.randint(1, 20):02d}"
+        events.append({
+            "id": str(i + 1),
+            "name": f"Event {i + 1}",
+            "category": rng.choice(knowledge_graph["interests"]),
+            "date": start,
+            "end_date": start[:-2] + f"{int(start[-2:]) + rng.randint(1, 8):02d}" if rng.random() < 0.2 else "",
+            "organizer": rng.choice(list(knowledge_graph["organizers"])),
+            "venue": rng.choice(list(knowledge_graph["venues"])),
+            "price": rng.choice([None, rng.randint(0, 120)])
+        })
+    return events
@@ -0,0 +1,54 @@
+from datetime import date
+import pytest
+from date_window import parse_window, date_window, overlaps
+
+TODAY = date(2027, 10, 20) # A Wednesday
+
+
+@pytest.mark.parametrize("text, window", [
+    ("today", (date(2027, 10, 20), date(2027, 10, 20))),
+    ("nocoj", (date(2027, 10, 20), date(2027, 10, 20))),
+    ("tomorrow", (date(2027, 10, 21), date(2027, 10, 21))),
+    ("this weekend", (date(2027, 10, 23), date(2027, 10, 24))),
+    ("next weekend", (date(2027, 10, 30), date(2027, 10, 31))),
+    ("naslednji vikend", (date(2027, 10, 30), date(2027, 10, 31))),
+    ("this week", (date(2027, 10, 18), date(2027, 10, 24))),
+    ("ta teden", (date(2027, 10, 18), date(2027, 10, 24))),
+    ("next month", (date(2027, 11, 1), date(2027, 11, 30))),
+    ("next 7 days", (date(2027, 10, 20), date(2027, 10, 26))),
+    ("2027-11-20", (date(2027, 11, 20), date(2027, 11, 20))),
+    ("2027-11-20 to 2027-11-23", (date(2027, 11, 20), date(2027, 11, 23))),
+    ("20. novembra", (date(2027, 11, 20), date(2027, 11, 20))),
+    ("November 20", (date(2027, 11, 20), date(2027, 11, 20))),
+    ("show me 3 concerts on 20 november", (date(2027, 11, 20), date(2027, 11, 20))),
+    ("show me 3 concerts on november 20", (date(2027, 11, 20), date(2027, 11, 20))),
+    ("5.1.", (date(2028, 1, 5), date(2028, 1, 5))),
+    ("in may", (date(2028, 5, 1), date(2028, 5, 31))),
+    ("december", (date(2027, 12, 1), date(2027, 12, 31)))
+])
+def test_known_phrases(text, window):
+    assert parse_window(text, TODAY) == window
+
+
+@pytest.mark.parametrize("text", ["weekends", "on weekends", "weekly", "monthly", "last month", "last weekend",
+                                  "prejšnji teden", "may I ask something", "I like music", ""])
+def test_unknown_phrases(text):
+    assert parse_window(text, TODAY) is None
+
+
+def test_sunday_is_still_this_weekend():
+    assert parse_window("this weekend", date(2027, 10, 24)) == (date(2027, 10, 23), date(2027, 10, 24))
+
+
+def test_date_window():
+    assert date_window("this weekend", "2027-10-20") == ("2027-10-23", "2027-10-24")
+    assert date_window("31.2.", "2027-10-20") is None
+    assert date_window("", "2027-10-20") is None
+
+
+def test_overlaps():
+    window = ("2027-10-23", "2027-10-24")
+    assert overlaps("2027-10-23", "", window)
+    assert overlaps("2027-10-01", "2027-10-30", window)
+    assert not overlaps("2027-10-25", "", window)
+    assert not overlaps("", "", window)
@@ -0,0 +1,40 @@
+import pytest
+from final_version import EventAgent
+
+
+@pytest.fixture
+def agent():
+    return EventAgent()
+
+
+@pytest.mark.parametrize("response", [
+    "{}",
+    '{"interests": ["music"]}',
+    '{"interests": ["not an interest"], "location": "", "preferred_price": "", "date": ""}',
+    '{"interests": "music", "location": "", "preferred_price": "", "date": ""}',
+    '{"interests": [], "location": "", "preferred_price": "free-ish", "date": ""}',
+    "[]",
+    "sorry, I can't help with that"
+])
+def test_rejects_invalid_preferences(agent, response):
+    assert not agent.is_preferences_response(response)
+
+
+def test_invalid_preferences_keep_the_current_ones(agent):
+    agent.user_preferences["location"] = "Maribor"
+    agent.set_user_preferences("{}")
+    assert agent.user_preferences == {"interests": [], "location": "Maribor", "preferred_price": "", "date": ""}
+
+
+def test_valid_preferences_replace_the_four_keys(agent):
+    interest = agent.knowledge_graph["interests"][0]
+    response = '{"interests": ["%s"], "location": "Bled", "preferred_price": "", "date": "", "note": "extra"}' % interest
+    assert agent.is_preferences_response(response)
+    agent.set_user_preferences(response)
+    assert agent.user_preferences == {"interests": [interest], "location": "Bled", "preferred_price": "", "date": ""}
+
+
+def test_sample_events_are_never_over(agent):
+    agent.current_date = "2099-01-01"
+    agent.user_preferences["interests"] = ["music"]
+    assert [event["category"] for event in agent.suggest_events()][:1] == ["music"]
@@ -0,0 +1,28 @@
+from conftest import PREFERENCES, synthetic_events
+from final_version import EventAgent
+
+
+def test_batch_scorer_matches_score_event(knowledge_graph):
+    agent = EventAgent()
+    agent.current_date = "2027-01-01"
+    events = synthetic_events(500, knowledge_graph)
+    for preferences in PREFERENCES[:2]:
+        agent.user_preferences = dict(preferences)
+        expected = [(event["id"], score) for score, _, event in agent.top_k_events(events, 5)]
+        winners = agent.batch_scorer.top_k(events, agent.user_preferences, 5, radius_km=agent.location_radius_km)
+        assert [(events[i]["id"], agent.score_event(events[i])[0]) for i in winners] == expected
+
+
+def test_threads_scoring_different_catalogs(knowledge_graph):
+    # Server sessions share one scorer, and may score before and after the catalog changed
+    from concurrent.futures import ThreadPoolExecutor
+    from event_scorer import BatchScorer
+    catalogs = [synthetic_events(2000, knowledge_graph, seed=1), synthetic_events(3000, knowledge_graph, seed=2)]
+    weights = {"interest": 3, "location": 3, "price": 2, "organizer": 2}
+    preferences = PREFERENCES[0]
+    expected = [BatchScorer(knowledge_graph, weights).top_k(events, preferences, 5) for events in catalogs]
+
+    scorer = BatchScorer(knowledge_graph, weights)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda i: (i % 2, scorer.top_k(catalogs[i % 2], preferences, 5)), range(200)))
+    assert all(winners == expected[catalog] for catalog, winners in results)
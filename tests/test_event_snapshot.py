@@ -0,0 +1,36 @@
+import contextlib
+import io
+import json
+from conftest import PREFERENCES, synthetic_events
+from event_store import EventStore, Event
+from event_snapshot import write_snapshot
+from final_version import EventAgent
+
+
+def test_snapshot_scores_like_the_json_catalog(knowledge_graph, tmp_path):
+    events = synthetic_events(500, knowledge_graph)
+    json_path = tmp_path / "events.json"
+    snapshot_path = tmp_path / "events.evsnap"
+    json_path.write_text(json.dumps(events), encoding="utf-8")
+    write_snapshot(str(snapshot_path), [Event.from_dict(event) for event in events], knowledge_graph)
+
+    agent = EventAgent()
+    agent.current_date = "2027-02-01"
+    for preferences in PREFERENCES:
+        results = []
+        for path in [json_path, snapshot_path]:
+            agent.event_store = EventStore(str(path), agent.knowledge_graph)
+            agent.user_preferences = dict(preferences)
+            with contextlib.redirect_stdout(io.StringIO()): # suggest_events prints what it found
+                results.append([(event["id"], event["score"]) for event in agent.suggest_events(k=5)])
+        assert results[0] == results[1]
+        assert results[0]
+
+
+def test_snapshot_reads_back_the_events(knowledge_graph, tmp_path):
+    events = [Event.from_dict(event) for event in synthetic_events(200, knowledge_graph)]
+    path = tmp_path / "events.evsnap"
+    write_snapshot(str(path), events, knowledge_graph)
+    store = EventStore(str(path), knowledge_graph)
+    assert len(store) == len(events)
+    assert store.get_events() == events
@@ -0,0 +1,78 @@
+from conftest import PREFERENCES, synthetic_events
+from event_store import EventStore, Event
+
+
+def index_state(store):
+    """Everything the indexes hold, independent of the order events were added in"""
+    return {
+        "by_category": {key: ids for key, ids in store.by_category.items() if ids},
+        "by_city": {key: ids for key, ids in store.by_city.items() if ids},
+        "by_organizer": {key: ids for key, ids in store.by_organizer.items() if ids},
+        "prices": sorted(zip(store.prices, store.price_ids)),
+        "dates": sorted(zip(store.dates, store.date_ids)),
+        "span_ends": sorted(zip(store.span_ends, store.span_ids)),
+        "geo": sorted(store.geo.within(46.15, 14.99, 500))
+    }
+
+
+def candidate_ids(store, preferences, window=None):
+    events = store.get_events()
+    return sorted(events[i].id for i in store.find_candidates(preferences, 25, window))
+
+
+def test_incremental_indexes_equal_a_rebuild(knowledge_graph):
+    events = synthetic_events(400, knowledge_graph)
+    store = EventStore(knowledge_graph=knowledge_graph)
+    for event in events[:300]:
+        store.add_event(event)
+    for event in events[:100:3]:
+        store.remove_event(event["id"])
+    for event in events[50:150]:
+        store.add_event({**event, "price": 10, "category": "music"}) # Changed events replace the old ones
+    for event in events[300:]:
+        store.add_event(event)
+
+    rebuilt = EventStore(knowledge_graph=knowledge_graph)
+    rebuilt.set_events(store.get_events())
+
+    assert index_state(store) == index_state(rebuilt)
+    assert store.prices == sorted(store.prices)
+    for preferences in PREFERENCES:
+        assert candidate_ids(store, preferences) == candidate_ids(rebuilt, preferences)
+
+
+def test_candidates_match_a_scan(knowledge_graph):
+    events = [Event.from_dict(event) for event in synthetic_events(300, knowledge_graph)]
+    store = EventStore(knowledge_graph=knowledge_graph)
+    store.set_events(events)
+    preferences = {"interests": ["music"], "location": "", "preferred_price": "affordable", "date": ""}
+    expected = sorted(event.id for event in events
+                      if event.category == "music" or (event.price is not None and event.price <= 20)
+                      or knowledge_graph["organizers"][event.organizer]["user_follows"])
+    assert candidate_ids(store, preferences) == expected
+
+
+def test_window_and_eviction(knowledge_graph):
+    events = [Event.from_dict(event) for event in synthetic_events(300, knowledge_graph)]
+    store = EventStore(knowledge_graph=knowledge_graph)
+    store.set_events(events)
+    window = ("2027-03-05", "2027-03-10")
+    assert store.ids_in_window(window) == {event.id for event in events
+                                           if event.date <= window[1] and event.last_day() >= window[0]}
+
+    evicted = store.evict_before("2027-06-15")
+    assert evicted == sum(event.last_day() < "2027-06-15" for event in events)
+    assert all(event.last_day() >= "2027-06-15" for event in store.get_events())
+    assert len(store) == len(events) - evicted
+    # Events added later that are already over are dropped when the store is rebuilt
+    store.set_events(events)
+    assert len(store) == len(events) - evicted
+
+
+def test_missing_price_is_unknown(knowledge_graph):
+    event = Event.from_dict({"id": "1", "name": "No price", "category": "sports", "venue": "Kino Šiška"})
+    assert event.price is None
+    store = EventStore(knowledge_graph=knowledge_graph)
+    store.add_event(event)
+    assert store.prices == []
+    assert candidate_ids(store, {"interests": [], "location": "", "preferred_price": "affordable", "date": ""}) == []
@@ -0,0 +1,64 @@
+import json
+import os
+import pytest
+from intent_router import IntentRouter, parse_action
+
+ACTIONS = ["general_chat", "suggest_events", "quit"]
+RESOURCES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "resources")
+
+with open(os.path.join(RESOURCES, "intent_examples.json"), 'r', encoding='utf-8') as file:
+    EXAMPLES = json.load(file)
+
+
+@pytest.fixture
+def router():
+    return IntentRouter(ACTIONS)
+
+
+@pytest.mark.parametrize("text", ["bye", "Goodbye!", "exit", "ok bye for now", "Nasvidenje", "to je vse, hvala"])
+def test_whole_message_quits(router, text):
+    assert router.route(text) == "quit"
+
+
+@pytest.mark.parametrize("text", [
+    "Where is the exit at Cankarjev dom?",
+    "I want to leave now, bye",
+    "Any goodbye parties or events this weekend?",
+    "I don't want to quit yet"
+])
+def test_quit_needs_a_whole_message_rule(router, text):
+    assert router.route(text) != "quit"
+
+
+def test_routes_clear_messages(router):
+    assert router.route("Show me some concerts please") == "suggest_events"
+    assert router.route("Pokaži mi dogodke") == "suggest_events"
+    assert router.route("Živjo") == "general_chat"
+    assert router.route("I like music") == "general_chat"
+
+
+def test_negations_go_to_the_llm(router):
+    assert router.route("I don't want any events") is None
+    assert router.get_stats()["llm"] == 1
+
+
+def test_labelled_examples(router):
+    routed = [(router.route(example["text"]), example["action"]) for example in EXAMPLES]
+    answered = [(action, label) for action, label in routed if action is not None]
+    assert len(answered) >= 0.8 * len(EXAMPLES)
+    assert sum(action == label for action, label in answered) >= 0.95 * len(answered)
+    # Ending the conversation by mistake loses the session, so quit is never wrong
+    assert all(label == "quit" for action, label in answered if action == "quit")
+
+
+@pytest.mark.parametrize("response, action", [
+    ('{"action": "suggest_events"}', "suggest_events"),
+    ("quit", "quit"),
+    ("Action: general_chat.", "general_chat"),
+    ('"quit"', "quit"),
+    ("general_chat or quit", None),
+    ('{"action": "dance"}', None),
+    ("", None)
+])
+def test_parse_action(response, action):
+    assert parse_action(response, ACTIONS) == action
@@ -0,0 +1,102 @@
+import json
+import os
+import pytest
+from preference_extractor import PreferenceExtractor
+
+RESOURCES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "resources")
+TODAY = "2027-10-20" # A Wednesday
+
+
+@pytest.fixture
+def extractor():
+    with open(os.path.join(RESOURCES, "knowledge_graph.json"), 'r', encoding='utf-8') as file:
+        return PreferenceExtractor(json.load(file))
+
+
+def extract(extractor, text):
+    delta, _ = extractor.extract(text, TODAY)
+    return delta
+
+
+@pytest.mark.parametrize("text, interests", [
+    ("I like jazz", ["music"]),
+    ("Zanima me zgodovina in glasba", ["history", "music"]),
+    ("Rad imam koncerte", ["music"]),
+    ("I love tech", ["technology"]),
+    ("I like techno", ["music"]),
+    ("I went rock climbing", ["sports"]),
+    ("Obiskala bi grad", ["history"]),
+    ("I'm a graduate student", []),
+    ("I'm grading exams all week", [])
+])
+def test_adds_interests(extractor, text, interests):
+    assert sorted(extract(extractor, text)["add_interests"]) == interests
+
+
+@pytest.mark.parametrize("text", ["I'm done with jazz", "I don't like concerts anymore", "I'm tired of concerts",
+                                  "Ne maram več glasbe"])
+def test_negated_interests_are_removed(extractor, text):
+    delta = extract(extractor, text)
+    assert delta["add_interests"] == []
+    assert delta["remove_interests"] == ["music"]
+
+
+def test_clauses_are_negated_on_their_own(extractor):
+    delta = extract(extractor, "I like music but not sports")
+    assert delta["add_interests"] == ["music"]
+    assert delta["remove_interests"] == ["sports"]
+
+
+@pytest.mark.parametrize("text, price", [
+    ("something cheap please", "affordable"),
+    ("free events", "affordable"),
+    ("poceni prosim", "affordable"),
+    ("my budget is 15 eur", "affordable"),
+    ("up to 40", "moderate"),
+    ("nothing above 50€", "moderate"),
+    ("my budget is 100 eur", ""),
+    ("cheap, up to 100 EUR", ""),
+    ("events in the next 7 days", "")
+])
+def test_price(extractor, text, price):
+    assert extract(extractor, text)["preferred_price"] == price
+
+
+@pytest.mark.parametrize("text, location", [
+    ("I live in Ljubljana", "Ljubljana"),
+    ("Živim v Ljubljani", "Ljubljana"),
+    ("Kaj je v Kopru?", "Koper"),
+    ("I moved from Ljubljana to Maribor", "Maribor"),
+    ("I live in Maribor, not Bled", "Maribor"),
+    ("I'm not in Ljubljana anymore, I live in Koper now", "Koper"),
+    ("Prihajam iz Kopra", "Koper"),
+    ("I like music", "")
+])
+def test_city(extractor, text, location):
+    assert extract(extractor, text)["location"] == location
+
+
+def test_date(extractor):
+    assert extract(extractor, "concerts this weekend")["date"] == "2027-10-23 to 2027-10-24"
+    assert extract(extractor, "tomorrow")["date"] == "2027-10-21"
+    assert extract(extractor, "I go to concerts on weekends")["date"] == ""
+
+
+def test_nothing_found(extractor):
+    delta, matched = extractor.extract("Hello there", TODAY)
+    assert not matched
+    assert not extractor.looks_like_preference("Hello there")
+    assert extractor.looks_like_preference("I prefer something fancy")
+
+
+@pytest.mark.parametrize("text, cue", [
+    ("I prefer something fancy", True),
+    ("I'm a fan of good food", True),
+    ("Zanimajo me stvari", True),
+    ("Kdaj?", True),
+    ("That's fantastic!", False),
+    ("Fromage tasting sounds nice", False),
+    ("Is the radio on?", False)
+])
+def test_preference_cues(extractor, text, cue):
+    assert extractor.looks_like_preference(text) == cue
@@ -0,0 +1,51 @@
+import json
+import os
+import pytest
+from eventim.eventim_API_example import ProductStreamParser
+
+RESPONSE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "eventim", "eventim_API_response.json")
+
+
+def parse(data, chunk_size):
+    parser = ProductStreamParser()
+    products = []
+    for i in range(0, len(data), chunk_size):
+        products.extend(parser.feed(data[i:i + chunk_size]))
+    return products
+
+
+@pytest.fixture(scope="module")
+def response():
+    with open(RESPONSE_PATH, 'rb') as file:
+        return file.read()
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 4096, 10 ** 9])
+def test_matches_json_loads(response, chunk_size):
+    assert parse(response, chunk_size) == json.loads(response)["products"]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 1000])
+def test_strings_with_brackets_escapes_and_unicode(chunk_size):
+    document = {
+        "facets": [{"name": "products", "values": ["{", "]"]}],
+        "products": [
+            {"productId": "1", "name": 'Koncert "Glasba {in} [ples]" \\ čšž 🎵', "tags": [], "nested": {"a": [1, {"b": "}"}]}},
+            {"productId": "2", "name": "", "price": 12.5, "inStock": False, "location": None}
+        ],
+        "totalResults": 2
+    }
+    data = json.dumps(document, ensure_ascii=False).encode("utf-8")
+    assert parse(data, chunk_size) == document["products"]
+
+
+def test_empty_and_missing_products():
+    assert parse(b'{"products": [], "totalResults": 0}', 2) == []
+    assert parse(b'{"totalResults": 0, "facets": {"products": [{"x": 1}]}}', 5) == []
+
+
+def test_stops_after_the_products():
+    parser = ProductStreamParser()
+    assert list(parser.feed(b'{"products": [{"productId": "1"}], "rest": [')) == [{"productId": "1"}]
+    assert parser.done
+    assert list(parser.feed(b'{"productId": "2"}]}')) == []